@@ -1,16 +1,26 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Response
 from ..langgraph.ai_agents.assets_generation import get_validated_assets
+from ..langgraph.helpers.circuit_breaker import CircuitOpenError
 from ..langgraph.helpers.graph_state_classes import BusinessState
+from ..langgraph.helpers.scenario_cache import cached_stage_output, remember_scenario
 
 router = APIRouter()
 
 
 @router.post("/generate-assets", response_model=BusinessState)
-def generate_assets(business: BusinessState):
+def generate_assets(business: BusinessState, response: Response):
     try:
         business_with_assets = get_validated_assets(business)
         if not business_with_assets:
             raise HTTPException(status_code=500, detail="Failed to generate assets")
+        remember_scenario(business_with_assets)
         return business_with_assets
+    except CircuitOpenError:
+        # Served from the cache only for a cached business, otherwise the client is told when to retry
+        cached = cached_stage_output(business, "assets")
+        if cached is None:
+            raise
+        response.headers["X-Degraded"] = "cached-scenario"
+        return cached
     except Exception as e:
         raise e
@@ -1,14 +1,21 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Response
 from ..langgraph.ai_agents.business_generation import get_validated_business
+from ..langgraph.helpers.circuit_breaker import CircuitOpenError
 from ..langgraph.helpers.graph_state_classes import BusinessState
-
+from ..langgraph.helpers.scenario_cache import cached_business, remember_scenario
 
 router = APIRouter()
 
 
 @router.get("/generate-business", response_model=BusinessState)
-def generate_business():
-    business = get_validated_business()
+def generate_business(response: Response):
+    try:
+        business = get_validated_business()
+    except CircuitOpenError:
+        # Ollama is down or overloaded: a previously generated business is better than an error
+        response.headers["X-Degraded"] = "cached-scenario"
+        return cached_business()
     if not business:
         raise HTTPException(status_code=500, detail="Failed to generate business")
+    remember_scenario(business)
     return business
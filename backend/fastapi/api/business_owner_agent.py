@@ -5,6 +5,9 @@ import uuid
 
 from ..langgraph.ai_agents.business_owner_agent import invoke_business_owner_chat
 from ..langgraph.helpers.graph_state_classes import BusinessState
+from ..langgraph.helpers.cancellation import RequestCancelledError
+from ..langgraph.helpers.circuit_breaker import CircuitOpenError
+from ..langgraph.helpers.token_accounting import accounting_session
 
 
 class ChatMessage(BaseModel):
@@ -45,9 +48,10 @@ def chat_with_business_owner(request: ChatRequest = Body(...)):
             if hasattr(request.business, "dict")
             else request.business
         )
-        full_conversation_dicts = invoke_business_owner_chat(
-            business=business_dict, messages=messages_as_dicts, thread_id=thread_id
-        )
+        with accounting_session(thread_id):
+            full_conversation_dicts = invoke_business_owner_chat(
+                business=business_dict, messages=messages_as_dicts, thread_id=thread_id
+            )
         print("DEBUG: full_conversation_dicts =", full_conversation_dicts)
         if (
             not full_conversation_dicts
@@ -58,6 +62,8 @@ def chat_with_business_owner(request: ChatRequest = Body(...)):
                 detail="The chatbot failed to generate a valid response.",
             )
         return ChatResponse(conversation=full_conversation_dicts)
+    except (RequestCancelledError, CircuitOpenError):
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=500, detail=f"An unexpected error occurred: {str(e)}"
@@ -0,0 +1,166 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from anyio import to_thread
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import JSONResponse, PlainTextResponse
+
+from ..langgraph.helpers.startup_warmup import get_warmup_status
+from ..langgraph.helpers.health_probes import probe_ollama, probe_vectorstores
+from ..langgraph.helpers.model_routing import (
+    MODEL_ROUTES,
+    get_route_stats,
+    get_stage_run_stats,
+)
+from ..langgraph.helpers.retry_budget import get_retry_stats
+from ..langgraph.helpers.scenario_dedup import get_dedup_stats
+from ..langgraph.helpers.tracing import get_trace, list_traces
+from ..langgraph.helpers.ollama_backend_pool import ollama_circuit, ollama_pool
+from ..langgraph.helpers.token_accounting import (
+    get_session_token_usage,
+    get_token_usage,
+)
+from ..langgraph.helpers.metrics import (
+    CIRCUIT_OPEN,
+    OLLAMA_IN_FLIGHT,
+    OLLAMA_WAITING,
+    THREADPOOL_BUSY,
+    THREADPOOL_QUEUED,
+    render_metrics,
+)
+from ..langgraph.helpers.structured_output import (
+    STRUCTURED_OUTPUT_METHOD,
+    get_structured_output_stats,
+)
+
+router = APIRouter()
+
+# The probes get their own threads, so readiness still answers when every threadpool worker is busy with an LLM call
+_probe_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="health-probe")
+
+
+@router.get("/healthz")
+async def liveness():
+    """Liveness: the process is up and its event loop answers. Does no I/O."""
+    return {"status": "ok"}
+
+
+@router.get("/readyz")
+async def readiness():
+    """
+    Readiness: 503 with status "starting" until the startup warm-up has finished, then 200. The status is
+    "ready", or "degraded" while Ollama is unreachable or its circuit is not closed: the service still answers,
+    from its caches and fallbacks, so it stays in rotation.
+    Also reports the loaded models, the vectorstore state, the depth of the threadpool running the sync routes
+    and the state of the Ollama circuit breaker
+    """
+    limiter = to_thread.current_default_thread_limiter()
+    statistics = limiter.statistics()
+    threadpool = {
+        "size": limiter.total_tokens,
+        "busy": statistics.borrowed_tokens,
+        "queued": statistics.tasks_waiting,
+    }
+
+    warmup = get_warmup_status()
+    loop = asyncio.get_running_loop()
+    ollama_status, vectorstores = await asyncio.gather(
+        loop.run_in_executor(_probe_pool, probe_ollama),
+        loop.run_in_executor(_probe_pool, probe_vectorstores),
+    )
+
+    circuit = ollama_circuit.status()
+    degraded = not ollama_status["reachable"] or circuit["state"] != "closed"
+    if not warmup["ready"]:
+        status = "starting"
+    else:
+        status = "degraded" if degraded else "ready"
+    return JSONResponse(
+        status_code=503 if status == "starting" else 200,
+        content={
+            "ready": warmup["ready"],
+            "status": status,
+            "degraded": degraded,
+            "warmup": warmup,
+            "ollama": ollama_status,
+            "vectorstores": vectorstores,
+            "threadpool": threadpool,
+            "circuit": circuit,
+        },
+    )
+
+
+@router.get("/model-routes")
+def model_routes():
+    """
+    The model chain and options of every pipeline stage, with call, latency and agreement stats per model,
+    attempts and end-to-end latency per generate-and-validate stage, validator acceptance rates and the retry
+    budgets planned from them, near-duplicate businesses rejected, and structured output parse outcomes
+    """
+    return {
+        "routes": MODEL_ROUTES,
+        "stats": get_route_stats(),
+        "stage_runs": get_stage_run_stats(),
+        "retry_budgets": get_retry_stats(),
+        "scenario_dedup": get_dedup_stats(),
+        "structured_output": {
+            "method": STRUCTURED_OUTPUT_METHOD,
+            "parses": get_structured_output_stats(),
+        },
+    }
+
+
+@router.get("/traces")
+def traces(limit: int = 50):
+    """The most recent request traces, newest first. The X-Trace-Id header of a response names its trace."""
+    return {"traces": list_traces(limit)}
+
+
+@router.get("/traces/{trace_id}")
+def trace(trace_id: str):
+    """The spans of a request trace: LLM calls, retrievals, embeddings, Chroma calls and validation attempts."""
+    spans = get_trace(trace_id)
+    if spans is None:
+        raise HTTPException(status_code=404, detail=f"Trace {trace_id} not found")
+    return {"trace_id": trace_id, "spans": spans}
+
+
+@router.get("/token-usage")
+def token_usage():
+    """
+    LLM calls and tokens per pipeline stage and per endpoint: the prompt and output tokens Ollama reported,
+    the estimated prompt tokens budgets were checked against, and the prompts trimmed or rejected
+    """
+    return get_token_usage()
+
+
+@router.get("/token-usage/sessions/{session_id}")
+def session_token_usage(session_id: str):
+    """The token usage of one chat session, by the thread_id of its requests."""
+    usage = get_session_token_usage(session_id)
+    if usage is None:
+        raise HTTPException(status_code=404, detail=f"Session {session_id} not found")
+    return {"session_id": session_id, **usage}
+
+
+@router.get("/metrics")
+async def metrics():
+    """
+    Prometheus metrics: request, LLM call and stage latency histograms, token counts and rates, validation
+    results, cache hit counts, and the current Ollama and threadpool queue depths
+    """
+    statistics = to_thread.current_default_thread_limiter().statistics()
+    THREADPOOL_BUSY.set(statistics.borrowed_tokens)
+    THREADPOOL_QUEUED.set(statistics.tasks_waiting)
+
+    OLLAMA_IN_FLIGHT.clear()
+    for backend in ollama_pool.status():
+        OLLAMA_IN_FLIGHT.set(backend["outstanding"], backend=backend["base_url"])
+    OLLAMA_WAITING.set(ollama_pool.waiting)
+    CIRCUIT_OPEN.set(
+        int(ollama_circuit.status()["state"] != "closed"), circuit=ollama_circuit.name
+    )
+
+    return PlainTextResponse(
+        render_metrics(), media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
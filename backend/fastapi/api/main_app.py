@@ -1,12 +1,117 @@
-from fastapi import FastAPI
+import asyncio
+from contextlib import asynccontextmanager
+
+import re
+import time
+
+from anyio import to_thread
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+from loguru import logger
+
+from ..langgraph.helpers.startup_warmup import run_startup_warmup
+from ..langgraph.helpers.chroma_client_registry import close_chroma_clients
+from ..langgraph.helpers.ollama_backend_pool import ollama_pool
+from ..langgraph.helpers.metrics import HTTP_REQUEST_SECONDS, current_endpoint
+from ..langgraph.helpers.circuit_breaker import CircuitOpenError
+from ..langgraph.helpers.cancellation import (
+    CancelOnDisconnectMiddleware,
+    RequestCancelledError,
+)
+from ..langgraph.helpers.tracing import start_trace
 from .business_generation import router as business_router
 from .assets_generation import router as assets_router
 from .threats_generation import router as threats_router
 from .business_owner_agent import router as business_owner
 from .security_template_retrieval import router as security_template
 from .security_assessment_assistant import router as security_assessment_assistant
+from .health import router as health_router
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Warm up in the background, so the server accepts connections (and /readyz answers) while models load
+    warmup_task = asyncio.create_task(to_thread.run_sync(run_startup_warmup))
+    ollama_pool.start_health_checks()
+    yield
+    ollama_pool.stop_health_checks()
+    if not warmup_task.done():
+        logger.warning("Shutting down before the startup warm-up finished")
+        warmup_task.cancel()
+    close_chroma_clients()
+
+
+app = FastAPI(lifespan=lifespan)
+
+# Probes and trace lookups would crowd the real requests out of the trace buffer
+UNTRACED_PATHS = {"/healthz", "/readyz", "/metrics", "/traces"}
+_TRACE_ID = re.compile(r"^[0-9a-f]{32}$")
+
+
+@app.middleware("http")
+async def trace_requests(request: Request, call_next):
+    """
+    Traces every request and records its latency in the metrics. The trace id is returned in X-Trace-Id,
+    and a valid incoming one is continued
+    """
+    path = request.url.path
+    endpoint_token = current_endpoint.set(path)
+    start_time = time.perf_counter()
+    try:
+        if path in UNTRACED_PATHS or path.startswith("/traces/"):
+            response = await call_next(request)
+        else:
+            incoming_trace_id = request.headers.get("X-Trace-Id", "").lower()
+            with start_trace(
+                f"{request.method} {path}",
+                trace_id=(
+                    incoming_trace_id if _TRACE_ID.match(incoming_trace_id) else None
+                ),
+            ) as root:
+                response = await call_next(request)
+                root.set(status_code=response.status_code)
+            response.headers["X-Trace-Id"] = root.trace_id
+    finally:
+        current_endpoint.reset(endpoint_token)
+
+    # Label by route template, so path parameters do not create a series per value
+    route = request.scope.get("route")
+    HTTP_REQUEST_SECONDS.observe(
+        time.perf_counter() - start_time,
+        method=request.method,
+        endpoint=getattr(route, "path", "unmatched"),
+        status=response.status_code,
+    )
+    return response
+
+
+# Added last, so it runs first: the whole request, including its tracing, sees the cancellation
+app.add_middleware(CancelOnDisconnectMiddleware)
+
+# Non-standard "client closed request" status. Nobody reads the response, but the metrics and traces do
+CLIENT_CLOSED_REQUEST = 499
+
+
+@app.exception_handler(RequestCancelledError)
+async def request_cancelled(request: Request, error: RequestCancelledError):
+    logger.info(f"Abandoned {request.method} {request.url.path}: {error}")
+    return JSONResponse(
+        status_code=CLIENT_CLOSED_REQUEST, content={"detail": str(error)}
+    )
+
+
+@app.exception_handler(CircuitOpenError)
+async def circuit_open(request: Request, error: CircuitOpenError):
+    """Routes without a degraded answer fail fast and tell the client when to retry."""
+    return JSONResponse(
+        status_code=503,
+        headers={"Retry-After": str(max(1, round(error.retry_after)))},
+        content={
+            "detail": "The language models are unavailable right now, please retry later",
+            "retry_after_seconds": round(error.retry_after),
+        },
+    )
 
-app = FastAPI()
 
 app.include_router(business_router, prefix="/api/business", tags=["Business"])
 app.include_router(assets_router, prefix="/api/assets", tags=["Assets"])
@@ -20,3 +125,4 @@ app.include_router(
     prefix="/api/chat",
     tags=["Security Assessment Assistant"],
 )
+app.include_router(health_router, tags=["Health"])
@@ -6,6 +6,9 @@ import uuid
 from ..langgraph.ai_agents.security_assessment_assistant import (
     invoke_security_assistant_chat,
 )
+from ..langgraph.helpers.cancellation import RequestCancelledError
+from ..langgraph.helpers.circuit_breaker import CircuitOpenError
+from ..langgraph.helpers.token_accounting import accounting_session
 
 
 class ChatMessage(BaseModel):
@@ -37,9 +40,10 @@ def chat_with_security_assistant(request: SecurityAssistantChatRequest = Body(..
         thread_id = request.thread_id or str(uuid.uuid4())
 
         messages_as_dicts = [msg.dict() for msg in request.messages]
-        full_conversation_dicts = invoke_security_assistant_chat(
-            messages=messages_as_dicts, thread_id=thread_id
-        )
+        with accounting_session(thread_id):
+            full_conversation_dicts = invoke_security_assistant_chat(
+                messages=messages_as_dicts, thread_id=thread_id
+            )
 
         print("DEBUG: full_conversation_dicts =", full_conversation_dicts)
 
@@ -53,6 +57,8 @@ def chat_with_security_assistant(request: SecurityAssistantChatRequest = Body(..
             )
 
         return ChatResponse(conversation=full_conversation_dicts)
+    except (RequestCancelledError, CircuitOpenError):
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=500, detail=f"An unexpected error occurred: {str(e)}"
@@ -1,13 +1,46 @@
-from fastapi import HTTPException, Body, APIRouter
-from ..langgraph.helpers.file_operations import retrieve_input_file
-from fastapi.responses import PlainTextResponse
+from fastapi import HTTPException, APIRouter, Request
+from fastapi.responses import Response
+from ..langgraph.helpers.static_file_responses import (
+    get_encoded_input_file,
+    etag_matches,
+    choose_content_encoding,
+    STATIC_FILE_MAX_AGE_SECONDS,
+)
 
 router = APIRouter()
 
 
-@router.get("/retrieve-security-template", response_class=PlainTextResponse)
-def get_markdown_file():
-    content = retrieve_input_file("SecurityAssessmentTemplate-FrontendFile.md")
-    if content is None:
+def input_file_response(request: Request, filename: str, media_type: str) -> Response:
+    """
+    Serves an input file from memory, precompressed, with a strong ETag per encoding. A request whose If-None-Match
+    matches the current version gets an empty 304
+    """
+    encoded = get_encoded_input_file(filename)
+    if encoded is None:
         raise HTTPException(status_code=404, detail="File not found.")
-    return content
+
+    encoding = choose_content_encoding(
+        request.headers.get("accept-encoding"), list(encoded.bodies)
+    )
+    headers = {
+        "ETag": encoded.etags[encoding],
+        "Cache-Control": f"public, max-age={STATIC_FILE_MAX_AGE_SECONDS}",
+        "Vary": "Accept-Encoding",
+    }
+    if etag_matches(request.headers.get("if-none-match"), list(encoded.etags.values())):
+        return Response(status_code=304, headers=headers)
+
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+    return Response(
+        content=encoded.bodies[encoding], media_type=media_type, headers=headers
+    )
+
+
+@router.get("/retrieve-security-template")
+def get_markdown_file(request: Request):
+    return input_file_response(
+        request,
+        "SecurityAssessmentTemplate-FrontendFile.md",
+        media_type="text/plain; charset=utf-8",
+    )
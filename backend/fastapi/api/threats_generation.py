@@ -1,17 +1,27 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Response
 from ..langgraph.ai_agents.threats_generation import get_validated_threats
+from ..langgraph.helpers.circuit_breaker import CircuitOpenError
 from ..langgraph.helpers.graph_state_classes import BusinessState
+from ..langgraph.helpers.scenario_cache import cached_stage_output, remember_scenario
 from loguru import logger
 
 router = APIRouter()
 
 
 @router.post("/generate-threats", response_model=BusinessState)
-def generate_threats(business: BusinessState):
+def generate_threats(business: BusinessState, response: Response):
     try:
         business_with_threats = get_validated_threats(business)
         if not business_with_threats:
             raise HTTPException(status_code=500, detail="Failed to generate threats")
+        remember_scenario(business_with_threats)
         return business_with_threats
+    except CircuitOpenError:
+        # Served from the cache only for a cached business, otherwise the client is told when to retry
+        cached = cached_stage_output(business, "potential_threats")
+        if cached is None:
+            raise
+        response.headers["X-Degraded"] = "cached-scenario"
+        return cached
     except Exception as e:
         raise e
@@ -4,8 +4,11 @@ from ..helpers.graph_state_classes import (
     AssetCollection,
     ThreatItemCollection,
 )
-from ..helpers.file_operations import retrieve_input_file
-from ..helpers.model_config import fetch_model_from_ollama
+from ..helpers.file_operations import format_prompt_with_input_files
+from ..helpers.model_routing import get_routed_model
+from ..helpers.cancellation import RequestCancelledError
+from ..helpers.circuit_breaker import CircuitOpenError
+from ..helpers.retry_budget import run_validated_stage
 from ..prompts.assets_generation_prompt import asset_generator_prompt_message
 from ..helpers.output_validation import (
     create_assets_validation_prompt,
@@ -17,60 +20,60 @@ from ..helpers.output_validation import (
 def generate_assets(
     state: BusinessState,
     assets_example_filepath: str = "Assets_ZenithPoint.txt",
-    llm_model_name: str = "llama3.2",
+    llm_model_name: str | None = None,
 ) -> AssetCollection | BusinessState:
     """
     Generates a list of assets based on a generated business's description using a prompt template, and an example
     :param state: the generated business's state. This is based on a Pydantic Base Model class with the necessary Fields to generate assets
     :param assets_example_filepath: path to the assets example file. Defaults to "Assets_ZenithPoint.txt"
-    :param llm_model_name: name of the model to use for the given task, according to ollama model registry. Defaults to "llama3.2"
+    :param llm_model_name: optional model pinned instead of the assets_generation route's models, according to ollama model registry
     :return: the generated assets from the llm in the form of AssetCollection
     """
 
     try:
-        assets_example = retrieve_input_file(assets_example_filepath)
-        prompt = asset_generator_prompt_message.format(
+        # The example is filled in once and cached, only the business fields change per request
+        prompt = format_prompt_with_input_files(
+            asset_generator_prompt_message,
+            assets_listing_example=assets_example_filepath,
+        ).format(
             business_description=state["business_description"],
             business_activity=state["business_activity"],
-            assets_listing_example=assets_example,
         )
 
-        model_ollama = fetch_model_from_ollama(llm_model_name).with_structured_output(
-            AssetCollection
+        model_ollama = get_routed_model(
+            "assets_generation", AssetCollection, llm_model_name
         )
-        logger.info(f"{llm_model_name} fetched successfully for asset generation")
 
-        response = model_ollama.invoke(prompt)
+        response, model_name = model_ollama.invoke_with_model(prompt)
+        logger.info(f"Assets generated with {model_name}")
         return response
 
+    except (RequestCancelledError, CircuitOpenError):
+        raise
     except Exception as e:
-        logger.error(
-            f"Failed to produce output with {llm_model_name}. Details below:\n{e}"
-        )
+        logger.error(f"Failed to generate assets. Details below:\n{e}")
         return state
 
 
 def get_validated_assets(
-    state: BusinessState, max_retries: int = 3
+    state: BusinessState, max_retries: int | None = None
 ) -> BusinessState | None:
     """
     Calls asset generator and validator. Re-generates the assets if the output is not satisfactory
     :param state: previously generated business for which the assets will be generated
-    :param max_retries: the max number of times business generator can be called to generate a new business if output is not satisfactory
+    :param max_retries: optional cap on the number of times asset generator can be called. By default the number of attempts follows the stage's recent validator acceptance rate
     :return: the final business generator in a BusinessState format
     """
-    attempt = 0
-    are_assets_appropriate = None
-
-    while attempt < max_retries:
-        attempt += 1
-        logger.info(f"Assets generation attempt {attempt}/{max_retries}")
 
+    def attempt(_: int) -> tuple[BusinessState | None, bool | None]:
         generated_assets = generate_assets(state)
 
-        if not generated_assets.assets:
-            logger.error("Failed to generate assets.")
-            break
+        # generate_assets gives the state back when generation fails
+        if (
+            not isinstance(generated_assets, AssetCollection)
+            or not generated_assets.assets
+        ):
+            return None, None
 
         formatted_assets = format_items_for_llm(generated_assets)
 
@@ -80,28 +83,21 @@ def get_validated_assets(
                 generated_assets=formatted_assets,
             )
         )
+        if not are_assets_appropriate.is_valid:
+            return None, False
 
-        if are_assets_appropriate.is_valid:
-            logger.success("Generated sensible assets.")
-
-            business_state_new_structure = BusinessState(
-                business_name=state["business_name"],
-                business_location=state["business_location"],
-                business_contact_info=state["business_contact_info"],
-                business_activity=state["business_activity"],
-                business_description=state["business_description"],
-                assets=generated_assets,
-                potential_threats=ThreatItemCollection(threats=[]),
-            )
-            return business_state_new_structure
-
-        else:
-            logger.warning("Generated business is invalid. Retrying...")
-
-    if not are_assets_appropriate or not are_assets_appropriate.is_valid:
-        logger.error("Failed to generate a valid business after all retries.")
+        business_state_new_structure = BusinessState(
+            business_name=state["business_name"],
+            business_location=state["business_location"],
+            business_contact_info=state["business_contact_info"],
+            business_activity=state["business_activity"],
+            business_description=state["business_description"],
+            assets=generated_assets,
+            potential_threats=ThreatItemCollection(threats=[]),
+        )
+        return business_state_new_structure, True
 
-    return None
+    return run_validated_stage("assets_generation", attempt, max_retries)
 
 
 if __name__ == "__main__":
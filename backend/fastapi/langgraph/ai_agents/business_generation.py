@@ -2,8 +2,17 @@ from langchain_core.messages import HumanMessage
 from loguru import logger
 
 from ..prompts.business_generation_prompt import business_generation_prompt_message
-from ..helpers.file_operations import retrieve_input_file
-from ..helpers.model_config import fetch_model_from_ollama
+from ..helpers.file_operations import format_prompt_with_input_files
+from ..helpers.model_routing import get_routed_model
+from ..helpers.cancellation import RequestCancelledError
+from ..helpers.circuit_breaker import CircuitOpenError
+from ..helpers.retry_budget import run_validated_stage
+from ..helpers.scenario_dedup import (
+    SCENARIO_DEDUP_MAX_REGENERATIONS,
+    NearDuplicateError,
+    release_business,
+    reserve_business,
+)
 from ..helpers.graph_state_classes import (
     BusinessState,
     BusinessOnlyState,
@@ -19,96 +28,123 @@ from ..helpers.output_validation import (
 def generate_business(
     business_generation_prompt: str = business_generation_prompt_message,
     business_example_filename: str = "Business_ZenithPoint.txt",
-    llm_model_name: str = "llama3.2",
+    llm_model_name: str | None = None,
 ) -> BusinessOnlyState | None:
     """
     Generates a business idea, using a prompt template, and an example
     :param business_generation_prompt:
     :param business_example_filename:
-    :param llm_model_name:
+    :param llm_model_name: optional model pinned instead of the business_generation route's models
     :return:
     """
 
-    business_example_for_prompt_message = retrieve_input_file(
-        f"{business_example_filename}"
-    )
-
-    business_generation_formatted_prompt = business_generation_prompt.format(
-        example=business_example_for_prompt_message
-    )
-
     try:
-        ollama_llm = fetch_model_from_ollama(f"{llm_model_name}")
-        ollama_llm_with_structured_output = ollama_llm.with_structured_output(
-            BusinessOnlyState
+        # The example is filled in once and cached, not re-read on every attempt
+        business_generation_formatted_prompt = format_prompt_with_input_files(
+            business_generation_prompt, example=business_example_filename
+        ).format()
+
+        ollama_llm_with_structured_output = get_routed_model(
+            "business_generation", BusinessOnlyState, llm_model_name
         )
-        logger.info(f"{llm_model_name} fetched successfully for business generation")
 
-        ollama_llm_output = ollama_llm_with_structured_output.invoke(
-            [HumanMessage(content=business_generation_formatted_prompt)]
+        ollama_llm_output, model_name = (
+            ollama_llm_with_structured_output.invoke_with_model(
+                [HumanMessage(content=business_generation_formatted_prompt)]
+            )
         )
+        logger.info(f"Business generated with {model_name}")
         return ollama_llm_output
+    except (RequestCancelledError, CircuitOpenError):
+        raise
     except Exception as e:
-        logger.error(
-            f"Failed to produce output with {llm_model_name}. Details below:\n", e
-        )
+        logger.error(f"Failed to generate a business. Details below:\n{e}")
         return
 
 
-def get_validated_business(max_retries: int = 3) -> BusinessState | None:
+def get_validated_business(max_retries: int | None = None) -> BusinessState | None:
     """
-    Calls business generator and validator. Re-generates the business if the output is not satisfactory
-    :param max_retries: the max number of times business generator can be called to generate a new business if output is not satisfactory
+    Calls business generator and validator. Re-generates the business if the output is not satisfactory.
+    The business returned stays in the duplicate check index
+    :param max_retries: optional cap on the number of times business generator can be called. By default the number of attempts follows the stage's recent validator acceptance rate
     :return: the final business generator in a BusinessState format
     """
-    attempt = 0
-    is_business_legit = None
+    return reserve_validated_business(max_retries)[0]
 
-    while attempt < max_retries:
-        attempt += 1
-        logger.info(f"Business generation attempt {attempt}/{max_retries}")
 
-        business = generate_business()
+def reserve_validated_business(
+    max_retries: int | None = None,
+) -> tuple[BusinessState | None, str | None]:
+    """
+    Same as get_validated_business, for callers that may still drop the business, e.g. when its assets or
+    threats cannot be generated. They release the reservation with release_business if they do
+    :param max_retries: optional cap on the number of times business generator can be called
+    :return: the validated business and its duplicate check reservation (None if it was not reserved)
+    """
 
-        if not business:
-            logger.error("Failed to generate a business.")
-            break
+    # The duplicate check reservation and the accepted business of each attempt, by attempt number. Only the
+    # business returned stays indexed
+    reservations: dict[int, str | None] = {}
+    accepted: dict[int, BusinessState] = {}
 
-        business_state = BusinessOnlyState(
-            business_name=business.business_name,
-            business_location=business.business_location,
-            business_contact_info=business.business_contact_info,
-            business_activity=business.business_activity,
-            business_description=business.business_description,
-        )
+    def attempt(number: int) -> tuple[BusinessState | None, bool | None]:
+        # A near copy of an existing scenario is regenerated before it costs a validation, assets and threats.
+        # This does not count as a validator rejection
+        for _ in range(SCENARIO_DEDUP_MAX_REGENERATIONS):
+            business = generate_business()
 
-        is_business_legit = validate_generated_output(
-            prompt=create_business_validation_prompt(
-                original_prompt=business_generation_prompt_message,
-                generated_business=business_state,
-            )
-        )
+            if not business:
+                return None, None
 
-        if is_business_legit.is_valid:
-            logger.success("Generated a valid business.")
-            business_state_new_structure = BusinessState(
+            business_state = BusinessOnlyState(
                 business_name=business.business_name,
                 business_location=business.business_location,
                 business_contact_info=business.business_contact_info,
                 business_activity=business.business_activity,
                 business_description=business.business_description,
-                assets=AssetCollection(assets=[]),
-                potential_threats=ThreatItemCollection(threats=[]),
             )
-            return business_state_new_structure
-
+            dedup = reserve_business(business_state.model_dump())
+            if not dedup.duplicate_of:
+                reservations[number] = dedup.reservation
+                break
         else:
-            logger.warning("Generated business is invalid. Retrying...")
+            raise NearDuplicateError(
+                f"{SCENARIO_DEDUP_MAX_REGENERATIONS} near duplicates in a row, "
+                f"the last of {dedup.duplicate_of}"
+            )
 
-    if not is_business_legit or not is_business_legit.is_valid:
-        logger.error("Failed to generate a valid business after all retries.")
+        is_business_legit = validate_generated_output(
+            prompt=create_business_validation_prompt(
+                original_prompt=business_generation_prompt_message,
+                generated_business=business_state,
+            )
+        )
+        if not is_business_legit.is_valid:
+            return None, False
 
-    return None
+        business_state_new_structure = BusinessState(
+            business_name=business.business_name,
+            business_location=business.business_location,
+            business_contact_info=business.business_contact_info,
+            business_activity=business.business_activity,
+            business_description=business.business_description,
+            assets=AssetCollection(assets=[]),
+            potential_threats=ThreatItemCollection(threats=[]),
+        )
+        accepted[number] = business_state_new_structure
+        return business_state_new_structure, True
+
+    result = kept = None
+    try:
+        result = run_validated_stage("business_generation", attempt, max_retries)
+    finally:
+        # Rejected businesses, and accepted ones that lost a speculative round, are not served
+        for number, reservation in reservations.items():
+            if result is not None and accepted.get(number) is result:
+                kept = reservation
+            else:
+                release_business(reservation)
+    return result, kept
 
 
 if __name__ == "__main__":
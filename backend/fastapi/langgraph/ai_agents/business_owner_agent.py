@@ -1,12 +1,13 @@
 from loguru import logger
 from langgraph.graph import StateGraph, START, END, MessagesState
-from langchain_ollama import ChatOllama
 from langchain_core.messages import SystemMessage, HumanMessage, AIMessage, BaseMessage
 from typing import List, Dict
 from functools import partial
 
 from ..helpers.graph_state_classes import BusinessState, AssetCollection
-from ..helpers.model_config import fetch_model_from_ollama
+from ..helpers.model_routing import RoutedModel, get_routed_model
+from ..helpers.cancellation import RequestCancelledError
+from ..helpers.circuit_breaker import CircuitOpenError
 from ..helpers.output_validation import format_items_for_llm
 from ..prompts.business_owner_prompt import business_owner_prompt_message
 
@@ -26,7 +27,7 @@ def create_system_prompt(business: BusinessState):
 
 
 def business_owner_node(
-    state: MessagesState, business: BusinessState, llm: ChatOllama
+    state: MessagesState, business: BusinessState, llm: RoutedModel
 ) -> Dict[str, list]:
     """
     Invokes the LLM with the current state and returns the new AI message.
@@ -62,6 +63,8 @@ def business_owner_node(
 
         return {"messages": [response]}
 
+    except (RequestCancelledError, CircuitOpenError):
+        raise
     except Exception as e:
         logger.error(f"Error in business_owner_node: {e}")
         error_msg = AIMessage(
@@ -72,7 +75,7 @@ def business_owner_node(
 
 def create_business_owner_graph(business: BusinessState):
     """Creates a compiled LangGraph for the business owner chatbot."""
-    llm = fetch_model_from_ollama(model_name="llama3.2", temperature=0.7)
+    llm = get_routed_model("business_owner_chat")
 
     node_with_context = partial(business_owner_node, business=business, llm=llm)
 
@@ -141,6 +144,8 @@ def invoke_business_owner_chat(
 
         return response_messages
 
+    except (RequestCancelledError, CircuitOpenError):
+        raise
     except Exception as e:
         logger.error(f"Error in invoke_business_owner_chat: {e}")
         return [
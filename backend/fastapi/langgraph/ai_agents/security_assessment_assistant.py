@@ -1,22 +1,45 @@
 from langchain_core.messages import HumanMessage, ToolMessage, SystemMessage, AIMessage
 from langchain.schema import Document
+import os
 import re
+from concurrent.futures import ThreadPoolExecutor
 from loguru import logger
 from typing import List, Dict
-from functools import partial
+from functools import partial, lru_cache
 from langgraph.graph import StateGraph, START, END, MessagesState
 
 from ..prompts.security_assessment_assistant import (
     security_assessment_assistant_prompt_message,
 )
-from ..helpers.model_config import fetch_model_from_ollama
+from ..helpers.model_routing import RoutedModel
+from ..helpers.cancellation import RequestCancelledError, raise_if_cancelled
+from ..helpers.circuit_breaker import CircuitOpenError
+from ..helpers.scenario_cache import record_degraded_response
 from backend.fastapi.langgraph.helpers.vector_db_operations import (
     setup_vectorstore_saa,
     custom_numbered_header_split,
     load_markdown,
+    expand_to_parent_sections,
 )
+from backend.fastapi.langgraph.helpers.retrieval_snapshot import (
+    load_retrieval_snapshot,
+    build_section_map,
+)
+from backend.fastapi.langgraph.helpers.context_compression import (
+    compress_documents,
+    CONTEXT_TOKEN_BUDGET,
+    SECTION_CONTEXT_TOKEN_BUDGET,
+)
+from backend.fastapi.langgraph.helpers.stage_timings import time_stage
+from backend.fastapi.langgraph.helpers.tracing import in_current_context, span
 from langchain_core.tools.retriever import create_retriever_tool
 
+# Bounded pool shared by all requests, so concurrent tool calls cannot flood the embedding model
+_retrieval_pool = ThreadPoolExecutor(
+    max_workers=int(os.environ.get("RETRIEVAL_MAX_WORKERS", "4")),
+    thread_name_prefix="retriever",
+)
+
 
 def list_sections(split_docs: list[Document]) -> str:
     """Generate a formatted Markdown list of all available sections."""
@@ -37,11 +60,110 @@ def preprocess_query(query: str, section_map: dict) -> str:
     return query
 
 
+def explain_section_without_llm(query: str, split_docs: list[Document]) -> str | None:
+    """
+    The answer given while the model layer is down: the guide's own text for the section the query names
+    :return: the section's explanation, or None if the query does not name a section
+    """
+    match = re.search(r"section\s*(\d+)", query, re.IGNORECASE)
+    if not match:
+        return None
+    section = next(
+        (
+            doc
+            for doc in split_docs
+            if doc.metadata.get("section_number") == match.group(1)
+        ),
+        None,
+    )
+    if section is None:
+        return None
+    return (
+        "The assistant cannot answer questions right now, but here is what the guide says about "
+        f"*Section {section.metadata['section_number']}: {section.metadata['title']}*:\n\n{section.page_content}"
+    )
+
+
 def is_section_listing_query(query: str) -> bool:
     """Check if the query is asking for a list of sections."""
     return "list" in query.lower() and "section" in query.lower()
 
 
+def retrieve_documents_concurrently(
+    retriever, queries: list[str]
+) -> dict[str, list[Document]]:
+    """
+    Runs one retrieval per distinct query, in parallel when there is more than one. A query whose retrieval
+    fails gets no documents, without dropping the documents of the others
+    :param retriever: the vectorstore retriever
+    :param queries: the queries from the LLM's tool calls. Duplicates are only retrieved once
+    :return: the retrieved documents for each distinct query, in the order of the queries
+    :raises Exception: the first error, if every retrieval failed
+    """
+    unique_queries = list(dict.fromkeys(queries))
+
+    def retrieve(query: str) -> list[Document] | Exception:
+        raise_if_cancelled(f"the retrieval for {query!r}")
+        with span("retriever.invoke", query=query) as retrieval_span:
+            try:
+                docs = retriever.invoke(query)
+            except (RequestCancelledError, CircuitOpenError):
+                raise
+            except Exception as e:
+                retrieval_span.set(error=repr(e)[:300])
+                logger.warning(f"Retrieval failed for {query!r}: {e}")
+                return e
+            retrieval_span.set(documents=len(docs))
+            return docs
+
+    if len(unique_queries) == 1:
+        results = [retrieve(unique_queries[0])]
+    else:
+        # The pool's threads run the retrievals in the request's trace
+        results = list(
+            _retrieval_pool.map(in_current_context(retrieve), unique_queries)
+        )
+
+    errors = [result for result in results if isinstance(result, Exception)]
+    if errors and len(errors) == len(results):
+        raise errors[0]
+    return {
+        query: [] if isinstance(result, Exception) else result
+        for query, result in zip(unique_queries, results)
+    }
+
+
+def build_tool_messages(
+    tool_calls: list[dict], retrieved: dict[str, list[Document]]
+) -> list[ToolMessage]:
+    """
+    Creates one ToolMessage per tool call. A document retrieved by several calls is only included in the first one,
+    so the final prompt never contains the same section twice
+    """
+    tool_messages = []
+    already_included = set()
+
+    for tool_call in tool_calls:
+        new_docs = []
+        for doc in retrieved[tool_call["args"].get("query", "")]:
+            doc_key = doc.id or doc.page_content
+            if doc_key not in already_included:
+                already_included.add(doc_key)
+                new_docs.append(doc)
+
+        if new_docs:
+            content = "\n\n".join(doc.page_content for doc in new_docs)
+        elif retrieved[tool_call["args"].get("query", "")]:
+            content = (
+                "The relevant sections for this query were already retrieved above."
+            )
+        else:
+            content = "No sections of the guide could be retrieved for this query."
+        tool_messages.append(ToolMessage(content=content, tool_call_id=tool_call["id"]))
+
+    return tool_messages
+
+
 def _initialize_security_assistant(
     file_name: str = "security_assessment_doc",
     input_file_path: str = "backend/fastapi/langgraph/input_files/SecurityAssessmentTemplate-Guide.md",
@@ -49,34 +171,43 @@ def _initialize_security_assistant(
     persist_dir: str = "backend/chromadb_vectorstore",
 ):
     try:
-        vectorstore = setup_vectorstore_saa(
-            file_name=file_name,
-            persist_dir=persist_dir,
-            embedding_model=embedding_model,
-            input_file_path=input_file_path,
+        # 1. Prefer the prebuilt snapshot, it is memory-mapped instead of re-split and re-embedded
+        snapshot = load_retrieval_snapshot(
+            input_file_path=input_file_path, embedding_model=embedding_model
         )
+        if snapshot:
+            vectorstore, split_docs, section_map = snapshot
+        else:
+            vectorstore = setup_vectorstore_saa(
+                file_name=file_name,
+                persist_dir=persist_dir,
+                embedding_model=embedding_model,
+                input_file_path=input_file_path,
+            )
+            split_docs = custom_numbered_header_split(load_markdown(input_file_path))
+            section_map = build_section_map(split_docs)
 
-        # 2. Create retriever tool
-        retriever = create_retriever_tool(
-            retriever=vectorstore.as_retriever(
-                search_type="similarity", search_kwargs={"k": 3}
-            ),
+        # 2. Create retriever tool. The node runs the underlying retriever itself, so it can batch the tool calls
+        retriever = vectorstore.as_retriever(
+            search_type="similarity", search_kwargs={"k": 3}
+        )
+        retriever_tool = create_retriever_tool(
+            retriever=retriever,
             name="security_assessment_retriever",
             description="Use this tool to retrieve information from the security assessment and explain each section.",
         )
 
-        # 3. Create LLM with retriever tool
-        llm = fetch_model_from_ollama("llama3.2", temperature=0.2)
-
-        # 4. Get split_docs + section map using your existing splitting logic
-        split_docs = custom_numbered_header_split(load_markdown(input_file_path))
-        section_map = {
-            doc.metadata["section_number"]: doc.metadata["title"]
-            for doc in split_docs
-            if "section_number" in doc.metadata
-        }
+        # 3. Create the LLMs with the retriever tool. Deciding on tool calls and answering are routed separately,
+        # the answering model also needs the tool schema to read the tool messages
+        tool_decision_llm = RoutedModel(
+            "assistant_tool_decision",
+            prepare=lambda llm: llm.bind_tools([retriever_tool]),
+        )
+        answer_llm = RoutedModel(
+            "assistant_answer", prepare=lambda llm: llm.bind_tools([retriever_tool])
+        )
 
-        return llm.bind_tools([retriever]), retriever, split_docs, section_map
+        return tool_decision_llm, answer_llm, retriever, split_docs, section_map
 
     except Exception as e:
         logger.error(f"Error initializing security assistant context: {e}")
@@ -84,11 +215,17 @@ def _initialize_security_assistant(
 
 
 def security_assistant_node(
-    state: MessagesState, llm, retriever, split_docs, section_map
+    state: MessagesState,
+    tool_decision_llm,
+    answer_llm,
+    retriever,
+    split_docs,
+    section_map,
 ) -> Dict[str, list]:
     """
     Security assistant node that processes a single message and returns the response.
     """
+    timings = {}
     try:
         messages = state["messages"]
 
@@ -120,30 +257,66 @@ def security_assistant_node(
             messages = messages[:-1] + [HumanMessage(content=processed_query)]
 
         # Invoke LLM with all messages
-        response = llm.invoke(messages)
+        with time_stage(timings, "tool_decision"):
+            response = tool_decision_llm.invoke(messages)
         responses_to_add = []
 
         if hasattr(response, "tool_calls") and response.tool_calls:
             # Add the initial response with tool calls
             responses_to_add.append(response)
 
-            # Process each tool call
-            for tool_call in response.tool_calls:
-                tool_result = retriever.invoke(tool_call["args"])
-                tool_msg = ToolMessage(
-                    content=str(tool_result), tool_call_id=tool_call["id"]
+            # Run all tool calls in one retrieval round
+            with time_stage(timings, "retrieval"):
+                retrieved = retrieve_documents_concurrently(
+                    retriever,
+                    [
+                        tool_call["args"].get("query", "")
+                        for tool_call in response.tool_calls
+                    ],
                 )
-                responses_to_add.append(tool_msg)
+
+            # A question about a specific section gets the whole section, not just the matching sub-section chunks
+            if processed_query != user_input:
+                retrieved = {
+                    query: expand_to_parent_sections(docs, split_docs)
+                    for query, docs in retrieved.items()
+                }
+
+            # Keep only the passages relevant to each query, sharing the budget between queries
+            with time_stage(timings, "compression"):
+                budget_per_query = (
+                    SECTION_CONTEXT_TOKEN_BUDGET
+                    if processed_query != user_input
+                    else CONTEXT_TOKEN_BUDGET
+                ) // len(retrieved)
+                retrieved = {
+                    query: compress_documents(query, docs, budget_per_query)
+                    for query, docs in retrieved.items()
+                }
+            responses_to_add.extend(build_tool_messages(response.tool_calls, retrieved))
 
             # Get final response after tool calls
-            final_response = llm.invoke(messages + responses_to_add)
+            with time_stage(timings, "final_answer"):
+                final_response = answer_llm.invoke(messages + responses_to_add)
             responses_to_add.append(final_response)
+
+            usage = getattr(final_response, "usage_metadata", None) or {}
+            timings["final_prompt_tokens"] = usage.get("input_tokens")
         else:
             # No tool calls, just add the response
             responses_to_add.append(response)
 
+        logger.info(f"Security assistant stage timings (ms): {timings}")
         return {"messages": responses_to_add}
 
+    except RequestCancelledError:
+        raise
+    except CircuitOpenError:
+        explanation = explain_section_without_llm(user_input, split_docs)
+        if explanation is None:
+            raise
+        record_degraded_response("section_explanation")
+        return {"messages": [AIMessage(content=explanation)]}
     except Exception as e:
         logger.error(f"Error in security_assistant_node: {e}")
         error_msg = AIMessage(
@@ -152,15 +325,19 @@ def security_assistant_node(
         return {"messages": [error_msg]}
 
 
+@lru_cache(maxsize=1)
 def create_security_assistant_graph():
-    """Creates a compiled LangGraph for the security assistant chatbot."""
+    """Creates a compiled LangGraph for the security assistant chatbot. Built once and shared by all requests."""
     try:
-        llm, retriever, split_docs, section_map = _initialize_security_assistant()
+        tool_decision_llm, answer_llm, retriever, split_docs, section_map = (
+            _initialize_security_assistant()
+        )
 
         # Create node with context using partial
         node_with_context = partial(
             security_assistant_node,
-            llm=llm,
+            tool_decision_llm=tool_decision_llm,
+            answer_llm=answer_llm,
             retriever=retriever,
             split_docs=split_docs,
             section_map=section_map,
@@ -242,6 +419,8 @@ def invoke_security_assistant_chat(
 
         return response_messages
 
+    except (RequestCancelledError, CircuitOpenError):
+        raise
     except Exception as e:
         logger.error(f"Error in invoke_security_assistant_chat: {e}")
         return [
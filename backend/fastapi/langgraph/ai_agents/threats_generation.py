@@ -1,6 +1,9 @@
 from loguru import logger
 from ..helpers.graph_state_classes import BusinessState, ThreatItemCollection
-from ..helpers.model_config import fetch_model_from_ollama
+from ..helpers.model_routing import get_routed_model
+from ..helpers.cancellation import RequestCancelledError
+from ..helpers.circuit_breaker import CircuitOpenError
+from ..helpers.retry_budget import run_validated_stage
 from ..helpers.output_validation import (
     validate_generated_output,
     create_threats_validation_prompt,
@@ -10,12 +13,12 @@ from ..prompts.threats_generation_prompt import threat_generator_prompt_message
 
 
 def generate_threats(
-    state: BusinessState, llm_model_name: str = "llama3.2"
+    state: BusinessState, llm_model_name: str | None = None
 ) -> ThreatItemCollection | BusinessState:
     """
     Generates potential threats for a business based on business description, activities, and assets
     :param state: the business state object containing all the business information
-    :param llm_model_name: the name of the model to be used for this task, which refers to a model on ollama model registry
+    :param llm_model_name: optional model pinned instead of the threats_generation route's models, which refers to a model on ollama model registry
     :return: the generated threats, or the previous state if there was an error
     """
     formatted_assets = format_items_for_llm(state["assets"])
@@ -27,16 +30,18 @@ def generate_threats(
     )
 
     try:
-        llm_model = fetch_model_from_ollama(model_name=f"{llm_model_name}")
-        llm_model_structured_output = llm_model.with_structured_output(
-            ThreatItemCollection
+        llm_model_structured_output = get_routed_model(
+            "threats_generation", ThreatItemCollection, llm_model_name
         )
-        logger.info(f"{llm_model_name} fetched successfully for threats generation")
 
-        generated_threats = llm_model_structured_output.invoke(prompt)
-        logger.info("Successfully generated threats.")
+        generated_threats, model_name = llm_model_structured_output.invoke_with_model(
+            prompt
+        )
+        logger.info(f"Successfully generated threats with {model_name}.")
         return generated_threats
 
+    except (RequestCancelledError, CircuitOpenError):
+        raise
     except Exception as e:
         logger.error(
             f"There was an error while generating threats. Details below: \n{e}"
@@ -45,26 +50,24 @@ def generate_threats(
 
 
 def get_validated_threats(
-    state: BusinessState, max_retries: int = 3
+    state: BusinessState, max_retries: int | None = None
 ) -> BusinessState | None:
     """
     Calls threat generator and validator. Re-generates the threats if the output is not satisfactory
     :param state: previously generated business for which the threats will be generated
-    :param max_retries: the max number of times business generator can be called to generate a new business if output is not satisfactory
+    :param max_retries: optional cap on the number of times threat generator can be called. By default the number of attempts follows the stage's recent validator acceptance rate
     :return: the final business generator in a BusinessState format
     """
-    attempt = 0
-    are_threats_appropriate = None
-
-    while attempt < max_retries:
-        attempt += 1
-        logger.info(f"Threats generation attempt {attempt}/{max_retries}")
 
+    def attempt(_: int) -> tuple[BusinessState | None, bool | None]:
         generated_threats = generate_threats(state)
 
-        if not generated_threats.threats:
-            logger.error("Failed to generate a threats.")
-            break
+        # generate_threats gives the state back when generation fails
+        if (
+            not isinstance(generated_threats, ThreatItemCollection)
+            or not generated_threats.threats
+        ):
+            return None, None
 
         formatted_threats = format_items_for_llm(generated_threats)
 
@@ -74,28 +77,21 @@ def get_validated_threats(
                 generated_threats=formatted_threats,
             )
         )
+        if not are_threats_appropriate.is_valid:
+            return None, False
+
+        business_state_new_structure = BusinessState(
+            business_name=state["business_name"],
+            business_location=state["business_location"],
+            business_contact_info=state["business_contact_info"],
+            business_activity=state["business_activity"],
+            business_description=state["business_description"],
+            assets=state["assets"],
+            potential_threats=generated_threats,
+        )
+        return business_state_new_structure, True
 
-        if are_threats_appropriate.is_valid:
-            logger.success("Generated sensible threats.")
-
-            business_state_new_structure = BusinessState(
-                business_name=state["business_name"],
-                business_location=state["business_location"],
-                business_contact_info=state["business_contact_info"],
-                business_activity=state["business_activity"],
-                business_description=state["business_description"],
-                assets=state["assets"],
-                potential_threats=generated_threats,
-            )
-            return business_state_new_structure
-
-        else:
-            logger.warning("Generated business is invalid. Retrying...")
-
-    if not are_threats_appropriate or not are_threats_appropriate.is_valid:
-        logger.error("Failed to generate a valid business after all retries.")
-
-    return None
+    return run_validated_stage("threats_generation", attempt, max_retries)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,203 @@
+import argparse
+import json
+import time
+from typing import Iterable, Iterator
+
+from loguru import logger
+
+from backend.fastapi.langgraph.helpers.graph_state_classes import BusinessState
+from backend.fastapi.langgraph.helpers.chroma_client_registry import (
+    delete_chroma_collection,
+    get_chroma_client,
+    get_chroma_collection,
+)
+from backend.fastapi.langgraph.helpers.quantized_index import update_quantized_index
+from backend.fastapi.langgraph.helpers.vector_db_operations import (
+    BUSINESS_PROFILES_COLLECTION,
+    business_profile_id,
+    sanitize_chroma_collection_name,
+    flatten_business_state,
+    embed_texts,
+)
+
+
+def iter_business_states_from_jsonl(file_path: str) -> Iterator[BusinessState]:
+    """
+    Streams business states from a JSONL file, one business per line. Malformed lines are skipped
+    :param file_path: path to the JSONL file
+    :return: an iterator over the business states in the file
+    """
+    with open(file_path, "r", encoding="utf-8") as f:
+        for line_number, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError as e:
+                logger.warning(f"Skipping malformed line {line_number}: {e}")
+
+
+def _write_batch(collection, documents: dict[str, tuple[str, list]]) -> None:
+    ids = list(documents)
+    collection.upsert(
+        ids=ids,
+        documents=[documents[doc_id][0] for doc_id in ids],
+        embeddings=[documents[doc_id][1] for doc_id in ids],
+    )
+
+
+def ingest_business_profiles_bulk(
+    business_states: Iterable[BusinessState],
+    db_path: str = "../chromadb_vectorstore",
+    collection_name: str = BUSINESS_PROFILES_COLLECTION,
+    embedding_model: str = "mxbai-embed-large",
+    embed_batch_size: int = 64,
+    write_batch_size: int = 1024,
+) -> dict:
+    """
+    Ingests many business profiles into the collection ingest_business_profile writes to, under the same ids.
+    Businesses are embedded in batches with one request per batch, and written to Chroma in large upserts,
+    so re-running the same file is idempotent
+    :param business_states: any iterable of business states, e.g. iter_business_states_from_jsonl
+    :param db_path: path to the ChromaDB directory
+    :param collection_name: the collection receiving the profiles. Created if it does not exist
+    :param embedding_model: Ollama model name for embeddings
+    :param embed_batch_size: number of businesses per embedding request
+    :param write_batch_size: number of businesses per Chroma upsert
+    :return: counts of ingested and skipped businesses, and the elapsed time in seconds
+    """
+    collection_name = sanitize_chroma_collection_name(collection_name)
+    collection = get_chroma_collection(db_path, collection_name)
+    write_batch_size = min(
+        write_batch_size, get_chroma_client(db_path).get_max_batch_size()
+    )
+
+    stats = {"ingested": 0, "skipped": 0}
+    pending_embeddings: list[tuple[str, str]] = []
+    # Keyed by id so a business appearing twice in one batch does not break the upsert
+    pending_writes: dict[str, tuple[str, list]] = {}
+    start_time = time.perf_counter()
+
+    def flush_embeddings():
+        if not pending_embeddings:
+            return
+        embeddings = embed_texts(
+            [flat for _, flat in pending_embeddings], embedding_function=embedding_model
+        )
+        if not embeddings or len(embeddings) != len(pending_embeddings):
+            logger.warning(
+                f"Failed to embed a batch of {len(pending_embeddings)} businesses."
+            )
+            stats["skipped"] += len(pending_embeddings)
+        else:
+            for (doc_id, flat), embedding in zip(pending_embeddings, embeddings):
+                pending_writes[doc_id] = (flat, embedding)
+        pending_embeddings.clear()
+
+    def flush_writes():
+        if not pending_writes:
+            return
+        _write_batch(collection, pending_writes)
+        update_quantized_index(
+            db_path,
+            collection_name,
+            list(pending_writes),
+            [embedding for _, embedding in pending_writes.values()],
+        )
+        stats["ingested"] += len(pending_writes)
+        elapsed = time.perf_counter() - start_time
+        logger.info(
+            f"Ingested {stats['ingested']} businesses into {collection_name} "
+            f"({stats['ingested'] / elapsed:.1f}/s)"
+        )
+        pending_writes.clear()
+
+    for business_state in business_states:
+        flat_business = flatten_business_state(business_state)
+        if not flat_business:
+            stats["skipped"] += 1
+            continue
+
+        pending_embeddings.append((business_profile_id(business_state), flat_business))
+        if len(pending_embeddings) >= embed_batch_size:
+            flush_embeddings()
+        if len(pending_writes) >= write_batch_size:
+            flush_writes()
+
+    flush_embeddings()
+    flush_writes()
+
+    stats["elapsed_seconds"] = round(time.perf_counter() - start_time, 2)
+    logger.success(f"Bulk ingestion finished: {stats}")
+    return stats
+
+
+def migrate_business_profile_collections(
+    db_path: str = "../chromadb_vectorstore",
+    collection_name: str = BUSINESS_PROFILES_COLLECTION,
+) -> int:
+    """
+    Moves the profiles ingest_business_profile used to write to a collection of their own, named after the
+    business, into the shared profiles collection. A legacy collection holds a single document whose id is
+    the collection name; other collections (the guide, the scenario dedup index) are left alone
+    :param db_path: path to the ChromaDB directory
+    :param collection_name: the shared profiles collection
+    :return: the number of profiles moved
+    """
+    collection_name = sanitize_chroma_collection_name(collection_name)
+    target = get_chroma_collection(db_path, collection_name)
+    moved = 0
+    for collection in get_chroma_client(db_path).list_collections():
+        if collection.name == collection_name or collection.count() != 1:
+            continue
+        profile = collection.get(include=["documents", "embeddings"])
+        doc_id = profile["ids"][0]
+        if sanitize_chroma_collection_name(doc_id) != collection.name:
+            continue
+        target.upsert(
+            ids=[doc_id],
+            documents=profile["documents"],
+            embeddings=profile["embeddings"],
+        )
+        update_quantized_index(
+            db_path, collection_name, [doc_id], profile["embeddings"]
+        )
+        delete_chroma_collection(db_path, collection.name)
+        moved += 1
+    logger.info(f"Moved {moved} business profiles into {collection_name}")
+    return moved
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Bulk ingest generated business scenarios from a JSONL file into ChromaDB"
+    )
+    parser.add_argument("jsonl_file", help="JSONL file with one BusinessState per line")
+    parser.add_argument("--db-path", default="backend/chromadb_vectorstore")
+    parser.add_argument("--collection", default=BUSINESS_PROFILES_COLLECTION)
+    parser.add_argument("--embedding-model", default="mxbai-embed-large")
+    parser.add_argument("--embed-batch-size", type=int, default=64)
+    parser.add_argument("--write-batch-size", type=int, default=1024)
+    parser.add_argument(
+        "--migrate-legacy",
+        action="store_true",
+        help="first move profiles stored in a collection per business into the shared collection",
+    )
+    args = parser.parse_args()
+
+    if args.migrate_legacy:
+        migrate_business_profile_collections(args.db_path, args.collection)
+
+    ingest_business_profiles_bulk(
+        iter_business_states_from_jsonl(args.jsonl_file),
+        db_path=args.db_path,
+        collection_name=args.collection,
+        embedding_model=args.embedding_model,
+        embed_batch_size=args.embed_batch_size,
+        write_batch_size=args.write_batch_size,
+    )
+
+
+if __name__ == "__main__":
+    main()
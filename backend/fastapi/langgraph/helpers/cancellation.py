@@ -0,0 +1,157 @@
+import asyncio
+import contextvars
+import threading
+from contextlib import contextmanager
+from typing import Any, Iterator
+
+from langchain_core.callbacks import BaseCallbackHandler, BaseCallbackManager
+from loguru import logger
+
+from backend.fastapi.langgraph.helpers.metrics import CANCELLED_REQUESTS
+from backend.fastapi.langgraph.helpers.tracing import set_span_attributes
+
+# Set when the client of the request being served disconnects. The pipeline checks it between LLM calls,
+# attempts and retries, and in-flight LLM calls check it on every generated token
+current_cancellation: contextvars.ContextVar[threading.Event | None] = (
+    contextvars.ContextVar("current_cancellation", default=None)
+)
+
+
+class RequestCancelledError(Exception):
+    """The client of the request disconnected, so the work left for it is abandoned."""
+
+
+class LinkedCancellation(threading.Event):
+    """A cancellation event that is also set while its parent is, e.g. one attempt of a cancellable request."""
+
+    def __init__(self, parent: threading.Event | None):
+        super().__init__()
+        self.parent = parent
+
+    def is_set(self) -> bool:
+        return super().is_set() or (self.parent is not None and self.parent.is_set())
+
+
+def linked_cancellation() -> LinkedCancellation:
+    """A cancellation event for part of the current work: setting it cancels only that part."""
+    return LinkedCancellation(current_cancellation.get())
+
+
+@contextmanager
+def cancellation_scope(event: threading.Event) -> Iterator[threading.Event]:
+    """Makes the work done in the block, and in the threads it submits with in_current_context, cancellable by the event."""
+    token = current_cancellation.set(event)
+    try:
+        yield event
+    finally:
+        current_cancellation.reset(token)
+
+
+def is_cancelled() -> bool:
+    event = current_cancellation.get()
+    return event is not None and event.is_set()
+
+
+def raise_if_cancelled(where: str) -> None:
+    """
+    Stops the current request's work if its client disconnected
+    :param where: what was about to start, for the logs
+    :raises RequestCancelledError: if the client disconnected
+    """
+    if is_cancelled():
+        set_span_attributes(cancelled=True)
+        raise RequestCancelledError(f"Client disconnected, skipped {where}")
+
+
+class _CancelOnToken(BaseCallbackHandler):
+    """
+    Aborts an LLM call between two generated tokens once the request is cancelled. ChatOllama streams from
+    Ollama even for invoke, so the exception closes the HTTP stream and Ollama stops generating
+    """
+
+    raise_error = True
+
+    def __init__(self, event: threading.Event):
+        self.event = event
+
+    def on_llm_new_token(self, token: str, **kwargs: Any) -> None:
+        if self.event.is_set():
+            raise RequestCancelledError("Client disconnected, aborted the LLM call")
+
+
+def with_cancellation(config: dict | None) -> dict | None:
+    """Adds the callback aborting the LLM call on cancellation to a runnable config, when the request is cancellable."""
+    event = current_cancellation.get()
+    if event is None:
+        return config
+    config = dict(config or {})
+    callbacks = config.get("callbacks")
+    if isinstance(callbacks, BaseCallbackManager):
+        callbacks = callbacks.copy()
+        callbacks.add_handler(_CancelOnToken(event), inherit=True)
+        config["callbacks"] = callbacks
+    else:
+        config["callbacks"] = [*(callbacks or []), _CancelOnToken(event)]
+    return config
+
+
+class CancelOnDisconnectMiddleware:
+    """
+    ASGI middleware watching every HTTP request for a client disconnect, e.g. a closed tab or a client
+    timeout, and cancelling the work left for it. The request body is read first and replayed to the app,
+    so the disconnect can be awaited while the route runs
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        body_messages = []
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return
+            body_messages.append(message)
+            if not message.get("more_body", False):
+                break
+
+        event = threading.Event()
+        disconnected = asyncio.Event()
+        response_sent = False
+
+        async def watch_disconnect():
+            while (await receive())["type"] != "http.disconnect":
+                pass
+            disconnected.set()
+            # Servers also report a disconnect once the response is complete
+            if not response_sent:
+                event.set()
+                CANCELLED_REQUESTS.inc(endpoint=scope["path"])
+                logger.warning(
+                    f"Client disconnected from {scope['method']} {scope['path']}, cancelling its work"
+                )
+
+        async def replay_receive():
+            if body_messages:
+                return body_messages.pop(0)
+            await disconnected.wait()
+            return {"type": "http.disconnect"}
+
+        async def send_and_track(message):
+            nonlocal response_sent
+            if message["type"] == "http.response.body" and not message.get(
+                "more_body", False
+            ):
+                response_sent = True
+            await send(message)
+
+        watcher = asyncio.create_task(watch_disconnect())
+        try:
+            with cancellation_scope(event):
+                await self.app(scope, replay_receive, send_and_track)
+        finally:
+            watcher.cancel()
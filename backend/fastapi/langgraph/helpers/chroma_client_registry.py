@@ -0,0 +1,132 @@
+import os
+import atexit
+import threading
+import time
+
+from chromadb import PersistentClient
+from chromadb.api import ClientAPI
+from chromadb.api.models.Collection import Collection
+from loguru import logger
+
+from backend.fastapi.langgraph.helpers.metrics import record_cache_lookup
+from backend.fastapi.langgraph.helpers.tracing import span
+
+# Clients are expensive to open (sqlite + HNSW segments), so they are shared by the whole process
+_clients: dict[str, ClientAPI] = {}
+_collections: dict[tuple[str, str], Collection] = {}
+_last_health_check: dict[str, float] = {}
+_registry_lock = threading.RLock()
+
+HEALTH_CHECK_INTERVAL_SECONDS = 30.0
+
+
+def _normalize_db_path(db_path: str) -> str:
+    return os.path.abspath(db_path)
+
+
+def _is_client_healthy(client: ClientAPI) -> bool:
+    try:
+        client.heartbeat()
+        return True
+    except Exception as e:
+        logger.warning(f"Chroma client failed its health check: {e}")
+        return False
+
+
+def get_chroma_client(db_path: str) -> ClientAPI:
+    """
+    Returns the shared Chroma client for a database path, opening it on first use.
+    Cached clients are health checked at most every HEALTH_CHECK_INTERVAL_SECONDS and re-opened if broken
+    :param db_path: path to the ChromaDB directory
+    :return: the process-wide Chroma client for that path
+    """
+    path = _normalize_db_path(db_path)
+
+    with _registry_lock:
+        client = _clients.get(path)
+        now = time.monotonic()
+
+        if client is not None:
+            if now - _last_health_check.get(path, 0.0) < HEALTH_CHECK_INTERVAL_SECONDS:
+                return client
+            _last_health_check[path] = now
+            if _is_client_healthy(client):
+                return client
+            _drop_client(path)
+
+        logger.info(f"Opening Chroma client at {path}")
+        client = PersistentClient(path=path)
+        _clients[path] = client
+        _last_health_check[path] = now
+        return client
+
+
+def get_chroma_collection(db_path: str, collection_name: str) -> Collection:
+    """
+    Returns the shared handle of a collection, creating the collection if it does not exist yet
+    :param db_path: path to the ChromaDB directory
+    :param collection_name: an already sanitized collection name
+    :return: the Chroma collection handle
+    """
+    path = _normalize_db_path(db_path)
+    key = (path, collection_name)
+
+    with _registry_lock:
+        client = get_chroma_client(path)
+        collection = _collections.get(key)
+        record_cache_lookup("chroma_collection", collection is not None)
+        if collection is not None:
+            return collection
+
+        with span("chroma.get_or_create_collection", collection=collection_name):
+            collection = client.get_or_create_collection(collection_name)
+        _collections[key] = collection
+        return collection
+
+
+def delete_chroma_collection(db_path: str, collection_name: str) -> None:
+    """Deletes a collection and forgets its shared handle, so a later get_chroma_collection creates it anew."""
+    path = _normalize_db_path(db_path)
+    with _registry_lock:
+        _collections.pop((path, collection_name), None)
+        with span("chroma.delete_collection", collection=collection_name):
+            get_chroma_client(path).delete_collection(collection_name)
+
+
+def check_chroma_clients() -> dict[str, bool]:
+    """Runs a health check on every open client. Returns the health status per database path."""
+    with _registry_lock:
+        return {path: _is_client_healthy(client) for path, client in _clients.items()}
+
+
+def _drop_client(path: str) -> None:
+    _clients.pop(path, None)
+    _last_health_check.pop(path, None)
+    for key in [key for key in _collections if key[0] == path]:
+        del _collections[key]
+
+
+def close_chroma_clients(quiet: bool = False) -> None:
+    """
+    Releases every open client and collection handle. Called at the app's shutdown, and again at interpreter
+    exit for the CLIs
+    :param quiet: log nothing. At interpreter exit the log sinks (e.g. pytest's captured streams) may be closed
+    """
+    with _registry_lock:
+        if not _clients:
+            return
+
+        for path in list(_clients):
+            client = _clients[path]
+            _drop_client(path)
+            try:
+                client.clear_system_cache()
+            except Exception as e:
+                if not quiet:
+                    logger.warning(f"Failed to close Chroma client at {path}: {e}")
+
+        if not quiet:
+            logger.info("Closed all Chroma clients")
+
+
+atexit.register(close_chroma_clients, quiet=True)
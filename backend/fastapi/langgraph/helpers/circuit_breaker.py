@@ -0,0 +1,172 @@
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Callable, Iterator
+
+from loguru import logger
+
+from backend.fastapi.langgraph.helpers.metrics import CIRCUIT_REJECTED_CALLS
+
+# Recent model-layer calls the error rate is computed over
+CIRCUIT_WINDOW_SIZE = int(os.environ.get("CIRCUIT_WINDOW_SIZE", "20"))
+# Share of failed or slow calls in the window that opens the circuit
+CIRCUIT_FAILURE_RATE = float(os.environ.get("CIRCUIT_FAILURE_RATE", "0.5"))
+# A call that succeeds but takes longer than this counts as failed: Ollama is overloaded. Routes generating
+# many tokens set their own limit (slow_call_seconds)
+CIRCUIT_SLOW_CALL_SECONDS = float(os.environ.get("CIRCUIT_SLOW_CALL_SECONDS", "90"))
+# How long an open circuit fails fast before letting a probe call through
+CIRCUIT_OPEN_SECONDS = float(os.environ.get("CIRCUIT_OPEN_SECONDS", "30"))
+
+# Fewer calls than this do not say much about the error rate, e.g. right after startup
+MIN_CALLS_TO_OPEN = 5
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+
+class CircuitOpenError(RuntimeError):
+    """A call was refused without being made, because the circuit of the layer it needs is open."""
+
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"The {name} circuit is open, retry in {retry_after:.0f}s")
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """
+    Fails calls fast while a dependency is down or overloaded, instead of letting every request wait for its
+    timeout. Closed, calls go through and their failures and latencies are tracked. Once too many of the
+    recent calls failed or were slow, the circuit opens and calls are refused. After CIRCUIT_OPEN_SECONDS,
+    half open, a single probe call goes through: it closes the circuit if it succeeds, or opens it again
+    """
+
+    def __init__(
+        self,
+        name: str,
+        is_failure: Callable[[BaseException], bool],
+        ignored: tuple[type[BaseException], ...] = (),
+    ):
+        """
+        :param name: the protected layer, for the logs and metrics
+        :param is_failure: whether an error says the layer is unhealthy. Other errors (a bad request, an
+            unparsable output) count as answered calls
+        :param ignored: errors that say nothing about the layer, e.g. the caller giving up. Not recorded
+        """
+        self.name = name
+        self.is_failure = is_failure
+        self.ignored = ignored
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.times_opened = 0
+        # True for the calls that failed or were slow
+        self._outcomes: deque[bool] = deque(maxlen=CIRCUIT_WINDOW_SIZE)
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def retry_after(self) -> float:
+        """Seconds until an open circuit lets a probe call through, 0 if it is not open."""
+        if self.state != OPEN:
+            return 0.0
+        return max(0.0, self.opened_at + CIRCUIT_OPEN_SECONDS - time.monotonic())
+
+    def _open(self) -> None:
+        self.state = OPEN
+        self.opened_at = time.monotonic()
+        self.times_opened += 1
+        self._probing = False
+
+    def _admit(self) -> bool:
+        """Lets a call through or raises CircuitOpenError. Returns whether the call is the half-open probe."""
+        with self._lock:
+            if self.state == OPEN and self.retry_after() == 0:
+                self.state = HALF_OPEN
+                logger.info(f"The {self.name} circuit is half open, probing")
+            if self.state == CLOSED:
+                return False
+            if self.state == HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            retry_after = self.retry_after() or CIRCUIT_OPEN_SECONDS
+        CIRCUIT_REJECTED_CALLS.inc(circuit=self.name)
+        raise CircuitOpenError(self.name, retry_after)
+
+    def _record(self, failed: bool, is_probe: bool) -> None:
+        with self._lock:
+            if is_probe:
+                if failed:
+                    self._open()
+                    logger.warning(
+                        f"The {self.name} probe failed, the circuit opens again"
+                    )
+                else:
+                    self.state = CLOSED
+                    self._probing = False
+                    self._outcomes.clear()
+                    logger.success(
+                        f"The {self.name} probe succeeded, the circuit is closed"
+                    )
+                return
+            if self.state != CLOSED:
+                # A call admitted before the circuit opened, its outcome is outdated
+                return
+
+            self._outcomes.append(failed)
+            failures = sum(self._outcomes)
+            if (
+                len(self._outcomes) >= MIN_CALLS_TO_OPEN
+                and failures / len(self._outcomes) >= CIRCUIT_FAILURE_RATE
+            ):
+                self._open()
+                logger.error(
+                    f"The {self.name} circuit opens: {failures} of the last {len(self._outcomes)} calls failed "
+                    f"or were slow. Calls fail fast for {CIRCUIT_OPEN_SECONDS:.0f}s"
+                )
+
+    def _release_probe(self) -> None:
+        with self._lock:
+            self._probing = False
+
+    @contextmanager
+    def guard(self, slow_call_seconds: float | None = None) -> Iterator[None]:
+        """
+        Runs the block as a call through the circuit
+        :param slow_call_seconds: the duration from which the call counts as failed, CIRCUIT_SLOW_CALL_SECONDS by
+            default. Calls generating many tokens take longer on a healthy server, e.g. on a CPU
+        :raises CircuitOpenError: if the circuit is open, before the block runs
+        """
+        slow_call_seconds = slow_call_seconds or CIRCUIT_SLOW_CALL_SECONDS
+        is_probe = self._admit()
+        start_time = time.perf_counter()
+        try:
+            yield
+        except BaseException as e:
+            if isinstance(e, self.ignored) or not isinstance(e, Exception):
+                if is_probe:
+                    # The next call probes instead
+                    self._release_probe()
+            elif self.is_failure(e):
+                self._record(True, is_probe)
+            else:
+                self._record(
+                    time.perf_counter() - start_time > slow_call_seconds, is_probe
+                )
+            raise
+        self._record(time.perf_counter() - start_time > slow_call_seconds, is_probe)
+
+    def raise_if_open(self) -> None:
+        """For calls already admitted but still waiting to start: gives up once the circuit is open."""
+        if self.state == OPEN:
+            raise CircuitOpenError(
+                self.name, self.retry_after() or CIRCUIT_OPEN_SECONDS
+            )
+
+    def status(self) -> dict:
+        with self._lock:
+            return {
+                "state": self.state,
+                "retry_after_seconds": round(self.retry_after(), 1),
+                "recent_calls": len(self._outcomes),
+                "recent_failures": sum(self._outcomes),
+                "times_opened": self.times_opened,
+            }
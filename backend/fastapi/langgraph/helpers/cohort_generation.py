@@ -0,0 +1,264 @@
+import argparse
+import json
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from loguru import logger
+from pydantic import BaseModel
+
+from backend.fastapi.langgraph.ai_agents.assets_generation import get_validated_assets
+from backend.fastapi.langgraph.ai_agents.business_generation import (
+    reserve_validated_business,
+)
+from backend.fastapi.langgraph.ai_agents.threats_generation import (
+    get_validated_threats,
+)
+from backend.fastapi.langgraph.helpers.circuit_breaker import CircuitOpenError
+from backend.fastapi.langgraph.helpers.graph_state_classes import BusinessState
+from backend.fastapi.langgraph.helpers.model_routing import get_stage_run_stats
+from backend.fastapi.langgraph.helpers.scenario_dedup import release_business
+from backend.fastapi.langgraph.helpers.ollama_backend_pool import (
+    OLLAMA_MAX_CONCURRENCY_PER_BACKEND,
+    ollama_pool,
+)
+from backend.fastapi.langgraph.helpers.token_accounting import get_token_usage
+
+# Seconds between two progress lines
+PROGRESS_INTERVAL_SECONDS = 10.0
+
+
+def scenario_to_json(state: BusinessState) -> dict:
+    """A generated scenario as plain JSON, the format bulk_ingestion reads back."""
+    return {
+        key: value.model_dump() if isinstance(value, BaseModel) else value
+        for key, value in state.items()
+    }
+
+
+def load_checkpoint(output_path: str) -> list[dict]:
+    """
+    Reads the scenarios an earlier run already wrote. A line cut off by an interrupted run is dropped from the
+    file, and a last scenario missing its newline gets one, so the run appends after the last complete scenario
+    :param output_path: the JSONL output file
+    :return: the complete scenarios in the file
+    """
+    if not os.path.exists(output_path):
+        return []
+
+    scenarios, dropped, line = [], 0, "\n"
+    with open(output_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                scenarios.append(json.loads(line))
+            except json.JSONDecodeError:
+                dropped += 1
+    if dropped:
+        logger.warning(f"Dropping {dropped} incomplete lines from {output_path}")
+    if dropped or not line.endswith("\n"):
+        # Appending right after a line with no newline would merge the next scenario into it
+        with open(output_path, "w", encoding="utf-8") as f:
+            f.writelines(json.dumps(scenario) + "\n" for scenario in scenarios)
+    return scenarios
+
+
+class _BusinessNames:
+    """The names of the businesses written or being generated, so that each business of a cohort is distinct."""
+
+    def __init__(self, names):
+        self._names = {name.strip().lower() for name in names}
+        self._lock = threading.Lock()
+
+    def reserve(self, name: str) -> bool:
+        with self._lock:
+            if name.strip().lower() in self._names:
+                return False
+            self._names.add(name.strip().lower())
+            return True
+
+    def release(self, name: str) -> None:
+        with self._lock:
+            self._names.discard(name.strip().lower())
+
+
+def generate_scenario(names: _BusinessNames) -> tuple[str, BusinessState | None]:
+    """
+    Runs the business, assets and threats stages for one scenario
+    :param names: the businesses already in the cohort. A business with one of their names is not carried on
+        to the assets and threats stages
+    :return: the outcome ("generated", "duplicate" or "failed") and the scenario if it was generated
+    """
+    business, reservation = reserve_validated_business()
+    if not business:
+        return "failed", None
+    if not names.reserve(business["business_name"]):
+        release_business(reservation)
+        return "duplicate", None
+
+    scenario = None
+    try:
+        business_with_assets = get_validated_assets(business)
+        scenario = business_with_assets and get_validated_threats(business_with_assets)
+    finally:
+        # Also when a stage raises, e.g. on an open circuit, so the business can be generated again instead of
+        # being a near duplicate of a scenario that was never written
+        if not scenario:
+            names.release(business["business_name"])
+            release_business(reservation)
+    if not scenario:
+        return "failed", None
+    return "generated", scenario
+
+
+def _run_worker(names: _BusinessNames) -> tuple[str, BusinessState | None]:
+    try:
+        return generate_scenario(names)
+    except CircuitOpenError as e:
+        # Ollama is down or overloaded. Starting another scenario right away would only be refused too. A wait,
+        # not a failure: the scenario is generated again once the circuit lets calls through
+        logger.warning(f"{e}, the worker pauses")
+        time.sleep(e.retry_after)
+        return "paused", None
+    except Exception as e:
+        logger.error(f"Scenario generation failed: {e}")
+        return "failed", None
+
+
+def _format_duration(seconds: float) -> str:
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return (
+        f"{hours}h{minutes:02d}m{seconds:02d}s"
+        if hours
+        else f"{minutes}m{seconds:02d}s"
+    )
+
+
+def generate_cohort(
+    count: int,
+    output_path: str,
+    concurrency: int | None = None,
+    max_failures: int | None = None,
+) -> dict:
+    """
+    Generates distinct scenarios (a business with its assets and threats) in parallel, appending each to a
+    JSONL file as soon as it is done. Re-running with the same file resumes: the scenarios already in it count
+    towards the cohort, and their businesses are not generated again
+    :param count: the number of scenarios the file should hold
+    :param output_path: the JSONL file, one scenario per line
+    :param concurrency: scenarios generated at once. By default, as many as the Ollama servers take at once
+    :param max_failures: failed or duplicate scenarios after which the run stops. Defaults to count. Scenarios
+        interrupted by the Ollama circuit opening are paused and retried, and do not count
+    :return: counts of generated, duplicate, failed and paused scenarios, throughput, and per-stage and token
+        stats
+    """
+    concurrency = concurrency or len(ollama_pool.backends) * (
+        OLLAMA_MAX_CONCURRENCY_PER_BACKEND
+    )
+    max_failures = count if max_failures is None else max_failures
+    existing = load_checkpoint(output_path)
+    names = _BusinessNames(scenario["business_name"] for scenario in existing)
+    remaining = count - len(existing)
+    logger.info(
+        f"{len(existing)}/{count} scenarios already in {output_path}, generating {max(remaining, 0)} "
+        f"with {concurrency} workers on {len(ollama_pool.backends)} Ollama servers"
+    )
+
+    stats = {"generated": 0, "duplicate": 0, "failed": 0, "paused": 0}
+    start_time = last_progress = time.perf_counter()
+    in_flight = set()
+    ollama_pool.start_health_checks()
+    try:
+        with (
+            ThreadPoolExecutor(
+                max_workers=concurrency, thread_name_prefix="cohort"
+            ) as executor,
+            open(output_path, "a", encoding="utf-8") as output,
+        ):
+            while True:
+                unsuccessful = stats["duplicate"] + stats["failed"]
+                while (
+                    stats["generated"] + len(in_flight) < remaining
+                    and len(in_flight) < concurrency
+                    and unsuccessful < max_failures
+                ):
+                    in_flight.add(executor.submit(_run_worker, names))
+                if not in_flight:
+                    break
+
+                done, in_flight = wait(
+                    in_flight,
+                    timeout=PROGRESS_INTERVAL_SECONDS,
+                    return_when=FIRST_COMPLETED,
+                )
+                for future in done:
+                    outcome, scenario = future.result()
+                    stats[outcome] += 1
+                    if scenario:
+                        # Flushed line by line: an interrupted run loses the scenarios in progress only
+                        output.write(json.dumps(scenario_to_json(scenario)) + "\n")
+                        output.flush()
+
+                now = time.perf_counter()
+                if done or now - last_progress >= PROGRESS_INTERVAL_SECONDS:
+                    last_progress = now
+                    elapsed = now - start_time
+                    rate = stats["generated"] / elapsed
+                    eta = (
+                        _format_duration((remaining - stats["generated"]) / rate)
+                        if rate
+                        else "unknown"
+                    )
+                    logger.info(
+                        f"{len(existing) + stats['generated']}/{count} scenarios, "
+                        f"{rate * 60:.1f}/min, ETA {eta}, "
+                        f"{stats['duplicate']} duplicates, {stats['failed']} failed, "
+                        f"{stats['paused']} paused by the circuit breaker"
+                    )
+    finally:
+        ollama_pool.stop_health_checks()
+
+    elapsed = time.perf_counter() - start_time
+    if (
+        stats["duplicate"] + stats["failed"] >= max_failures
+        and stats["generated"] < remaining
+    ):
+        logger.error(f"Stopped after {max_failures} failed or duplicate scenarios")
+    stats.update(
+        total=len(existing) + stats["generated"],
+        elapsed_seconds=round(elapsed, 1),
+        scenarios_per_minute=(
+            round(stats["generated"] / elapsed * 60, 2) if elapsed else None
+        ),
+        stages=get_stage_run_stats(),
+        tokens=get_token_usage()["stages"],
+    )
+    logger.success(
+        f"Cohort generation finished: {stats['total']}/{count} scenarios in {output_path}"
+    )
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Generate a cohort of distinct scenarios (business, assets and threats) into a JSONL file. "
+        "Set OLLAMA_BASE_URLS to spread the generation over several Ollama servers"
+    )
+    parser.add_argument("output", help="JSONL file, appended to and resumed from")
+    parser.add_argument("--count", type=int, required=True)
+    parser.add_argument("--concurrency", type=int)
+    parser.add_argument("--max-failures", type=int)
+    args = parser.parse_args()
+
+    stats = generate_cohort(
+        args.count,
+        args.output,
+        concurrency=args.concurrency,
+        max_failures=args.max_failures,
+    )
+    print(json.dumps(stats, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+import os
+import re
+import math
+
+from langchain.schema import Document
+
+# Upper bound on the retrieved context sent to the final LLM call, across all tool calls
+CONTEXT_TOKEN_BUDGET = int(os.environ.get("CONTEXT_TOKEN_BUDGET", "600"))
+# The same bound for questions about a specific section, which get the whole section rather than matching chunks
+SECTION_CONTEXT_TOKEN_BUDGET = int(
+    os.environ.get("SECTION_CONTEXT_TOKEN_BUDGET", "1500")
+)
+
+_STOPWORDS = set(
+    "a an and are as at be by can do does for from how i in is it me my of on or should that the this to "
+    "what when which who why with you your about tell section explain".split()
+)
+
+
+def estimate_token_count(text: str) -> int:
+    """Cheap token estimate (about 4 characters per token for English text with llama tokenizers)."""
+    return max(1, math.ceil(len(text) / 4))
+
+
+def _content_words(text: str) -> set[str]:
+    return {
+        word
+        for word in re.findall(r"[a-z0-9]+", text.lower())
+        if word not in _STOPWORDS and len(word) > 1
+    }
+
+
+def split_into_passages(text: str) -> list[str]:
+    """Splits a chunk into bullets/lines, and long lines into sentences. The first line is kept whole."""
+    lines = [line.strip() for line in text.splitlines() if line.strip()]
+    if not lines:
+        return []
+
+    passages = [lines[0]]
+    for line in lines[1:]:
+        # Sentence ends, but not list numbering like "1. ## Scope"
+        passages.extend(
+            sentence for sentence in re.split(r"(?<=[^\d\s][.!?])\s+", line) if sentence
+        )
+    return passages
+
+
+def score_passage(passage: str, query_words: set[str]) -> float:
+    """Lexical overlap with the query, damped by length so long passages do not win by size alone."""
+    passage_words = _content_words(passage)
+    if not passage_words:
+        return 0.0
+    return len(passage_words & query_words) / math.sqrt(len(passage_words))
+
+
+def compress_documents(
+    query: str, documents: list[Document], token_budget: int = CONTEXT_TOKEN_BUDGET
+) -> list[Document]:
+    """
+    Keeps only the passages of the retrieved documents that are most relevant to the query, within a token budget.
+    The first line of every document (its section header) is always kept, and kept passages stay in their original order.
+    Budget left once the passages sharing words with the query are kept goes to the other passages, in document
+    order, and a document is never cut down to its header alone
+    :param query: the retrieval query
+    :param documents: the retrieved documents
+    :param token_budget: the maximum estimated number of tokens of the compressed documents
+    :return: copies of the documents with compressed page_content. Documents are returned unchanged if they fit the budget
+    """
+    if sum(estimate_token_count(doc.page_content) for doc in documents) <= token_budget:
+        return documents
+
+    query_words = _content_words(query)
+    passages_per_doc = [split_into_passages(doc.page_content) for doc in documents]
+
+    kept = [set() for _ in documents]
+    used_tokens = 0
+    candidates = []
+    for doc_index, passages in enumerate(passages_per_doc):
+        for position, passage in enumerate(passages):
+            if position == 0:
+                kept[doc_index].add(0)
+                used_tokens += estimate_token_count(passage)
+            else:
+                candidates.append(
+                    (score_passage(passage, query_words), doc_index, position)
+                )
+
+    # Highest scores first; ties go to earlier documents and passages, which the retriever ranked higher.
+    # Passages without a query word come last, in document order: e.g. "Explain section 2" shares no content
+    # word with section 2, whose text is still the answer
+    candidates.sort(key=lambda candidate: (-candidate[0], candidate[1], candidate[2]))
+    for score, doc_index, position in candidates:
+        passage_tokens = estimate_token_count(passages_per_doc[doc_index][position])
+        if used_tokens + passage_tokens > token_budget:
+            continue
+        kept[doc_index].add(position)
+        used_tokens += passage_tokens
+
+    # A header alone answers nothing, its first passage goes over the budget if needed
+    for doc_index, passages in enumerate(passages_per_doc):
+        if len(passages) > 1 and kept[doc_index] == {0}:
+            kept[doc_index].add(1)
+
+    return [
+        Document(
+            id=doc.id,
+            page_content="\n".join(
+                passages_per_doc[doc_index][position]
+                for position in sorted(kept[doc_index])
+            ),
+            metadata=doc.metadata,
+        )
+        for doc_index, doc in enumerate(documents)
+        if passages_per_doc[doc_index]
+    ]
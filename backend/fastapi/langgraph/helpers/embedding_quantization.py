@@ -0,0 +1,46 @@
+import numpy as np
+
+# Rows scored per block. Each block is widened into a small reused float32 buffer that stays in cache,
+# so scoring an int8 matrix never materializes a full float32 copy of it
+SCORING_BLOCK_ROWS = 256
+
+
+def quantize_int8(matrix: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Scalar-quantizes every row of a float matrix to int8 with its own scale, so that row ~= codes * scale
+    :param matrix: float matrix of shape (n, dim)
+    :return: the int8 codes of shape (n, dim) and the float32 per-row scales of shape (n,)
+    """
+    matrix = np.asarray(matrix, dtype=np.float32)
+    if matrix.ndim == 1:
+        matrix = matrix.reshape(1, -1)
+    scales = np.abs(matrix).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    codes = np.clip(np.rint(matrix / scales[:, None]), -127, 127).astype(np.int8)
+    return codes, scales.astype(np.float32)
+
+
+def dequantize_int8(codes: np.ndarray, scales: np.ndarray) -> np.ndarray:
+    """Reconstructs the approximate float32 rows from their int8 codes and scales."""
+    return codes.astype(np.float32) * scales[:, None]
+
+
+def approximate_scores(
+    codes: np.ndarray, scales: np.ndarray, query: np.ndarray
+) -> np.ndarray:
+    """
+    Approximate dot products between every quantized row and a float query vector
+    :param codes: int8 codes of shape (n, dim)
+    :param scales: per-row scales of shape (n,)
+    :param query: float32 query vector of shape (dim,)
+    :return: float32 scores of shape (n,)
+    """
+    query = np.asarray(query, dtype=np.float32)
+    scores = np.empty(codes.shape[0], dtype=np.float32)
+    buffer = np.empty((SCORING_BLOCK_ROWS, codes.shape[1]), dtype=np.float32)
+    for start in range(0, codes.shape[0], SCORING_BLOCK_ROWS):
+        block = codes[start : start + SCORING_BLOCK_ROWS]
+        rows = block.shape[0]
+        np.copyto(buffer[:rows], block, casting="unsafe")
+        np.dot(buffer[:rows], query, out=scores[start : start + rows])
+    return scores * scales
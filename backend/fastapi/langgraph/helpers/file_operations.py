@@ -1,12 +1,153 @@
 import os
+import stat
+import threading
+from string import Formatter
+from typing import NamedTuple
 
+from backend.fastapi.langgraph.helpers.metrics import record_cache_lookup
 
-def retrieve_input_file(filename: str) -> str | None:
-    base_path = os.path.dirname(__file__)
-    input_file_path = os.path.join(base_path, "..", "input_files", filename)
-    input_file_path = os.path.abspath(input_file_path)
-    if not os.path.isfile(input_file_path):
+
+class CachedInputFile(NamedTuple):
+    content: str
+    mtime_ns: int
+    size: int
+    # A file replaced by a rename (editors, deploys) gets a new inode even if mtime and size look unchanged
+    inode: int
+
+    @property
+    def version(self) -> tuple[int, int, int]:
+        return self.mtime_ns, self.size, self.inode
+
+
+# Input files are small and read on hot paths, so their contents are kept in memory until they change on disk
+_file_cache: dict[str, CachedInputFile] = {}
+_file_cache_lock = threading.Lock()
+
+# (template, fields filled from input files with their file versions) -> partially formatted template
+_prompt_cache: dict[tuple, str] = {}
+
+
+def _input_files_dir() -> str:
+    return os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "input_files"))
+
+
+def _input_file_path(filename: str) -> str:
+    return os.path.join(_input_files_dir(), filename)
+
+
+def retrieve_input_file_entry(filename: str) -> CachedInputFile | None:
+    """
+    Returns an input file with the modification time, size and inode it was read at. The file is only re-read
+    when one of them changed, so a cache hit costs a single stat call
+    :param filename: name of a file in the input_files directory
+    :return: the cached file, or None if it does not exist or is not a regular file
+    """
+    try:
+        file_stat = os.stat(_input_file_path(filename))
+    except OSError:
         return None
+    if not stat.S_ISREG(file_stat.st_mode):
+        return None
+
+    cached = _file_cache.get(filename)
+    hit = cached is not None and cached.version == (
+        file_stat.st_mtime_ns,
+        file_stat.st_size,
+        file_stat.st_ino,
+    )
+    record_cache_lookup("input_file", hit)
+    if hit:
+        return cached
+
+    try:
+        with open(_input_file_path(filename), "r", encoding="utf-8") as f:
+            content = f.read()
+    except OSError:
+        # Removed since the stat call
+        return None
+    entry = CachedInputFile(
+        content, file_stat.st_mtime_ns, file_stat.st_size, file_stat.st_ino
+    )
+    with _file_cache_lock:
+        _file_cache[filename] = entry
+    return entry
+
+
+def retrieve_input_file(filename: str) -> str | None:
+    entry = retrieve_input_file_entry(filename)
+    return entry.content if entry else None
+
+
+def preload_input_files(filenames: list[str]) -> list[str]:
+    """
+    Reads input files into the cache, so the first requests do not touch the disk
+    :param filenames: names of files in the input_files directory
+    :return: the names of the files that could not be found
+    """
+    return [filename for filename in filenames if retrieve_input_file(filename) is None]
+
+
+def preload_all_input_files() -> list[str]:
+    """Reads every file of the input_files directory into the cache. Returns the names of the preloaded files."""
+    filenames = sorted(
+        entry.name for entry in os.scandir(_input_files_dir()) if entry.is_file()
+    )
+    missing = preload_input_files(filenames)
+    return [filename for filename in filenames if filename not in missing]
+
+
+def _escape_braces(text: str) -> str:
+    return text.replace("{", "{{").replace("}", "}}")
+
+
+def format_prompt_with_input_files(prompt_template: str, **input_files: str) -> str:
+    """
+    Fills the placeholders of a prompt template that come from input files, and leaves every other placeholder
+    in place, so a request only has to .format() its own dynamic fields. The result is cached until one of
+    the files changes on disk
+    :param prompt_template: a str.format template
+    :param input_files: placeholder name -> name of the input file whose content fills it
+    :return: the template with the file placeholders filled. It is still a valid str.format template
+    """
+    entries = {}
+    for field, filename in input_files.items():
+        entry = retrieve_input_file_entry(filename)
+        if entry is None:
+            raise FileNotFoundError(f"Input file {filename} not found")
+        entries[field] = entry
+
+    key = (
+        prompt_template,
+        tuple(
+            (field, input_files[field], entry.version)
+            for field, entry in sorted(entries.items())
+        ),
+    )
+    cached = _prompt_cache.get(key)
+    record_cache_lookup("prompt_template", cached is not None)
+    if cached is not None:
+        return cached
+
+    parts = []
+    for literal, field, format_spec, conversion in Formatter().parse(prompt_template):
+        parts.append(_escape_braces(literal))
+        if field is None:
+            continue
+        if field in entries:
+            parts.append(_escape_braces(entries[field].content))
+        else:
+            parts.append(
+                "{"
+                + field
+                + (f"!{conversion}" if conversion else "")
+                + (f":{format_spec}" if format_spec else "")
+                + "}"
+            )
+    formatted = "".join(parts)
 
-    with open(input_file_path, "r", encoding="utf-8") as f:
-        return f.read()
+    with _file_cache_lock:
+        # Older versions of the same template are dropped, so edited files do not accumulate
+        for stale_key in [k for k in _prompt_cache if k[0] == prompt_template]:
+            del _prompt_cache[stale_key]
+        _prompt_cache[key] = formatted
+    return formatted
@@ -0,0 +1,89 @@
+import os
+import threading
+import time
+
+import ollama
+from loguru import logger
+
+from backend.fastapi.langgraph.helpers.chroma_client_registry import (
+    check_chroma_clients,
+)
+from backend.fastapi.langgraph.helpers.ollama_backend_pool import ollama_pool
+
+# Probe results are reused for this long, so frequent health checks never hammer Ollama or Chroma
+HEALTH_PROBE_TTL_SECONDS = float(os.environ.get("HEALTH_PROBE_TTL_SECONDS", "5"))
+OLLAMA_PROBE_TIMEOUT_SECONDS = 2.0
+
+_probe_cache: dict[str, tuple[float, dict]] = {}
+_probe_lock = threading.Lock()
+
+
+def _cached_probe(name: str, probe) -> dict:
+    """Returns the last result of a probe if it is fresher than HEALTH_PROBE_TTL_SECONDS, else runs it again."""
+    now = time.monotonic()
+    with _probe_lock:
+        cached = _probe_cache.get(name)
+        if cached is not None and now - cached[0] < HEALTH_PROBE_TTL_SECONDS:
+            return cached[1]
+
+    result = probe()
+    with _probe_lock:
+        _probe_cache[name] = (time.monotonic(), result)
+    return result
+
+
+def _probe_ollama_backend(base_url: str) -> dict:
+    client = ollama.Client(host=base_url, timeout=OLLAMA_PROBE_TIMEOUT_SECONDS)
+    try:
+        available = [model.model for model in client.list().models]
+        loaded = [model.model for model in client.ps().models]
+    except Exception as e:
+        logger.warning(f"Ollama health probe of {base_url} failed: {e}")
+        return {"base_url": base_url, "reachable": False, "error": str(e)}
+    return {
+        "base_url": base_url,
+        "reachable": True,
+        "available_models": available,
+        "loaded_models": loaded,
+    }
+
+
+def _probe_ollama() -> dict:
+    backends = []
+    for pool_backend in ollama_pool.status():
+        backend = _probe_ollama_backend(pool_backend["base_url"])
+        backend["outstanding"] = pool_backend["outstanding"]
+        backend["available_for_routing"] = pool_backend["available"]
+        backends.append(backend)
+
+    reachable = [backend for backend in backends if backend["reachable"]]
+    return {
+        "reachable": bool(reachable),
+        "loaded_models": sorted(
+            {model for backend in reachable for model in backend["loaded_models"]}
+        ),
+        "backends": backends,
+    }
+
+
+def _probe_vectorstores() -> dict:
+    # Imported here, the agent module builds its thread pool and imports langgraph on import
+    from backend.fastapi.langgraph.ai_agents.security_assessment_assistant import (
+        create_security_assistant_graph,
+    )
+
+    return {
+        "security_assistant_index_loaded": create_security_assistant_graph.cache_info().currsize
+        > 0,
+        "chroma_clients": check_chroma_clients(),
+    }
+
+
+def probe_ollama() -> dict:
+    """Reachability, pulled models, loaded models and outstanding requests of every Ollama server. Cached."""
+    return _cached_probe("ollama", _probe_ollama)
+
+
+def probe_vectorstores() -> dict:
+    """Whether the security assistant's index is loaded, and the health of every open Chroma client. Cached."""
+    return _cached_probe("vectorstores", _probe_vectorstores)
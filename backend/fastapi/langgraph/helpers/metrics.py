@@ -0,0 +1,259 @@
+import bisect
+import contextvars
+import math
+import threading
+
+from backend.fastapi.langgraph.helpers.tracing import set_span_attributes
+
+# Prometheus text exposition format. The few metric types needed are implemented here rather than adding a
+# client library: counters, gauges and cumulative histograms, all with labels
+
+_LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+_TOKENS_PER_SECOND_BUCKETS = (1, 2, 5, 10, 20, 30, 50, 75, 100, 150, 250)
+_TOKEN_COUNT_BUCKETS = (64, 128, 256, 512, 1024, 2048, 4096, 8192)
+_ATTEMPT_BUCKETS = (1, 2, 3, 4, 5, 8)
+
+# The endpoint a request is serving, so metrics recorded deep in the pipeline can be labeled with it
+current_endpoint: contextvars.ContextVar[str] = contextvars.ContextVar(
+    "current_endpoint", default="none"
+)
+
+_registry: list["_Metric"] = []
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+def _escape_label_value(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return (
+        "{"
+        + ",".join(
+            f'{name}="{_escape_label_value(str(value))}"'
+            for name, value in labels.items()
+        )
+        + "}"
+    )
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values: dict[tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def _key(self, labels: dict) -> tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(
+                f"{self.name} takes the labels {self.labelnames}, got {tuple(labels)}"
+            )
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _samples(self) -> list[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        with self._lock:
+            samples = self._samples()
+        return "\n".join(
+            [
+                f"# HELP {self.name} {self.documentation}",
+                f"# TYPE {self.name} {self.kind}",
+            ]
+            + samples
+        )
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def _samples(self) -> list[str]:
+        return [
+            f"{self.name}{_format_labels(dict(zip(self.labelnames, key)))} {_format_value(value)}"
+            for key, value in self._values.items()
+        ]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def clear(self) -> None:
+        """Drops every label set, e.g. before setting the gauges of servers that may have been removed."""
+        with self._lock:
+            self._values.clear()
+
+    _samples = Counter._samples
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = _LATENCY_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._values.get(key, ([0] * len(self.buckets), 0.0))
+            counts[bisect.bisect_left(self.buckets, value)] += 1
+            self._values[key] = (counts, total + value)
+
+    def _samples(self) -> list[str]:
+        samples = []
+        for key, (counts, total) in self._values.items():
+            labels = dict(zip(self.labelnames, key))
+            cumulative = 0
+            for bucket, count in zip(self.buckets, counts):
+                cumulative += count
+                samples.append(
+                    f"{self.name}_bucket{_format_labels({**labels, 'le': _format_value(bucket)})} {cumulative}"
+                )
+            samples.append(
+                f"{self.name}_sum{_format_labels(labels)} {_format_value(total)}"
+            )
+            samples.append(f"{self.name}_count{_format_labels(labels)} {cumulative}")
+        return samples
+
+
+def record_cache_lookup(cache: str, hit: bool) -> None:
+    """Counts a lookup of an in-process cache, and notes it on the current trace span."""
+    CACHE_REQUESTS.inc(cache=cache, result="hit" if hit else "miss")
+    set_span_attributes(**{f"{cache}_cache_hit": hit})
+
+
+def render_metrics() -> str:
+    """Every registered metric, in the Prometheus text exposition format."""
+    return "\n\n".join(metric.render() for metric in _registry) + "\n"
+
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency",
+    ("method", "endpoint", "status"),
+)
+LLM_CALL_SECONDS = Histogram(
+    "llm_call_duration_seconds",
+    "Latency of one LLM call, including queueing for an Ollama server",
+    ("stage", "model", "endpoint", "outcome"),
+)
+LLM_TIME_TO_FIRST_TOKEN_SECONDS = Histogram(
+    "llm_time_to_first_token_seconds",
+    "Model load plus prompt evaluation time reported by Ollama, i.e. the time before the first output token",
+    ("stage", "model"),
+)
+LLM_TOKENS_PER_SECOND = Histogram(
+    "llm_eval_tokens_per_second",
+    "Output tokens per second of generation reported by Ollama",
+    ("stage", "model"),
+    buckets=_TOKENS_PER_SECOND_BUCKETS,
+)
+LLM_PROMPT_TOKENS = Histogram(
+    "llm_prompt_tokens",
+    "Prompt tokens evaluated per LLM call",
+    ("stage", "model", "endpoint"),
+    buckets=_TOKEN_COUNT_BUCKETS,
+)
+LLM_EVAL_TOKENS = Histogram(
+    "llm_eval_tokens",
+    "Output tokens generated per LLM call",
+    ("stage", "model", "endpoint"),
+    buckets=_TOKEN_COUNT_BUCKETS,
+)
+VALIDATION_RESULTS = Counter(
+    "validation_results_total",
+    "Generated outputs accepted or rejected by the validator",
+    ("stage", "result"),
+)
+STAGE_ATTEMPTS = Histogram(
+    "stage_attempts",
+    "Generation attempts per generate-and-validate run",
+    ("stage", "outcome"),
+    buckets=_ATTEMPT_BUCKETS,
+)
+STAGE_RUN_SECONDS = Histogram(
+    "stage_run_duration_seconds",
+    "End-to-end latency of a generate-and-validate run, including every retry",
+    ("stage", "outcome"),
+)
+CACHE_REQUESTS = Counter(
+    "cache_requests_total",
+    "Lookups of the in-process caches",
+    ("cache", "result"),
+)
+PROMPT_BUDGET_ACTIONS = Counter(
+    "prompt_budget_actions_total",
+    "Prompts trimmed or rejected for exceeding their stage's token budget",
+    ("stage", "action"),
+)
+CANCELLED_REQUESTS = Counter(
+    "http_requests_cancelled_total",
+    "Requests whose client disconnected before the response, and whose remaining work was abandoned",
+    ("endpoint",),
+)
+CIRCUIT_REJECTED_CALLS = Counter(
+    "circuit_rejected_calls_total",
+    "Calls refused without being made because their circuit was open",
+    ("circuit",),
+)
+CIRCUIT_OPEN = Gauge(
+    "circuit_open",
+    "1 while a circuit is open or half open, else 0",
+    ("circuit",),
+)
+DEGRADED_RESPONSES = Counter(
+    "degraded_responses_total",
+    "Responses served without the model layer while its circuit was open",
+    ("endpoint", "fallback"),
+)
+SCENARIO_DEDUP_RESULTS = Counter(
+    "scenario_dedup_checks_total",
+    "Generated businesses checked against the existing scenarios, by whether they were near duplicates",
+    ("result",),
+)
+OLLAMA_IN_FLIGHT = Gauge(
+    "ollama_in_flight_requests",
+    "Requests currently sent to each Ollama server",
+    ("backend",),
+)
+OLLAMA_WAITING = Gauge(
+    "ollama_waiting_requests",
+    "Requests waiting for a free Ollama server slot",
+)
+THREADPOOL_BUSY = Gauge(
+    "threadpool_busy_workers",
+    "Threadpool workers running sync routes",
+)
+THREADPOOL_QUEUED = Gauge(
+    "threadpool_queued_tasks",
+    "Sync route calls waiting for a threadpool worker",
+)
@@ -2,17 +2,41 @@ from loguru import logger
 from langchain_ollama import ChatOllama
 import os
 
+# How long Ollama keeps a model loaded after its last request. A loaded model keeps its KV cache,
+# so a request sharing a prompt prefix with the previous one only evaluates the new tokens
+OLLAMA_KEEP_ALIVE = os.environ.get("OLLAMA_KEEP_ALIVE", "30m")
+# Ollama reloads a model whenever num_ctx changes, which also drops its cached prefix. Every task that shares
+# a model must therefore use the same context size, so it is set once here rather than per route
+OLLAMA_NUM_CTX = int(os.environ.get("OLLAMA_NUM_CTX", "4096"))
+
 
 def fetch_model_from_ollama(
-    model_name: str = "gemma3:1b", temperature: float = 0.4
+    model_name: str = "gemma3:1b",
+    temperature: float = 0.4,
+    keep_alive: str | None = None,
+    num_ctx: int | None = None,
+    num_predict: int | None = None,
+    base_url: str | None = None,
 ) -> ChatOllama | None:
     """Attempts to retrieve Ollama model
     :param model_name:str The name of the model from official ollama list
+    :param temperature: sampling temperature
+    :param keep_alive: how long Ollama keeps the model loaded after the request, e.g. "30m". Defaults to OLLAMA_KEEP_ALIVE
+    :param num_ctx: context window size. Defaults to OLLAMA_NUM_CTX
+    :param num_predict: maximum number of generated tokens. Defaults to the model's own limit
+    :param base_url: the Ollama server. Defaults to OLLAMA_BASE_URL
     :return: ChatOllama instance if model is found, else returns None"""
     try:
-        base_url = os.environ.get("OLLAMA_BASE_URL", "http://localhost:11434")
+        base_url = base_url or os.environ.get(
+            "OLLAMA_BASE_URL", "http://localhost:11434"
+        )
         model = ChatOllama(
-            model=f"{model_name}", temperature=temperature, base_url=base_url
+            model=f"{model_name}",
+            temperature=temperature,
+            base_url=base_url,
+            keep_alive=keep_alive or OLLAMA_KEEP_ALIVE,
+            num_ctx=num_ctx or OLLAMA_NUM_CTX,
+            num_predict=num_predict,
         )
         # logger.info(f"{model_name} model fetched from ollama" if model_name != "llama3.2" else "llama3.2 fetched")
         return model
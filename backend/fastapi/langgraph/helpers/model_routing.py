@@ -0,0 +1,457 @@
+import contextvars
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Any, Callable, Iterator, Type
+
+from loguru import logger
+from langchain_core.messages import BaseMessage
+from pydantic import BaseModel
+
+from backend.fastapi.langgraph.helpers.model_config import (
+    OLLAMA_NUM_CTX,
+    fetch_model_from_ollama,
+)
+from backend.fastapi.langgraph.helpers.cancellation import (
+    RequestCancelledError,
+    raise_if_cancelled,
+    with_cancellation,
+)
+from backend.fastapi.langgraph.helpers.circuit_breaker import CircuitOpenError
+from backend.fastapi.langgraph.helpers.ollama_backend_pool import call_with_backend
+from backend.fastapi.langgraph.helpers.metrics import (
+    LLM_CALL_SECONDS,
+    LLM_EVAL_TOKENS,
+    LLM_PROMPT_TOKENS,
+    LLM_TIME_TO_FIRST_TOKEN_SECONDS,
+    LLM_TOKENS_PER_SECOND,
+    STAGE_ATTEMPTS,
+    STAGE_RUN_SECONDS,
+    current_endpoint,
+)
+from backend.fastapi.langgraph.helpers.structured_output import structured_output
+from backend.fastapi.langgraph.helpers.token_accounting import (
+    enforce_prompt_budget,
+    record_call_tokens,
+)
+from backend.fastapi.langgraph.helpers.tracing import record_token_usage, span
+
+# Every pipeline stage maps to a chain of models tried in order (the first is the primary, the others are
+# fallbacks) and the options used for all of them. The yes/no validator is a cheap classification step,
+# so it runs on a small model first and falls back to llama3.2 if the small model is missing or fails
+DEFAULT_MODEL_ROUTES = {
+    "business_generation": {
+        "models": ["llama3.2"],
+        "temperature": 0.4,
+        "num_predict": 768,
+        "slow_call_seconds": 135,
+    },
+    "assets_generation": {
+        "models": ["llama3.2"],
+        "temperature": 0.4,
+        "num_predict": 1024,
+        "slow_call_seconds": 180,
+    },
+    "threats_generation": {
+        "models": ["llama3.2"],
+        "temperature": 0.4,
+        "num_predict": 1536,
+        "slow_call_seconds": 270,
+    },
+    "output_validation": {
+        "models": ["llama3.2:1b", "llama3.2"],
+        "temperature": 0.4,
+        "num_predict": 256,
+    },
+    # The validator the output_validation route is compared against, on a sample of validations
+    "output_validation_reference": {
+        "models": ["llama3.2"],
+        "temperature": 0.4,
+        "num_predict": 256,
+    },
+    "business_owner_chat": {
+        "models": ["llama3.2"],
+        "temperature": 0.7,
+        "num_predict": 512,
+    },
+    "assistant_tool_decision": {
+        "models": ["llama3.2"],
+        "temperature": 0.2,
+        "num_predict": 256,
+    },
+    "assistant_answer": {
+        "models": ["llama3.2"],
+        "temperature": 0.2,
+        "num_predict": 1024,
+        "slow_call_seconds": 180,
+    },
+}
+
+# Route keys that configure how the stage is called rather than the model. A route may set max_prompt_tokens
+# (estimated prompt tokens allowed), over_budget ("trim" to drop the oldest chat turns, or "reject") and
+# slow_call_seconds (the duration from which a call counts as failed for the Ollama circuit breaker, by default
+# CIRCUIT_SLOW_CALL_SECONDS; the stages generating the most tokens get more time, scaled with num_predict)
+ROUTE_POLICY_KEYS = {"models", "max_prompt_tokens", "over_budget", "slow_call_seconds"}
+
+# Optional JSON file overriding DEFAULT_MODEL_ROUTES, stage by stage and option by option
+MODEL_ROUTING_CONFIG = os.environ.get("MODEL_ROUTING_CONFIG")
+
+LATENCY_WINDOW_SIZE = 256
+
+_route_stats: dict[tuple[str, str], dict] = {}
+# stage -> the model that answered the last call of that stage in the current context
+_last_routed_models: contextvars.ContextVar[dict[str, str]] = contextvars.ContextVar(
+    "last_routed_models", default={}
+)
+_stage_run_stats: dict[str, dict] = {}
+_stats_lock = threading.Lock()
+
+
+def load_model_routes(config_path: str | None = MODEL_ROUTING_CONFIG) -> dict:
+    """
+    Returns the routing table: the defaults, with the stages and options of the config file applied on top
+    :param config_path: optional path to a JSON file of the same shape as DEFAULT_MODEL_ROUTES
+    :return: stage -> route
+    """
+    routes = {stage: dict(route) for stage, route in DEFAULT_MODEL_ROUTES.items()}
+    if not config_path:
+        return routes
+
+    try:
+        with open(config_path, "r", encoding="utf-8") as f:
+            overrides = json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        logger.error(f"Could not read model routing config {config_path}: {e}")
+        return routes
+
+    for stage, route in overrides.items():
+        routes.setdefault(stage, {}).update(route)
+    return routes
+
+
+MODEL_ROUTES = load_model_routes()
+
+
+def get_route(stage: str) -> dict:
+    route = MODEL_ROUTES.get(stage)
+    if not route or not route.get("models"):
+        raise KeyError(f"No model route configured for stage {stage}")
+    return route
+
+
+def routed_model_names() -> list[str]:
+    """The distinct models of all routes, primaries first."""
+    names = [
+        route["models"][0] for route in MODEL_ROUTES.values() if route.get("models")
+    ]
+    names += [
+        model for route in MODEL_ROUTES.values() for model in route.get("models", [])
+    ]
+    return list(dict.fromkeys(names))
+
+
+def get_last_routed_model(stage: str) -> str | None:
+    """The model that answered the last call of a stage made in the current context (request, thread)."""
+    return _last_routed_models.get().get(stage)
+
+
+def _stats_entry(stage: str, model_name: str) -> dict:
+    return _route_stats.setdefault(
+        (stage, model_name),
+        {
+            "calls": 0,
+            "failures": 0,
+            "latencies_ms": deque(maxlen=LATENCY_WINDOW_SIZE),
+            "agreement_checks": 0,
+            "agreements": 0,
+        },
+    )
+
+
+def record_route_call(stage: str, model_name: str, latency_ms: float, ok: bool) -> None:
+    LLM_CALL_SECONDS.observe(
+        latency_ms / 1000,
+        stage=stage,
+        model=model_name,
+        endpoint=current_endpoint.get(),
+        outcome="ok" if ok else "error",
+    )
+    with _stats_lock:
+        entry = _stats_entry(stage, model_name)
+        entry["calls"] += 1
+        if ok:
+            entry["latencies_ms"].append(latency_ms)
+        else:
+            entry["failures"] += 1
+
+
+def record_route_agreement(stage: str, model_name: str, agreed: bool) -> None:
+    """Records whether a model's answer agreed with the answer of the stage's reference model."""
+    with _stats_lock:
+        entry = _stats_entry(stage, model_name)
+        entry["agreement_checks"] += 1
+        entry["agreements"] += int(agreed)
+
+
+def _percentile(sorted_values: list[float], fraction: float) -> float | None:
+    if not sorted_values:
+        return None
+    return round(
+        sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))],
+        1,
+    )
+
+
+def get_route_stats() -> list[dict]:
+    """Calls, failures, latency percentiles of the recent successful calls and agreement rate per stage and model."""
+    with _stats_lock:
+        snapshot = [
+            (stage, model_name, dict(entry, latencies_ms=sorted(entry["latencies_ms"])))
+            for (stage, model_name), entry in _route_stats.items()
+        ]
+
+    return [
+        {
+            "stage": stage,
+            "model": model_name,
+            "calls": entry["calls"],
+            "failures": entry["failures"],
+            "latency_p50_ms": _percentile(entry["latencies_ms"], 0.5),
+            "latency_p95_ms": _percentile(entry["latencies_ms"], 0.95),
+            "agreement_checks": entry["agreement_checks"],
+            "agreement_rate": (
+                round(entry["agreements"] / entry["agreement_checks"], 3)
+                if entry["agreement_checks"]
+                else None
+            ),
+        }
+        for stage, model_name, entry in snapshot
+    ]
+
+
+@contextmanager
+def track_stage_run(stage: str) -> Iterator[dict]:
+    """
+    Records one generate-and-validate run of a pipeline stage: its attempts, whether it ended with a valid
+    output, and its end-to-end latency including every retry
+    :param stage: name of the pipeline stage
+    :return: a dict in which the block sets "attempts" and "succeeded"
+    """
+    run = {"attempts": 0, "succeeded": False}
+    start_time = time.perf_counter()
+    with span("stage.run", stage=stage) as run_span:
+        try:
+            yield run
+        finally:
+            run_span.set(**run)
+            latency_ms = (time.perf_counter() - start_time) * 1000
+            with _stats_lock:
+                entry = _stage_run_stats.setdefault(
+                    stage,
+                    {
+                        "runs": 0,
+                        "failures": 0,
+                        "attempts": 0,
+                        "latencies_ms": deque(maxlen=LATENCY_WINDOW_SIZE),
+                    },
+                )
+                entry["runs"] += 1
+                entry["attempts"] += run["attempts"]
+                entry["latencies_ms"].append(latency_ms)
+                if not run["succeeded"]:
+                    entry["failures"] += 1
+            outcome = "succeeded" if run["succeeded"] else "failed"
+            STAGE_ATTEMPTS.observe(run["attempts"], stage=stage, outcome=outcome)
+            STAGE_RUN_SECONDS.observe(latency_ms / 1000, stage=stage, outcome=outcome)
+
+
+def get_stage_run_stats() -> list[dict]:
+    """Runs, failed runs, mean attempts per run and end-to-end latency percentiles per pipeline stage."""
+    with _stats_lock:
+        snapshot = [
+            (stage, dict(entry, latencies_ms=sorted(entry["latencies_ms"])))
+            for stage, entry in _stage_run_stats.items()
+        ]
+
+    return [
+        {
+            "stage": stage,
+            "runs": entry["runs"],
+            "failures": entry["failures"],
+            "mean_attempts": round(entry["attempts"] / entry["runs"], 2),
+            "latency_p50_ms": _percentile(entry["latencies_ms"], 0.5),
+            "latency_p95_ms": _percentile(entry["latencies_ms"], 0.95),
+        }
+        for stage, entry in snapshot
+    ]
+
+
+def _record_token_metrics(stage: str, model_name: str, usage: dict) -> None:
+    """Feeds the token counts and durations Ollama reported for a call (see record_token_usage) to the metrics."""
+    endpoint = current_endpoint.get()
+    if usage.get("prompt_tokens") is not None:
+        LLM_PROMPT_TOKENS.observe(
+            usage["prompt_tokens"], stage=stage, model=model_name, endpoint=endpoint
+        )
+    if usage.get("eval_tokens") is not None:
+        LLM_EVAL_TOKENS.observe(
+            usage["eval_tokens"], stage=stage, model=model_name, endpoint=endpoint
+        )
+    if usage.get("prompt_eval_ms") is not None:
+        LLM_TIME_TO_FIRST_TOKEN_SECONDS.observe(
+            (usage.get("load_ms", 0) + usage["prompt_eval_ms"]) / 1000,
+            stage=stage,
+            model=model_name,
+        )
+    if usage.get("eval_tokens") and usage.get("eval_ms"):
+        LLM_TOKENS_PER_SECOND.observe(
+            usage["eval_tokens"] / (usage["eval_ms"] / 1000),
+            stage=stage,
+            model=model_name,
+        )
+
+
+class RoutedModel:
+    """
+    The models of a stage's route, invoked in fallback order: when a model raises (missing model, unreachable
+    servers, unparsable structured output), the next one of the chain is tried. Every call is timed per model.
+    Each call is placed on an Ollama server by the backend pool, and one model instance is kept per server
+    """
+
+    def __init__(
+        self,
+        stage: str,
+        prepare: Callable[[Any], Any] | None = None,
+        models: list[str] | None = None,
+    ):
+        """
+        :param stage: the pipeline stage, a key of MODEL_ROUTES
+        :param prepare: applied to each ChatOllama model, e.g. to bind tools or request structured output
+        :param models: optional model chain replacing the route's, e.g. to pin a model
+        """
+        route = get_route(stage)
+        self.stage = stage
+        self.model_names = models or list(route["models"])
+        self._options = {
+            key: value for key, value in route.items() if key not in ROUTE_POLICY_KEYS
+        }
+        # The prompt and the generated tokens share the context window, and Ollama silently drops the start
+        # of a prompt that does not fit, so by default a prompt may use whatever num_predict leaves
+        self.max_prompt_tokens = route.get("max_prompt_tokens") or (
+            OLLAMA_NUM_CTX - (route.get("num_predict") or 0)
+        )
+        self.over_budget = route.get("over_budget", "trim")
+        self.slow_call_seconds = route.get("slow_call_seconds")
+        self._prepare = prepare
+        self._runnables: dict[tuple[str, str], Any] = {}
+
+    def _runnable(self, model_name: str, base_url: str):
+        key = (model_name, base_url)
+        if key not in self._runnables:
+            llm = fetch_model_from_ollama(
+                model_name, base_url=base_url, **self._options
+            )
+            if llm is None:
+                raise RuntimeError(
+                    f"Could not create {model_name} for the {self.stage} route"
+                )
+            self._runnables[key] = self._prepare(llm) if self._prepare else llm
+        return self._runnables[key]
+
+    def invoke_with_model(self, model_input, config=None) -> tuple[Any, str]:
+        """
+        Invokes the chain. Returns the result and the name of the model that produced it.
+        The prompt is checked against the stage's token budget first, see enforce_prompt_budget.
+        Raises RequestCancelledError when the request's client disconnected, and CircuitOpenError while Ollama
+        is down or overloaded, without trying the next model
+        """
+        model_input, estimated_prompt_tokens = enforce_prompt_budget(
+            self.stage, model_input, self.max_prompt_tokens, self.over_budget
+        )
+        config = with_cancellation(config)
+        last_error = None
+        for position, model_name in enumerate(self.model_names):
+            raise_if_cancelled(f"the {self.stage} call to {model_name}")
+            start_time = time.perf_counter()
+            with span(
+                "llm.invoke",
+                stage=self.stage,
+                model=model_name,
+                fallback=position,
+                estimated_prompt_tokens=estimated_prompt_tokens,
+            ) as llm_span:
+
+                def call(base_url: str):
+                    llm_span.set(base_url=base_url)
+                    return self._runnable(model_name, base_url).invoke(
+                        model_input, config=config
+                    )
+
+                try:
+                    result = call_with_backend(model_name, call, self.slow_call_seconds)
+                except (RequestCancelledError, CircuitOpenError) as e:
+                    # Not the model's fault: no failure is recorded, and no other model is tried
+                    llm_span.set(abandoned=type(e).__name__)
+                    raise
+                except Exception as e:
+                    llm_span.set(error=repr(e)[:300])
+                    record_route_call(
+                        self.stage,
+                        model_name,
+                        (time.perf_counter() - start_time) * 1000,
+                        ok=False,
+                    )
+                    logger.warning(
+                        f"{self.stage}: {model_name} failed, trying the next model. {e}"
+                    )
+                    last_error = e
+                    continue
+
+                # Structured outputs record their message's token counts while parsing it
+                if isinstance(result, BaseMessage):
+                    record_token_usage(result, llm_span)
+                _record_token_metrics(self.stage, model_name, llm_span.attributes)
+                record_call_tokens(
+                    self.stage, estimated_prompt_tokens, llm_span.attributes
+                )
+
+            record_route_call(
+                self.stage,
+                model_name,
+                (time.perf_counter() - start_time) * 1000,
+                ok=True,
+            )
+            _last_routed_models.set(
+                {**_last_routed_models.get(), self.stage: model_name}
+            )
+            return result, model_name
+
+        raise RuntimeError(
+            f"Every model of the {self.stage} route failed"
+        ) from last_error
+
+    def invoke(self, model_input, config=None):
+        return self.invoke_with_model(model_input, config=config)[0]
+
+
+@lru_cache(maxsize=64)
+def get_routed_model(
+    stage: str, schema: Type[BaseModel] | None = None, model: str | None = None
+) -> RoutedModel:
+    """
+    The shared RoutedModel of a stage, so its model instances (one per model and Ollama server) are built once
+    and reused by every call, instead of on every attempt
+    :param stage: the pipeline stage, a key of MODEL_ROUTES
+    :param schema: optional Pydantic model the output is parsed into, see structured_output
+    :param model: optional model pinned instead of the route's models
+    :return: the routed model, created on first use
+    """
+    return RoutedModel(
+        stage,
+        prepare=(lambda llm: structured_output(llm, schema)) if schema else None,
+        models=[model] if model else None,
+    )
@@ -0,0 +1,324 @@
+import os
+import json
+import uuid
+import threading
+from typing import Any, Iterable, Optional, Sequence
+
+import numpy as np
+from loguru import logger
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+from langchain.schema import Document
+
+from backend.fastapi.langgraph.helpers.embedding_quantization import (
+    quantize_int8,
+    dequantize_int8,
+    approximate_scores,
+)
+
+EMBEDDINGS_FILE_NAME = "embeddings.npy"
+INT8_CODES_FILE_NAME = "embeddings_int8.npy"
+INT8_SCALES_FILE_NAME = "embeddings_int8_scales.npy"
+DOCUMENTS_FILE_NAME = "documents.json"
+VECTOR_FILE_NAMES = {EMBEDDINGS_FILE_NAME, INT8_CODES_FILE_NAME, INT8_SCALES_FILE_NAME}
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """Returns a float32 copy of the matrix with every row scaled to unit length."""
+    matrix = np.asarray(matrix, dtype=np.float32)
+    if matrix.ndim == 1:
+        matrix = matrix.reshape(1, -1)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def top_k_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k highest scores, best first, without sorting the whole array."""
+    k = min(k, scores.shape[0])
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    candidates = np.argpartition(-scores, k - 1)[:k]
+    return candidates[np.argsort(-scores[candidates])]
+
+
+class NumpyVectorStore(VectorStore):
+    """
+    Exact cosine-similarity vector store kept in a single contiguous float32 matrix.
+    Meant for small corpora like the security assessment guide, where a brute-force matmul is faster than an ANN index.
+    When persist_dir is set, the matrix is saved as a .npy file and memory-mapped on load, so opening is instant.
+
+    With quantization="int8", the vectors are scored against an in-memory int8 copy (4x smaller) and only the
+    best rerank_factor * k candidates are re-scored with the float vectors, which stay memory-mapped on disk.
+    The float vectors are only stored while re-ranking is on: rerank_factor=0 drops them from memory and disk
+    and ranks on the int8 scores alone
+    """
+
+    def __init__(
+        self,
+        embedding: Embeddings,
+        persist_dir: str | None = None,
+        quantization: str | None = None,
+        rerank_factor: int = 4,
+    ):
+        if quantization not in (None, "int8"):
+            raise ValueError(f"Unsupported quantization: {quantization}")
+
+        self._embedding = embedding
+        self._persist_dir = persist_dir
+        self._quantization = quantization
+        self._rerank_factor = rerank_factor if quantization else 0
+        self._write_lock = threading.Lock()
+        self._documents: list[Document] = []
+        self._matrix: np.ndarray | None = None
+        self._codes: np.ndarray | None = None
+        self._scales: np.ndarray | None = None
+
+        if persist_dir:
+            self._load()
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self._embedding
+
+    @property
+    def _keeps_float_vectors(self) -> bool:
+        return not self._quantization or self._rerank_factor > 0
+
+    def __len__(self) -> int:
+        return len(self._documents)
+
+    def _path(self, file_name: str) -> str:
+        return os.path.join(self._persist_dir, file_name)
+
+    def _load(self) -> None:
+        if not os.path.isfile(self._path(DOCUMENTS_FILE_NAME)):
+            return
+
+        with open(self._path(DOCUMENTS_FILE_NAME), "r", encoding="utf-8") as f:
+            documents = [Document(**doc) for doc in json.load(f)]
+
+        matrix = codes = scales = None
+        try:
+            if self._keeps_float_vectors:
+                matrix = np.load(self._path(EMBEDDINGS_FILE_NAME), mmap_mode="r")
+            if self._quantization:
+                # The int8 codes are what every query scans, so they are kept in RAM
+                codes = np.load(self._path(INT8_CODES_FILE_NAME))
+                scales = np.load(self._path(INT8_SCALES_FILE_NAME))
+        except FileNotFoundError:
+            logger.warning(
+                f"Numpy vectorstore at {self._persist_dir} was saved with different settings. Ignoring it."
+            )
+            return
+
+        row_counts = {len(a) for a in (matrix, codes) if a is not None}
+        if row_counts != {len(documents)}:
+            logger.warning(
+                f"Ignoring inconsistent numpy vectorstore at {self._persist_dir}"
+            )
+            return
+
+        self._documents, self._matrix, self._codes, self._scales = (
+            documents,
+            matrix,
+            codes,
+            scales,
+        )
+
+    def _save(self, arrays: dict[str, np.ndarray], documents: list[Document]) -> None:
+        os.makedirs(self._persist_dir, exist_ok=True)
+
+        # Written to temp files first, so readers never see a half-written store
+        for file_name, array in arrays.items():
+            with open(self._path(f"{file_name}.tmp"), "wb") as f:
+                np.save(f, np.ascontiguousarray(array))
+        with open(self._path(f"{DOCUMENTS_FILE_NAME}.tmp"), "w", encoding="utf-8") as f:
+            json.dump(
+                [
+                    {"id": d.id, "page_content": d.page_content, "metadata": d.metadata}
+                    for d in documents
+                ],
+                f,
+            )
+        for file_name in [*arrays, DOCUMENTS_FILE_NAME]:
+            os.replace(self._path(f"{file_name}.tmp"), self._path(file_name))
+
+    def _float_rows(self, rows: list[int]) -> np.ndarray:
+        if self._matrix is not None:
+            return np.asarray(self._matrix[rows], dtype=np.float32)
+        if self._codes is not None:
+            return dequantize_int8(self._codes[rows], self._scales[rows])
+        return np.empty((0, 0), dtype=np.float32)
+
+    def _replace_contents(self, matrix: np.ndarray, documents: list[Document]) -> None:
+        codes = scales = None
+        if self._quantization:
+            codes, scales = quantize_int8(matrix)
+        if not self._keeps_float_vectors:
+            matrix = None
+
+        if self._persist_dir:
+            arrays = {}
+            if matrix is not None:
+                arrays[EMBEDDINGS_FILE_NAME] = matrix.astype(np.float32)
+            if codes is not None:
+                arrays[INT8_CODES_FILE_NAME] = codes
+                arrays[INT8_SCALES_FILE_NAME] = scales
+            self._save(arrays, documents)
+            # Vectors saved with other settings, e.g. the float vectors once re-ranking is turned off
+            for file_name in VECTOR_FILE_NAMES - arrays.keys():
+                if os.path.exists(self._path(file_name)):
+                    os.remove(self._path(file_name))
+            if matrix is not None:
+                matrix = np.load(self._path(EMBEDDINGS_FILE_NAME), mmap_mode="r")
+
+        # Swap all references together; readers take a local copy of them before searching
+        self._documents, self._matrix, self._codes, self._scales = (
+            documents,
+            matrix,
+            codes,
+            scales,
+        )
+
+    def add_texts(
+        self,
+        texts: Iterable[str],
+        metadatas: Optional[list[dict]] = None,
+        *,
+        ids: Optional[list[str]] = None,
+        **kwargs: Any,
+    ) -> list[str]:
+        texts = list(texts)
+        if not texts:
+            return []
+        metadatas = metadatas or [{} for _ in texts]
+        ids = ids or [str(uuid.uuid4()) for _ in texts]
+        new_vectors = normalize_rows(self._embedding.embed_documents(texts))
+
+        with self._write_lock:
+            # Upsert semantics: re-added ids replace their previous version
+            replaced = set(ids)
+            keep = [i for i, d in enumerate(self._documents) if d.id not in replaced]
+            documents = [self._documents[i] for i in keep] + [
+                Document(id=doc_id, page_content=text, metadata=metadata)
+                for doc_id, text, metadata in zip(ids, texts, metadatas)
+            ]
+            if keep:
+                matrix = np.vstack([self._float_rows(keep), new_vectors])
+            else:
+                matrix = new_vectors
+            self._replace_contents(matrix, documents)
+
+        return ids
+
+    def delete(self, ids: Optional[list[str]] = None, **kwargs: Any) -> Optional[bool]:
+        if not ids:
+            return False
+
+        with self._write_lock:
+            removed = set(ids)
+            keep = [i for i, d in enumerate(self._documents) if d.id not in removed]
+            if len(keep) == len(self._documents):
+                return False
+            documents = [self._documents[i] for i in keep]
+            self._replace_contents(self._float_rows(keep), documents)
+        return True
+
+    def get_by_ids(self, ids: Sequence[str], /) -> list[Document]:
+        wanted = set(ids)
+        return [doc for doc in self._documents if doc.id in wanted]
+
+    def get_all_documents(self) -> list[Document]:
+        """Returns every stored document, in insertion order."""
+        return list(self._documents)
+
+    def memory_footprint_bytes(self) -> int:
+        """Bytes of vector data held in RAM. Memory-mapped float vectors are excluded, the OS pages them in on demand."""
+        total = 0
+        for array in (self._matrix, self._codes, self._scales):
+            if array is not None and not isinstance(array, np.memmap):
+                total += array.nbytes
+        return total
+
+    def similarity_search_by_vector_with_score(
+        self, embedding: list[float], k: int = 4
+    ) -> list[tuple[Document, float]]:
+        documents, matrix, codes, scales = (
+            self._documents,
+            self._matrix,
+            self._codes,
+            self._scales,
+        )
+        if not documents:
+            return []
+        query = normalize_rows(embedding)[0]
+
+        if codes is None:
+            scores = matrix @ query
+            return [(documents[i], float(scores[i])) for i in top_k_indices(scores, k)]
+
+        approximate = approximate_scores(codes, scales, query)
+        if matrix is None:
+            return [
+                (documents[i], float(approximate[i]))
+                for i in top_k_indices(approximate, k)
+            ]
+
+        # Re-rank the best int8 candidates with their exact float vectors
+        candidates = top_k_indices(approximate, k * self._rerank_factor)
+        candidates.sort()
+        exact = np.asarray(matrix[candidates], dtype=np.float32) @ query
+        return [
+            (documents[candidates[i]], float(exact[i])) for i in top_k_indices(exact, k)
+        ]
+
+    def similarity_search_with_score(
+        self, query: str, k: int = 4, **kwargs: Any
+    ) -> list[tuple[Document, float]]:
+        return self.similarity_search_by_vector_with_score(
+            self._embedding.embed_query(query), k=k
+        )
+
+    def similarity_search_by_vector(
+        self, embedding: list[float], k: int = 4, **kwargs: Any
+    ) -> list[Document]:
+        return [
+            doc
+            for doc, _ in self.similarity_search_by_vector_with_score(embedding, k=k)
+        ]
+
+    def similarity_search(
+        self, query: str, k: int = 4, **kwargs: Any
+    ) -> list[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k=k)]
+
+    @staticmethod
+    def _similarity_relevance_score_fn(similarity: float) -> float:
+        """Maps a cosine similarity in [-1, 1] to a relevance score in [0, 1]."""
+        return (similarity + 1.0) / 2.0
+
+    def _select_relevance_score_fn(self):
+        return self._similarity_relevance_score_fn
+
+    @classmethod
+    def from_texts(
+        cls,
+        texts: list[str],
+        embedding: Embeddings,
+        metadatas: Optional[list[dict]] = None,
+        *,
+        ids: Optional[list[str]] = None,
+        persist_dir: str | None = None,
+        quantization: str | None = None,
+        rerank_factor: int = 4,
+        **kwargs: Any,
+    ) -> "NumpyVectorStore":
+        store = cls(
+            embedding=embedding,
+            persist_dir=persist_dir,
+            quantization=quantization,
+            rerank_factor=rerank_factor,
+        )
+        store.add_texts(texts, metadatas, ids=ids)
+        return store
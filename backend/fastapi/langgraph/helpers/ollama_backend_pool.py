@@ -0,0 +1,318 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator
+
+import httpx
+import ollama
+from loguru import logger
+from langchain_core.embeddings import Embeddings
+from langchain_ollama import OllamaEmbeddings
+
+from backend.fastapi.langgraph.helpers.cancellation import (
+    RequestCancelledError,
+    raise_if_cancelled,
+)
+from backend.fastapi.langgraph.helpers.circuit_breaker import (
+    CircuitBreaker,
+    CircuitOpenError,
+)
+from backend.fastapi.langgraph.helpers.tracing import span
+
+# Comma separated Ollama servers. Adding a server here scales chat and embedding traffic horizontally
+OLLAMA_BASE_URLS = [
+    url.strip().rstrip("/")
+    for url in os.environ.get(
+        "OLLAMA_BASE_URLS",
+        os.environ.get("OLLAMA_BASE_URL", "http://localhost:11434"),
+    ).split(",")
+    if url.strip()
+]
+# Requests sent to one server at a time. Ollama queues the rest itself, but a queue there cannot be rebalanced
+OLLAMA_MAX_CONCURRENCY_PER_BACKEND = int(
+    os.environ.get("OLLAMA_MAX_CONCURRENCY_PER_BACKEND", "4")
+)
+# How long a request waits for a free slot before failing
+OLLAMA_BACKEND_WAIT_SECONDS = float(
+    os.environ.get("OLLAMA_BACKEND_WAIT_SECONDS", "120")
+)
+
+HEALTH_CHECK_INTERVAL_SECONDS = 10.0
+HEALTH_CHECK_TIMEOUT_SECONDS = 2.0
+# An ejected server is skipped for this long, doubled on every consecutive failure
+EJECTION_BASE_SECONDS = 5.0
+EJECTION_MAX_SECONDS = 120.0
+
+
+def normalize_model_name(model_name: str) -> str:
+    """Ollama lists "llama3.2" as "llama3.2:latest"."""
+    return model_name if ":" in model_name else f"{model_name}:latest"
+
+
+def is_connection_error(error: Exception) -> bool:
+    """Whether an error means the server could not be reached, rather than a bad request or a model error."""
+    return isinstance(error, (ConnectionError, httpx.TransportError))
+
+
+class OllamaBackend:
+    def __init__(self, base_url: str, max_concurrency: int):
+        self.base_url = base_url
+        self.max_concurrency = max_concurrency
+        self.outstanding = 0
+        self.models: set[str] | None = None  # None until the first health check
+        self.consecutive_failures = 0
+        self.ejected_until = 0.0
+        self.last_checked = 0.0
+
+    def is_available(self, now: float) -> bool:
+        return now >= self.ejected_until
+
+    def has_model(self, model_name: str) -> bool:
+        # A server that was never checked is assumed to have the model, its first request will tell
+        return self.models is None or normalize_model_name(model_name) in self.models
+
+    def to_dict(self, now: float) -> dict:
+        return {
+            "base_url": self.base_url,
+            "available": self.is_available(now),
+            "outstanding": self.outstanding,
+            "max_concurrency": self.max_concurrency,
+            "consecutive_failures": self.consecutive_failures,
+            "models": sorted(self.models) if self.models is not None else None,
+        }
+
+
+class OllamaBackendPool:
+    """
+    Spreads requests over several Ollama servers. Each request goes to the available server with the fewest
+    outstanding requests among those that have the model pulled, and waits when they are all at their
+    concurrency limit. Servers that fail to connect or fail their health check are ejected for a growing
+    period, and the periodic health check brings them back and refreshes their model lists
+    """
+
+    def __init__(self, base_urls: list[str], max_concurrency: int):
+        self.backends = [OllamaBackend(url, max_concurrency) for url in base_urls]
+        # Requests waiting in lease() for a free slot
+        self.waiting = 0
+        self._condition = threading.Condition()
+        self._health_thread: threading.Thread | None = None
+        self._stop = threading.Event()
+
+    def _candidates(self, model_name: str | None, now: float) -> list[OllamaBackend]:
+        available = [b for b in self.backends if b.is_available(now)]
+        if model_name is None:
+            return available
+        with_model = [b for b in available if b.has_model(model_name)]
+        # If no available server has the model, try them anyway: Ollama returns a clear "model not found" error
+        return with_model or available
+
+    @contextmanager
+    def lease(
+        self, model_name: str | None = None, exclude: set[str] | None = None
+    ) -> Iterator[str]:
+        """
+        Reserves a slot on the best server for a model, for the duration of the with block
+        :param model_name: the model the request needs, or None for any server
+        :param exclude: base URLs not to use, e.g. the ones that already failed this request
+        :return: the base URL of the chosen server
+        """
+        deadline = time.monotonic() + OLLAMA_BACKEND_WAIT_SECONDS
+        with self._condition:
+            is_waiting = False
+            try:
+                while True:
+                    now = time.monotonic()
+                    candidates = [
+                        b
+                        for b in self._candidates(model_name, now)
+                        if not exclude or b.base_url not in exclude
+                    ]
+                    if not candidates:
+                        # Every server is ejected or excluded: use the one coming back first rather than fail
+                        candidates = [
+                            min(
+                                (
+                                    b
+                                    for b in self.backends
+                                    if not exclude or b.base_url not in exclude
+                                ),
+                                key=lambda b: b.ejected_until,
+                                default=None,
+                            )
+                        ]
+                        if candidates[0] is None:
+                            raise ConnectionError("No Ollama server left to try")
+
+                    free = [b for b in candidates if b.outstanding < b.max_concurrency]
+                    if free:
+                        backend = min(free, key=lambda b: b.outstanding)
+                        backend.outstanding += 1
+                        break
+
+                    remaining = deadline - now
+                    if remaining <= 0:
+                        raise TimeoutError(
+                            f"No Ollama server had a free slot for {model_name} within {OLLAMA_BACKEND_WAIT_SECONDS}s"
+                        )
+                    # A request whose client left gives up its place in the queue, and so do all waiting
+                    # requests once the circuit opens
+                    raise_if_cancelled(f"waiting for an Ollama server for {model_name}")
+                    ollama_circuit.raise_if_open()
+                    if not is_waiting:
+                        is_waiting = True
+                        self.waiting += 1
+                    self._condition.wait(timeout=min(remaining, 1.0))
+            finally:
+                if is_waiting:
+                    self.waiting -= 1
+
+        try:
+            yield backend.base_url
+        finally:
+            with self._condition:
+                backend.outstanding -= 1
+                # Waiters may need different models, so they all re-check which server is free for them
+                self._condition.notify_all()
+
+    def report_success(self, base_url: str) -> None:
+        with self._condition:
+            backend = self._backend(base_url)
+            if backend and backend.consecutive_failures:
+                backend.consecutive_failures = 0
+                backend.ejected_until = 0.0
+
+    def report_failure(self, base_url: str, error: Exception) -> None:
+        """Ejects a server after a connection failure. Other errors (bad request, model errors) are not its fault."""
+        if not is_connection_error(error):
+            return
+        with self._condition:
+            backend = self._backend(base_url)
+            if backend is None:
+                return
+            backend.consecutive_failures += 1
+            ejection = min(
+                EJECTION_BASE_SECONDS * 2 ** (backend.consecutive_failures - 1),
+                EJECTION_MAX_SECONDS,
+            )
+            backend.ejected_until = time.monotonic() + ejection
+            self._condition.notify_all()
+        logger.warning(f"Ejected Ollama server {base_url} for {ejection:.0f}s: {error}")
+
+    def _backend(self, base_url: str) -> OllamaBackend | None:
+        return next((b for b in self.backends if b.base_url == base_url), None)
+
+    def check_backends(self) -> None:
+        """Refreshes the model list of every server. Unreachable servers are ejected, reachable ones restored."""
+        for backend in self.backends:
+            client = ollama.Client(
+                host=backend.base_url, timeout=HEALTH_CHECK_TIMEOUT_SECONDS
+            )
+            try:
+                models = {model.model for model in client.list().models}
+            except Exception as e:
+                self.report_failure(backend.base_url, ConnectionError(str(e)))
+                continue
+            with self._condition:
+                backend.models = models
+                backend.last_checked = time.monotonic()
+                backend.consecutive_failures = 0
+                backend.ejected_until = 0.0
+                self._condition.notify_all()
+
+    def start_health_checks(self) -> None:
+        """Starts the background health check thread, once."""
+        if self._health_thread is not None:
+            return
+        self._stop.clear()
+
+        def run():
+            while not self._stop.is_set():
+                try:
+                    self.check_backends()
+                except Exception as e:
+                    logger.error(f"Ollama health check failed: {e}")
+                self._stop.wait(HEALTH_CHECK_INTERVAL_SECONDS)
+
+        self._health_thread = threading.Thread(
+            target=run, name="ollama-health", daemon=True
+        )
+        self._health_thread.start()
+
+    def stop_health_checks(self) -> None:
+        self._stop.set()
+        self._health_thread = None
+
+    def status(self) -> list[dict]:
+        now = time.monotonic()
+        with self._condition:
+            return [backend.to_dict(now) for backend in self.backends]
+
+
+ollama_pool = OllamaBackendPool(OLLAMA_BASE_URLS, OLLAMA_MAX_CONCURRENCY_PER_BACKEND)
+
+# Wraps every call to the model layer, so requests fail fast instead of piling up while Ollama is down or
+# overloaded. Waiting for a free server slot for longer than OLLAMA_BACKEND_WAIT_SECONDS is such a failure
+ollama_circuit = CircuitBreaker(
+    "ollama",
+    is_failure=lambda e: is_connection_error(e) or isinstance(e, TimeoutError),
+    ignored=(RequestCancelledError, CircuitOpenError),
+)
+
+
+def call_with_backend(
+    model_name: str | None, function, slow_call_seconds: float | None = None
+):
+    """
+    Calls function(base_url) on the best server for the model. When a server cannot be reached, it is ejected
+    and the call is retried once on every other server
+    :param model_name: the model the call needs
+    :param function: takes the server's base URL and makes the request
+    :param slow_call_seconds: the duration from which the call counts as failed for the circuit breaker,
+        CIRCUIT_SLOW_CALL_SECONDS by default
+    :return: what function returns
+    :raises CircuitOpenError: right away, while the Ollama circuit is open
+    """
+    with ollama_circuit.guard(slow_call_seconds):
+        tried = set()
+        while True:
+            with ollama_pool.lease(model_name, exclude=tried) as base_url:
+                try:
+                    result = function(base_url)
+                except Exception as e:
+                    ollama_pool.report_failure(base_url, e)
+                    tried.add(base_url)
+                    if not is_connection_error(e) or len(tried) >= len(
+                        ollama_pool.backends
+                    ):
+                        raise
+                    continue
+            ollama_pool.report_success(base_url)
+            return result
+
+
+class PooledOllamaEmbeddings(Embeddings):
+    """OllamaEmbeddings whose every call goes through the backend pool."""
+
+    def __init__(self, model: str):
+        self.model = model
+        self._clients: dict[str, OllamaEmbeddings] = {}
+
+    def _client(self, base_url: str) -> OllamaEmbeddings:
+        if base_url not in self._clients:
+            self._clients[base_url] = OllamaEmbeddings(
+                model=self.model, base_url=base_url
+            )
+        return self._clients[base_url]
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        with span("embed", model=self.model, texts=len(texts)):
+            return call_with_backend(
+                self.model, lambda url: self._client(url).embed_documents(texts)
+            )
+
+    def embed_query(self, text: str) -> list[float]:
+        with span("embed", model=self.model, texts=1):
+            return call_with_backend(
+                self.model, lambda url: self._client(url).embed_query(text)
+            )
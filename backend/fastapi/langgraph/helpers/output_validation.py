@@ -1,3 +1,7 @@
+import os
+import random
+from concurrent.futures import ThreadPoolExecutor
+
 from langchain_core.messages import HumanMessage
 from loguru import logger
 from .graph_state_classes import (
@@ -6,7 +10,25 @@ from .graph_state_classes import (
     AssetCollection,
     ThreatItemCollection,
 )
-from .model_config import fetch_model_from_ollama
+from .cancellation import RequestCancelledError
+from .circuit_breaker import CircuitOpenError
+from .model_routing import get_route, get_routed_model, record_route_agreement
+from .retry_budget import DiscardedAttempt
+
+# Share of validations that are also run on the reference route in the background, to measure how often
+# the validation route's (smaller) models agree with it
+VALIDATION_AGREEMENT_SAMPLE_RATE = float(
+    os.environ.get("VALIDATION_AGREEMENT_SAMPLE_RATE", "0.05")
+)
+_agreement_pool = ThreadPoolExecutor(
+    max_workers=1, thread_name_prefix="validation-agreement"
+)
+
+
+class ValidationUnavailableError(DiscardedAttempt):
+    """The validator could not give a verdict, e.g. its model failed or returned an unparsable answer."""
+
+    validation_result = "error"
 
 
 def create_business_validation_prompt(
@@ -88,26 +110,57 @@ def create_threats_validation_prompt(
     """
 
 
+def _check_validation_agreement(
+    prompt: str, model_name: str, result: BusinessValidationResult
+) -> None:
+    try:
+        reference = get_routed_model(
+            "output_validation_reference", BusinessValidationResult
+        )
+        reference_result = reference.invoke([HumanMessage(content=prompt)])
+        record_route_agreement(
+            "output_validation",
+            model_name,
+            reference_result.is_valid == result.is_valid,
+        )
+    except Exception as e:
+        logger.warning(f"Validation agreement check failed: {e}")
+
+
 def validate_generated_output(
-    prompt: str, llm_model_name: str = "llama3.2"
+    prompt: str, llm_model_name: str | None = None
 ) -> BusinessValidationResult:
     """
     Validates whether the business generated is acceptable or not.
     :param prompt: takes in prompt for validation, which is a string that contains the input and output of the business generation function
-    :param llm_model_name: the name of the model based on the ollama model registry
+    :param llm_model_name: optional model pinned instead of the output_validation route's models, based on the ollama model registry
     :return: whether the model's response is acceptable or note
+    :raises ValidationUnavailableError: if the validator gave no verdict, which says nothing about the output
     """
 
-    ollama_llm = fetch_model_from_ollama(llm_model_name)
-    ollama_llm_with_structured_output = ollama_llm.with_structured_output(
-        BusinessValidationResult
-    )
-
     try:
-        return ollama_llm_with_structured_output.invoke([HumanMessage(content=prompt)])
+        ollama_llm_with_structured_output = get_routed_model(
+            "output_validation", BusinessValidationResult, llm_model_name
+        )
+        result, model_name = ollama_llm_with_structured_output.invoke_with_model(
+            [HumanMessage(content=prompt)]
+        )
+
+        reference_models = get_route("output_validation_reference")["models"]
+        if (
+            model_name not in reference_models
+            and random.random() < VALIDATION_AGREEMENT_SAMPLE_RATE
+        ):
+            _agreement_pool.submit(
+                _check_validation_agreement, prompt, model_name, result
+            )
+        return result
+    except (RequestCancelledError, CircuitOpenError):
+        # Not a verdict on the output: the run is abandoned
+        raise
     except Exception as e:
         logger.error(f"Validation failed: {e}")
-        return BusinessValidationResult(is_valid=False, reason="Validation error")
+        raise ValidationUnavailableError(f"Validation error: {e}") from e
 
 
 def format_items_for_llm(items: AssetCollection | ThreatItemCollection) -> str | None:
@@ -0,0 +1,210 @@
+import os
+import threading
+from typing import NamedTuple, Sequence
+
+import numpy as np
+from chromadb.api.models.Collection import Collection
+
+from backend.fastapi.langgraph.helpers.chroma_client_registry import (
+    get_chroma_collection,
+)
+from backend.fastapi.langgraph.helpers.embedding_quantization import (
+    approximate_scores,
+    quantize_int8,
+)
+from backend.fastapi.langgraph.helpers.numpy_vector_store import (
+    normalize_rows,
+    top_k_indices,
+)
+from backend.fastapi.langgraph.helpers.tracing import span
+
+# Embeddings read from Chroma per request while an index is built
+LOAD_PAGE_SIZE = 1000
+
+_indexes: dict[tuple[str, str], "QuantizedIndex"] = {}
+_indexes_lock = threading.Lock()
+
+
+class Match(NamedTuple):
+    id: str
+    # Exact cosine similarity, from the float vector Chroma stores
+    similarity: float
+    metadata: dict | None
+    document: str | None
+
+
+class QuantizedIndex:
+    """
+    An int8 copy (4x smaller than float32) of a Chroma collection's embeddings, kept in memory next to it.
+    A query scans every int8 vector, instead of Chroma's HNSW index, and only the best candidates are
+    re-scored with the float vectors Chroma stores. Writes made through the collection handle by others
+    (e.g. another process) are only seen once the index is rebuilt
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._ids: list[str] = []
+        self._rows: dict[str, int] = {}
+        # Grown by doubling, so adding one vector at a time does not copy the whole index
+        self._codes = np.empty((0, 0), dtype=np.int8)
+        self._scales = np.empty(0, dtype=np.float32)
+
+    @classmethod
+    def from_collection(cls, collection: Collection) -> "QuantizedIndex":
+        """Builds the index from every embedding stored in a collection, reading them a page at a time."""
+        index = cls()
+        count = collection.count()
+        with span("quantized_index.load", collection=collection.name, vectors=count):
+            for offset in range(0, count, LOAD_PAGE_SIZE):
+                page = collection.get(
+                    include=["embeddings"], limit=LOAD_PAGE_SIZE, offset=offset
+                )
+                if not page["ids"]:
+                    continue
+                if not len(index):
+                    # Sized for the whole collection up front, instead of doubling page after page
+                    index._reserve(count, len(page["embeddings"][0]))
+                index.upsert(page["ids"], page["embeddings"])
+        return index
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def _reserve(self, rows: int, dim: int) -> None:
+        if self._codes.shape[1] != dim and self._ids:
+            raise ValueError(
+                f"Expected {self._codes.shape[1]}-dim embeddings, got {dim}-dim ones"
+            )
+        if rows <= self._codes.shape[0] and self._codes.shape[1] == dim:
+            return
+        capacity = max(rows, 2 * self._codes.shape[0], 64)
+        codes = np.empty((capacity, dim), dtype=np.int8)
+        scales = np.empty(capacity, dtype=np.float32)
+        size = len(self._ids)
+        if size:
+            codes[:size] = self._codes[:size]
+            scales[:size] = self._scales[:size]
+        self._codes, self._scales = codes, scales
+
+    def upsert(self, ids: Sequence[str], embeddings) -> None:
+        """Adds the embeddings under their ids, replacing the ones already indexed under the same id."""
+        if not len(ids):
+            return
+        codes, scales = quantize_int8(normalize_rows(embeddings))
+        with self._lock:
+            new_ids = {doc_id for doc_id in ids if doc_id not in self._rows}
+            self._reserve(len(self._ids) + len(new_ids), codes.shape[1])
+            for doc_id, code, scale in zip(ids, codes, scales):
+                row = self._rows.get(doc_id)
+                if row is None:
+                    row = len(self._ids)
+                    self._ids.append(doc_id)
+                    self._rows[doc_id] = row
+                self._codes[row] = code
+                self._scales[row] = scale
+
+    def delete(self, ids: Sequence[str]) -> None:
+        """Removes the ids, moving the last vector into each freed row."""
+        with self._lock:
+            for doc_id in ids:
+                row = self._rows.pop(doc_id, None)
+                if row is None:
+                    continue
+                last = len(self._ids) - 1
+                if row != last:
+                    moved = self._ids[last]
+                    self._ids[row] = moved
+                    self._rows[moved] = row
+                    self._codes[row] = self._codes[last]
+                    self._scales[row] = self._scales[last]
+                self._ids.pop()
+
+    def candidates(self, embedding, count: int) -> list[str]:
+        """The ids of the count vectors with the highest approximate cosine similarity, best first."""
+        query = normalize_rows(embedding)[0]
+        with self._lock:
+            size = len(self._ids)
+            if not size:
+                return []
+            scores = approximate_scores(self._codes[:size], self._scales[:size], query)
+            return [self._ids[i] for i in top_k_indices(scores, count)]
+
+    def query(
+        self,
+        collection: Collection,
+        embeddings: list,
+        k: int = 1,
+        candidates: int = 8,
+        include: Sequence[str] = (),
+    ) -> list[list[Match]]:
+        """
+        The k most similar indexed vectors of each query vector, re-scored exactly
+        :param collection: the Chroma collection holding the float vectors, documents and metadata
+        :param embeddings: query vectors
+        :param k: matches per query
+        :param candidates: vectors per query re-scored with their float vector, at least k
+        :param include: "metadatas" and/or "documents", to return with the matches
+        :return: the matches of each query, most similar first
+        """
+        candidate_ids = [
+            self.candidates(embedding, max(k, candidates)) for embedding in embeddings
+        ]
+        wanted = list(dict.fromkeys(i for ids in candidate_ids for i in ids))
+        if not wanted:
+            return [[] for _ in embeddings]
+
+        stored = collection.get(ids=wanted, include=["embeddings", *include])
+        rows = {doc_id: row for row, doc_id in enumerate(stored["ids"])}
+        vectors = normalize_rows(stored["embeddings"])
+        metadatas = stored.get("metadatas") or [None] * len(rows)
+        documents = stored.get("documents") or [None] * len(rows)
+
+        results = []
+        for query, ids in zip(normalize_rows(embeddings), candidate_ids):
+            # Ids another writer removed from the collection are skipped
+            found = [rows[doc_id] for doc_id in ids if doc_id in rows]
+            scores = vectors[found] @ query
+            results.append(
+                [
+                    Match(
+                        stored["ids"][found[i]],
+                        float(scores[i]),
+                        metadatas[found[i]],
+                        documents[found[i]],
+                    )
+                    for i in top_k_indices(scores, k)
+                ]
+            )
+        return results
+
+    def memory_footprint_bytes(self) -> int:
+        """Bytes held by the int8 codes and their scales, including the room kept for new vectors."""
+        return self._codes.nbytes + self._scales.nbytes
+
+
+def get_quantized_index(db_path: str, collection_name: str) -> QuantizedIndex:
+    """
+    The shared quantized index of a collection, built from the collection on first use
+    :param db_path: path to the ChromaDB directory
+    :param collection_name: an already sanitized collection name
+    :return: the process-wide index of that collection
+    """
+    key = (os.path.abspath(db_path), collection_name)
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is None:
+            index = QuantizedIndex.from_collection(
+                get_chroma_collection(db_path, collection_name)
+            )
+            _indexes[key] = index
+        return index
+
+
+def update_quantized_index(
+    db_path: str, collection_name: str, ids: Sequence[str], embeddings
+) -> None:
+    """Upserts vectors written to a collection into its shared index, if one was built. Otherwise does nothing."""
+    with _indexes_lock:
+        index = _indexes.get((os.path.abspath(db_path), collection_name))
+    if index is not None:
+        index.upsert(ids, embeddings)
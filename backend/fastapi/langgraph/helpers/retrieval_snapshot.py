@@ -0,0 +1,252 @@
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+from typing import NamedTuple
+
+from loguru import logger
+from langchain.schema import Document
+from langchain_core.embeddings import Embeddings
+
+from backend.fastapi.langgraph.helpers.numpy_vector_store import NumpyVectorStore
+from backend.fastapi.langgraph.helpers.ollama_backend_pool import PooledOllamaEmbeddings
+from backend.fastapi.langgraph.helpers.vector_db_operations import (
+    custom_numbered_header_split,
+    load_markdown,
+    hash_document_chunk,
+    split_guide_for_indexing,
+    GUIDE_CHUNKING,
+    GUIDE_CHUNK_MAX_TOKENS,
+    GUIDE_CHUNK_OVERLAP_TOKENS,
+)
+
+# Bump whenever the splitting logic or the snapshot layout changes, so old snapshots are rebuilt
+SNAPSHOT_FORMAT_VERSION = 2
+SNAPSHOT_METADATA_FILE_NAME = "metadata.json"
+SECTION_MAP_FILE_NAME = "section_map.json"
+SECTIONS_FILE_NAME = "sections.json"
+SNAPSHOT_INDEX_DIR_NAME = "index"
+
+DEFAULT_SNAPSHOT_DIR = os.environ.get(
+    "RETRIEVAL_SNAPSHOT_DIR", "backend/retrieval_snapshot"
+)
+
+
+class RetrievalSnapshot(NamedTuple):
+    vectorstore: NumpyVectorStore
+    split_docs: list[Document]
+    section_map: dict[str, str]
+
+
+def compute_snapshot_version(input_file_path: str, embedding_model: str) -> str | None:
+    """
+    Hashes everything a snapshot depends on: the guide's content, the embedding model, the chunking settings
+    and the snapshot format
+    :return: the hex sha256 version string, or None if the guide cannot be read
+    """
+    markdown_text = load_markdown(input_file_path)
+    if markdown_text is None:
+        return None
+
+    hasher = hashlib.sha256()
+    hasher.update(markdown_text.encode("utf-8"))
+    hasher.update(embedding_model.encode("utf-8"))
+    hasher.update(str(SNAPSHOT_FORMAT_VERSION).encode("utf-8"))
+    hasher.update(
+        f"{GUIDE_CHUNKING}:{GUIDE_CHUNK_MAX_TOKENS}:{GUIDE_CHUNK_OVERLAP_TOKENS}".encode(
+            "utf-8"
+        )
+    )
+    return hasher.hexdigest()
+
+
+def build_section_map(split_docs: list[Document]) -> dict[str, str]:
+    """Maps each section number to its title."""
+    return {
+        doc.metadata["section_number"]: doc.metadata["title"]
+        for doc in split_docs
+        if "section_number" in doc.metadata
+    }
+
+
+def _ollama_embeddings(embedding_model: str) -> Embeddings:
+    return PooledOllamaEmbeddings(embedding_model)
+
+
+def build_retrieval_snapshot(
+    input_file_path: str,
+    snapshot_dir: str = DEFAULT_SNAPSHOT_DIR,
+    embedding_model: str = "mxbai-embed-large",
+    embeddings: Embeddings | None = None,
+) -> dict:
+    """
+    Builds a snapshot of the whole retrieval state of the security assistant: split sections, section map,
+    indexed chunks with their embeddings, and index metadata. The snapshot is built in a temporary directory and moved into place at the end,
+    so a snapshot directory is always either complete or absent
+    :param input_file_path: path to the security assessment guide
+    :param snapshot_dir: where the snapshot is written. Existing snapshots are replaced
+    :param embedding_model: Ollama model name for embeddings
+    :param embeddings: optional embeddings instance overriding the Ollama model, mainly for benchmarks
+    :return: the snapshot metadata
+    """
+    version = compute_snapshot_version(input_file_path, embedding_model)
+    if version is None:
+        raise FileNotFoundError(f"Could not read {input_file_path}")
+
+    split_docs = custom_numbered_header_split(load_markdown(input_file_path))
+    chunks = split_guide_for_indexing(split_docs)
+    parent_dir = os.path.dirname(os.path.abspath(snapshot_dir))
+    os.makedirs(parent_dir, exist_ok=True)
+    build_dir = tempfile.mkdtemp(prefix=".snapshot_build_", dir=parent_dir)
+
+    try:
+        start_time = time.perf_counter()
+        vectorstore = NumpyVectorStore(
+            embedding=embeddings or _ollama_embeddings(embedding_model),
+            persist_dir=os.path.join(build_dir, SNAPSHOT_INDEX_DIR_NAME),
+        )
+        vectorstore.add_documents(
+            chunks, ids=[hash_document_chunk(doc) for doc in chunks]
+        )
+
+        with open(
+            os.path.join(build_dir, SECTION_MAP_FILE_NAME), "w", encoding="utf-8"
+        ) as f:
+            json.dump(build_section_map(split_docs), f, indent=2)
+        with open(
+            os.path.join(build_dir, SECTIONS_FILE_NAME), "w", encoding="utf-8"
+        ) as f:
+            json.dump(
+                [
+                    {"page_content": doc.page_content, "metadata": doc.metadata}
+                    for doc in split_docs
+                ],
+                f,
+            )
+
+        metadata = {
+            "version": version,
+            "format_version": SNAPSHOT_FORMAT_VERSION,
+            "embedding_model": embedding_model,
+            "source_file": os.path.basename(input_file_path),
+            "document_count": len(chunks),
+            "section_count": len(split_docs),
+            "chunking": GUIDE_CHUNKING,
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        }
+        with open(
+            os.path.join(build_dir, SNAPSHOT_METADATA_FILE_NAME), "w", encoding="utf-8"
+        ) as f:
+            json.dump(metadata, f, indent=2)
+
+        if os.path.exists(snapshot_dir):
+            shutil.rmtree(snapshot_dir)
+        os.replace(build_dir, snapshot_dir)
+
+        logger.success(
+            f"Built retrieval snapshot {version[:12]} with {len(chunks)} chunks "
+            f"in {time.perf_counter() - start_time:.1f}s at {snapshot_dir}"
+        )
+        return metadata
+
+    finally:
+        shutil.rmtree(build_dir, ignore_errors=True)
+
+
+def read_snapshot_metadata(snapshot_dir: str = DEFAULT_SNAPSHOT_DIR) -> dict | None:
+    """Returns the metadata of a snapshot, or None if there is no complete snapshot in the directory."""
+    try:
+        with open(
+            os.path.join(snapshot_dir, SNAPSHOT_METADATA_FILE_NAME),
+            "r",
+            encoding="utf-8",
+        ) as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+
+
+def load_retrieval_snapshot(
+    input_file_path: str,
+    snapshot_dir: str = DEFAULT_SNAPSHOT_DIR,
+    embedding_model: str = "mxbai-embed-large",
+    embeddings: Embeddings | None = None,
+) -> RetrievalSnapshot | None:
+    """
+    Loads a snapshot, memory-mapping its embeddings. The snapshot is only used if its version matches the
+    current guide and embedding model, so an outdated snapshot is never served
+    :param input_file_path: path to the security assessment guide the snapshot must match
+    :param snapshot_dir: the snapshot directory
+    :param embedding_model: Ollama model name used to embed queries
+    :param embeddings: optional embeddings instance overriding the Ollama model, mainly for benchmarks
+    :return: the loaded snapshot, or None if it is missing or stale
+    """
+    start_time = time.perf_counter()
+    metadata = read_snapshot_metadata(snapshot_dir)
+    if metadata is None:
+        logger.info(f"No retrieval snapshot found at {snapshot_dir}")
+        return None
+
+    expected_version = compute_snapshot_version(input_file_path, embedding_model)
+    if metadata.get("version") != expected_version:
+        logger.warning(
+            f"Retrieval snapshot at {snapshot_dir} is stale (built for a different guide or model). Ignoring it."
+        )
+        return None
+
+    try:
+        vectorstore = NumpyVectorStore(
+            embedding=embeddings or _ollama_embeddings(embedding_model),
+            persist_dir=os.path.join(snapshot_dir, SNAPSHOT_INDEX_DIR_NAME),
+        )
+        with open(
+            os.path.join(snapshot_dir, SECTION_MAP_FILE_NAME), "r", encoding="utf-8"
+        ) as f:
+            section_map = json.load(f)
+        with open(
+            os.path.join(snapshot_dir, SECTIONS_FILE_NAME), "r", encoding="utf-8"
+        ) as f:
+            split_docs = [Document(**doc) for doc in json.load(f)]
+    except (OSError, json.JSONDecodeError) as e:
+        logger.error(f"Failed to load retrieval snapshot: {e}")
+        return None
+
+    if len(vectorstore) != metadata.get("document_count"):
+        logger.warning(
+            f"Retrieval snapshot at {snapshot_dir} is incomplete. Ignoring it."
+        )
+        return None
+
+    logger.info(
+        f"Loaded retrieval snapshot {expected_version[:12]} in "
+        f"{(time.perf_counter() - start_time) * 1000:.1f}ms"
+    )
+    return RetrievalSnapshot(vectorstore, split_docs, section_map)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Build or verify the security assistant retrieval snapshot"
+    )
+    parser.add_argument("command", choices=["build", "verify"])
+    parser.add_argument(
+        "--input",
+        default="backend/fastapi/langgraph/input_files/SecurityAssessmentTemplate-Guide.md",
+    )
+    parser.add_argument("--output", default=DEFAULT_SNAPSHOT_DIR)
+    parser.add_argument("--embedding-model", default="mxbai-embed-large")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        build_retrieval_snapshot(args.input, args.output, args.embedding_model)
+    elif load_retrieval_snapshot(args.input, args.output, args.embedding_model):
+        logger.success(f"Snapshot at {args.output} is up to date")
+    else:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,271 @@
+import math
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError, as_completed
+from typing import Any, Callable, NamedTuple
+
+from loguru import logger
+
+from backend.fastapi.langgraph.helpers.cancellation import (
+    cancellation_scope,
+    linked_cancellation,
+    raise_if_cancelled,
+)
+from backend.fastapi.langgraph.helpers.metrics import VALIDATION_RESULTS
+from backend.fastapi.langgraph.helpers.model_routing import (
+    get_last_routed_model,
+    track_stage_run,
+)
+from backend.fastapi.langgraph.helpers.tracing import in_current_context, span
+
+# Validation results per stage the acceptance rate is computed over
+ACCEPTANCE_WINDOW_SIZE = int(os.environ.get("ACCEPTANCE_WINDOW_SIZE", "50"))
+# Attempts are planned so that at least one is accepted with this probability, given the acceptance rate
+TARGET_ACCEPTANCE_PROBABILITY = float(
+    os.environ.get("TARGET_ACCEPTANCE_PROBABILITY", "0.99")
+)
+MAX_STAGE_ATTEMPTS = int(os.environ.get("MAX_STAGE_ATTEMPTS", "5"))
+# A generate-and-validate run starts no new attempt after this long
+STAGE_DEADLINE_SECONDS = float(os.environ.get("STAGE_DEADLINE_SECONDS", "180"))
+# Attempts run in parallel when sequential attempts would not fit the deadline. 1 disables it
+MAX_SPECULATIVE_FAN_OUT = int(os.environ.get("MAX_SPECULATIVE_FAN_OUT", "2"))
+
+# Until a stage has this many validation results, it gets the historical fixed 3 attempts
+MIN_ACCEPTANCE_SAMPLES = 10
+DEFAULT_STAGE_ATTEMPTS = 3
+
+# (model, accepted) and attempt durations in seconds, per stage
+_acceptance_windows: dict[str, deque] = {}
+_attempt_latencies: dict[str, deque] = {}
+_windows_lock = threading.Lock()
+
+_speculative_pool = ThreadPoolExecutor(
+    max_workers=max(1, MAX_SPECULATIVE_FAN_OUT * 4),
+    thread_name_prefix="speculative-attempt",
+)
+
+
+class DiscardedAttempt(Exception):
+    """
+    Raised by an attempt that ends without a verdict on its output, e.g. because the validator could not be
+    reached. The attempt is retried, but does not count towards the stage's acceptance rate
+    """
+
+    # The VALIDATION_RESULTS result it is counted as, if any
+    validation_result: str | None = None
+
+
+class RetryPlan(NamedTuple):
+    max_attempts: int
+    # Attempts started together per round
+    fan_out: int
+    deadline_seconds: float
+    acceptance_rate: float | None
+    attempt_latency_seconds: float | None
+
+
+def record_attempt(
+    stage: str, model_name: str | None, accepted: bool, latency_seconds: float
+) -> None:
+    """Adds a validated attempt to the stage's sliding windows."""
+    with _windows_lock:
+        _acceptance_windows.setdefault(
+            stage, deque(maxlen=ACCEPTANCE_WINDOW_SIZE)
+        ).append((model_name, accepted))
+        _attempt_latencies.setdefault(
+            stage, deque(maxlen=ACCEPTANCE_WINDOW_SIZE)
+        ).append(latency_seconds)
+
+
+def _smoothed_rate(accepted: int, total: int) -> float:
+    # Laplace smoothing: a short streak of acceptances does not make the rate 1
+    return (accepted + 1) / (total + 2)
+
+
+def plan_retries(stage: str, max_attempts: int | None = None) -> RetryPlan:
+    """
+    Plans a generate-and-validate run from the stage's recent acceptance rate and attempt latency: enough
+    attempts to reach TARGET_ACCEPTANCE_PROBABILITY, and parallel attempts if they would not fit the deadline
+    one after the other
+    :param stage: the pipeline stage
+    :param max_attempts: optional cap, MAX_STAGE_ATTEMPTS by default
+    :return: the plan
+    """
+    cap = max_attempts or MAX_STAGE_ATTEMPTS
+    with _windows_lock:
+        results = [accepted for _, accepted in _acceptance_windows.get(stage, ())]
+        latencies = sorted(_attempt_latencies.get(stage, ()))
+
+    if len(results) < MIN_ACCEPTANCE_SAMPLES:
+        return RetryPlan(
+            min(DEFAULT_STAGE_ATTEMPTS, cap), 1, STAGE_DEADLINE_SECONDS, None, None
+        )
+
+    rate = _smoothed_rate(sum(results), len(results))
+    needed = math.ceil(math.log(1 - TARGET_ACCEPTANCE_PROBABILITY) / math.log(1 - rate))
+    attempts = max(1, min(needed, cap))
+
+    attempt_latency = latencies[len(latencies) // 2]
+    sequential_fit = max(1, int(STAGE_DEADLINE_SECONDS // max(attempt_latency, 1e-3)))
+    fan_out = 1
+    if attempts > sequential_fit:
+        fan_out = min(MAX_SPECULATIVE_FAN_OUT, math.ceil(attempts / sequential_fit))
+    return RetryPlan(
+        attempts, max(1, fan_out), STAGE_DEADLINE_SECONDS, rate, attempt_latency
+    )
+
+
+def _run_attempt(
+    stage: str, attempt: Callable[[int], tuple[Any, bool | None]], number: int
+) -> tuple[Any, bool | None]:
+    with span(f"{stage}.attempt", attempt=number) as attempt_span:
+        start_time = time.perf_counter()
+        try:
+            result, is_valid = attempt(number)
+        except DiscardedAttempt as e:
+            raise_if_cancelled(f"retrying {stage} attempt {number}")
+            logger.warning(f"{stage} attempt {number} discarded: {e}")
+            if e.validation_result:
+                VALIDATION_RESULTS.inc(stage=stage, result=e.validation_result)
+            attempt_span.set(discarded=str(e))
+            # Retried like a rejection, but not recorded as one
+            return None, False
+        # The agents catch the cancellation of their LLM calls as a failure, which must not count as a rejection
+        raise_if_cancelled(f"validating {stage} attempt {number}")
+        if is_valid is not None:
+            model_name = get_last_routed_model(stage)
+            record_attempt(
+                stage, model_name, is_valid, time.perf_counter() - start_time
+            )
+            VALIDATION_RESULTS.inc(
+                stage=stage, result="accepted" if is_valid else "rejected"
+            )
+            attempt_span.set(is_valid=is_valid, model=model_name)
+        return result, is_valid
+
+
+def _run_speculative_attempt(
+    stage: str,
+    attempt: Callable[[int], tuple[Any, bool | None]],
+    number: int,
+    cancellation: threading.Event,
+) -> tuple[Any, bool | None]:
+    with cancellation_scope(cancellation):
+        return _run_attempt(stage, attempt, number)
+
+
+def run_validated_stage(
+    stage: str,
+    attempt: Callable[[int], tuple[Any, bool | None]],
+    max_attempts: int | None = None,
+) -> Any:
+    """
+    Runs generate-and-validate attempts of a stage until one is accepted, following plan_retries
+    :param stage: the pipeline stage
+    :param attempt: generates and validates once. Takes the attempt number and returns the result and whether
+        it was accepted, or (None, None) if generation failed, which ends the run. Raises DiscardedAttempt to be
+        retried without a verdict
+    :param max_attempts: optional cap on the attempts
+    :return: the first accepted result, or None
+    :raises RequestCancelledError: if the request's client disconnected, so no further attempt is made
+    """
+    plan = plan_retries(stage, max_attempts)
+    deadline = time.monotonic() + plan.deadline_seconds
+    logger.info(
+        f"{stage}: up to {plan.max_attempts} attempts, {plan.fan_out} at a time "
+        f"(acceptance rate {plan.acceptance_rate if plan.acceptance_rate is None else round(plan.acceptance_rate, 2)})"
+    )
+
+    with track_stage_run(stage) as run:
+        while run["attempts"] < plan.max_attempts:
+            raise_if_cancelled(f"{stage} attempt {run['attempts'] + 1}")
+            remaining = deadline - time.monotonic()
+            if run["attempts"] and remaining <= 0:
+                logger.warning(
+                    f"{stage}: deadline of {plan.deadline_seconds:.0f}s reached after {run['attempts']} attempts"
+                )
+                break
+
+            round_size = min(plan.fan_out, plan.max_attempts - run["attempts"])
+            numbers = range(run["attempts"] + 1, run["attempts"] + round_size + 1)
+            run["attempts"] += round_size
+            logger.info(
+                f"{stage} attempt {numbers[0]}{f'-{numbers[-1]}' if round_size > 1 else ''}/{plan.max_attempts}"
+            )
+
+            if round_size == 1:
+                outcomes = [_run_attempt(stage, attempt, numbers[0])]
+            else:
+                # The first accepted result wins. Each attempt has its own cancellation, so the slower ones
+                # stop at their next generated token instead of spending Ollama time on unused output
+                cancellations = [linked_cancellation() for _ in numbers]
+                futures = [
+                    _speculative_pool.submit(
+                        in_current_context(_run_speculative_attempt),
+                        stage,
+                        attempt,
+                        number,
+                        cancellation,
+                    )
+                    for number, cancellation in zip(numbers, cancellations)
+                ]
+                outcomes = []
+                try:
+                    for future in as_completed(futures, timeout=max(remaining, 0)):
+                        outcome = future.result()
+                        if outcome[1]:
+                            outcomes = [outcome]
+                            break
+                        outcomes.append(outcome)
+                except TimeoutError:
+                    pass
+                finally:
+                    for cancellation in cancellations:
+                        cancellation.set()
+
+            for result, is_valid in outcomes:
+                if is_valid:
+                    logger.success(f"{stage}: generated a valid output.")
+                    run["succeeded"] = True
+                    return result
+            if outcomes and all(is_valid is None for _, is_valid in outcomes):
+                logger.error(f"{stage}: generation failed.")
+                break
+            logger.warning(f"{stage}: generated output is invalid. Retrying...")
+
+        logger.error(f"{stage}: failed to generate a valid output after all retries.")
+        return None
+
+
+def get_retry_stats() -> list[dict]:
+    """Acceptance rates per stage and model over the sliding window, and each stage's current retry plan."""
+    with _windows_lock:
+        stages = {stage: list(window) for stage, window in _acceptance_windows.items()}
+
+    stats = []
+    for stage, results in stages.items():
+        per_model: dict[str, list[bool]] = {}
+        for model_name, accepted in results:
+            per_model.setdefault(model_name or "unknown", []).append(accepted)
+        stats.append(
+            {
+                "stage": stage,
+                "window": len(results),
+                "acceptance_rate": round(
+                    sum(accepted for _, accepted in results) / len(results), 3
+                ),
+                "models": {
+                    model_name: {
+                        "window": len(model_results),
+                        "acceptance_rate": round(
+                            sum(model_results) / len(model_results), 3
+                        ),
+                    }
+                    for model_name, model_results in per_model.items()
+                },
+                "plan": plan_retries(stage)._asdict(),
+            }
+        )
+    return stats
@@ -0,0 +1,106 @@
+import json
+import os
+import random
+import threading
+from collections import OrderedDict
+
+from loguru import logger
+
+from backend.fastapi.langgraph.helpers.file_operations import retrieve_input_file
+from backend.fastapi.langgraph.helpers.graph_state_classes import (
+    AssetCollection,
+    BusinessState,
+    ThreatItemCollection,
+)
+from backend.fastapi.langgraph.helpers.metrics import (
+    DEGRADED_RESPONSES,
+    current_endpoint,
+)
+from backend.fastapi.langgraph.helpers.tracing import set_span_attributes
+
+# Validated scenarios kept to be served while the model layer is down, least recently generated ones are dropped first
+SCENARIO_CACHE_SIZE = int(os.environ.get("SCENARIO_CACHE_SIZE", "100"))
+
+# business_name -> the most complete validated scenario of that business
+_scenarios: OrderedDict[str, BusinessState] = OrderedDict()
+_scenarios_lock = threading.Lock()
+
+
+def remember_scenario(state: BusinessState) -> None:
+    """Keeps a validated business, with its assets and threats once they are generated too."""
+    with _scenarios_lock:
+        _scenarios[state["business_name"]] = state
+        _scenarios.move_to_end(state["business_name"])
+        while len(_scenarios) > SCENARIO_CACHE_SIZE:
+            _scenarios.popitem(last=False)
+
+
+def example_scenario() -> BusinessState:
+    """The few-shot example business and its example assets, for when no scenario was generated yet."""
+    description = retrieve_input_file("Business_ZenithPoint.txt") or ""
+    assets = json.loads(retrieve_input_file("Assets_ZenithPoint.txt") or "[]")
+    return BusinessState(
+        business_name=description.split("\n", 1)[0].strip(),
+        business_location="Southeast Portland",
+        business_contact_info="wellness@zenith.org, +1 (234) 567-8910",
+        business_activity="A collective renting treatment rooms to massage and acupuncture therapists, and handling their scheduling, billing and insurance claims.",
+        business_description=description.split("\n", 1)[-1].strip(),
+        assets=AssetCollection(
+            assets=[
+                {"category": item["Asset_Name"], "description": item["Description"]}
+                for item in assets
+            ]
+        ),
+        potential_threats=ThreatItemCollection(threats=[]),
+    )
+
+
+def record_degraded_response(fallback: str) -> None:
+    """Counts a response served without the model layer, and notes it on the request's trace."""
+    DEGRADED_RESPONSES.inc(endpoint=current_endpoint.get(), fallback=fallback)
+    set_span_attributes(degraded=fallback)
+    logger.warning(f"Serving a {fallback} response while the model layer is down")
+
+
+def cached_business() -> BusinessState:
+    """
+    A previously validated business, or the pre-generated example if there is none, without its assets and
+    threats: the next stages can then be served from the same cached scenario
+    """
+    with _scenarios_lock:
+        cached = list(_scenarios.values())
+    scenario = random.choice(cached) if cached else example_scenario()
+    record_degraded_response("cached_scenario" if cached else "pregenerated_scenario")
+    return BusinessState(
+        **{
+            key: value
+            for key, value in scenario.items()
+            if key not in ("assets", "potential_threats")
+        },
+        assets=AssetCollection(assets=[]),
+        potential_threats=ThreatItemCollection(threats=[]),
+    )
+
+
+def cached_stage_output(state: BusinessState, stage: str) -> BusinessState | None:
+    """
+    The cached assets or threats of a business, if it is a cached scenario (e.g. served by cached_business)
+    :param state: the business the stage was requested for
+    :param stage: "assets" or "potential_threats"
+    :return: the business with the cached stage output, or None if there is none
+    """
+    with _scenarios_lock:
+        scenario = _scenarios.get(state["business_name"])
+    if scenario is None:
+        pregenerated = example_scenario()
+        if pregenerated["business_name"] == state["business_name"]:
+            scenario = pregenerated
+    if scenario is None:
+        return None
+
+    output = scenario[stage]
+    items = output.assets if stage == "assets" else output.threats
+    if not items:
+        return None
+    record_degraded_response("cached_scenario")
+    return BusinessState(**{**state, stage: output})
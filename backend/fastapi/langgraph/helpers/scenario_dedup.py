@@ -0,0 +1,276 @@
+import os
+import threading
+import uuid
+from functools import lru_cache
+from typing import NamedTuple
+
+import numpy as np
+from loguru import logger
+
+from backend.fastapi.langgraph.helpers.chroma_client_registry import (
+    get_chroma_collection,
+)
+from backend.fastapi.langgraph.helpers.metrics import SCENARIO_DEDUP_RESULTS
+from backend.fastapi.langgraph.helpers.numpy_vector_store import normalize_rows
+from backend.fastapi.langgraph.helpers.quantized_index import QuantizedIndex
+from backend.fastapi.langgraph.helpers.retry_budget import DiscardedAttempt
+from backend.fastapi.langgraph.helpers.scenario_cache import example_scenario
+from backend.fastapi.langgraph.helpers.tracing import set_span_attributes, span
+from backend.fastapi.langgraph.helpers.vector_db_operations import (
+    embed_text,
+    flatten_business_state,
+)
+
+SCENARIO_DEDUP = os.environ.get("SCENARIO_DEDUP", "true").lower() == "true"
+# A generated business at least this similar (cosine) to an existing scenario is a near duplicate
+SCENARIO_DEDUP_THRESHOLD = float(os.environ.get("SCENARIO_DEDUP_THRESHOLD", "0.92"))
+SCENARIO_DEDUP_DB_PATH = os.environ.get(
+    "SCENARIO_DEDUP_DB_PATH", "backend/chromadb_vectorstore"
+)
+# Businesses generated in a row within one attempt before giving up on finding a new one
+SCENARIO_DEDUP_MAX_REGENERATIONS = max(
+    1, int(os.environ.get("SCENARIO_DEDUP_MAX_REGENERATIONS", "3"))
+)
+
+# "int8" finds the nearest businesses with an in-memory int8 copy of the index's vectors, scanned in full;
+# empty uses Chroma's HNSW index instead. Both re-score the candidates with the float vectors
+SCENARIO_DEDUP_QUANTIZATION = (
+    os.environ.get("SCENARIO_DEDUP_QUANTIZATION", "int8") or None
+)
+
+SCENARIO_DEDUP_COLLECTION = "scenario_dedup"
+# Nearest neighbours re-scored exactly per check: the int8 scores or the HNSW ranking may miss the closest one
+CANDIDATES_PER_QUERY = 8
+
+_dedup_counts = {"unique": 0, "duplicate": 0}
+_dedup_counts_lock = threading.Lock()
+
+
+class NearDuplicateError(DiscardedAttempt):
+    """Every business generated in an attempt was a near copy of an existing scenario."""
+
+
+class DedupCheck(NamedTuple):
+    # The name of the existing business the checked one is a near duplicate of, or None
+    duplicate_of: str | None
+    similarity: float | None
+    # The index entry reserved for a unique business, to be released if the business is not kept
+    reservation: str | None
+
+
+def business_text(business: dict) -> str | None:
+    """
+    The text a business is compared on: its name, description, activity and location. Assets are left out,
+    as they are generated after the check and would make full scenarios look less alike than bare businesses
+    """
+    return flatten_business_state({**business, "assets": {"assets": []}})
+
+
+class ScenarioIndex:
+    """
+    Embeddings of the existing scenarios' businesses, in a persistent Chroma collection. An int8 copy of them
+    (or Chroma's HNSW index, without quantization) finds the approximate nearest neighbours of a new business,
+    which are then re-scored with exact cosine similarity, so the check stays fast for libraries of hundreds
+    of thousands of scenarios
+    """
+
+    def __init__(
+        self,
+        db_path: str = SCENARIO_DEDUP_DB_PATH,
+        collection_name: str = SCENARIO_DEDUP_COLLECTION,
+        embedding_model: str = "mxbai-embed-large",
+        quantization: str | None = SCENARIO_DEDUP_QUANTIZATION,
+    ):
+        if quantization not in (None, "int8"):
+            raise ValueError(f"Unsupported quantization: {quantization}")
+
+        self.collection = get_chroma_collection(db_path, collection_name)
+        self.embedding_model = embedding_model
+        self.quantized = (
+            QuantizedIndex.from_collection(self.collection) if quantization else None
+        )
+        # Makes a check and the reservation of a unique business one step, so two near copies generated at
+        # the same time cannot both pass
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return self.collection.count()
+
+    def nearest(self, embeddings: list) -> list[tuple[str | None, float | None]]:
+        """
+        The most similar indexed business of each embedding
+        :param embeddings: query vectors
+        :return: the name and cosine similarity of each one's nearest business, (None, None) if the index is empty
+        """
+        size = len(self)
+        if not size:
+            return [(None, None)] * len(embeddings)
+
+        if self.quantized is not None:
+            return [
+                (
+                    (
+                        (matches[0].metadata or {}).get("business_name", matches[0].id),
+                        matches[0].similarity,
+                    )
+                    if matches
+                    else (None, None)
+                )
+                for matches in self.quantized.query(
+                    self.collection,
+                    embeddings,
+                    candidates=CANDIDATES_PER_QUERY,
+                    include=["metadatas"],
+                )
+            ]
+
+        results = self.collection.query(
+            query_embeddings=embeddings,
+            n_results=min(CANDIDATES_PER_QUERY, size),
+            include=["embeddings", "metadatas"],
+        )
+        nearest = []
+        for query, ids, metadatas, candidates in zip(
+            normalize_rows(embeddings),
+            results["ids"],
+            results["metadatas"],
+            results["embeddings"],
+        ):
+            scores = normalize_rows(candidates) @ query
+            best = int(np.argmax(scores))
+            name = (metadatas[best] or {}).get("business_name", ids[best])
+            nearest.append((name, float(scores[best])))
+        return nearest
+
+    def add(self, businesses: list[dict], embeddings: list) -> list[str]:
+        """Indexes businesses under new ids, so businesses sharing a name are all kept. Returns the ids."""
+        ids = [uuid.uuid4().hex for _ in businesses]
+        self.collection.add(
+            ids=ids,
+            documents=[business_text(business) for business in businesses],
+            metadatas=[
+                {"business_name": business["business_name"]} for business in businesses
+            ],
+            embeddings=embeddings,
+        )
+        if self.quantized is not None:
+            self.quantized.upsert(ids, embeddings)
+        return ids
+
+    def reserve(
+        self, business: dict, threshold: float = SCENARIO_DEDUP_THRESHOLD
+    ) -> DedupCheck:
+        """
+        Compares a generated business with the indexed ones, and indexes it right away if it is not a near
+        duplicate, so the businesses checked after it are compared with it too
+        :param business: the business fields, e.g. BusinessOnlyState.model_dump()
+        :param threshold: the cosine similarity from which it is a near duplicate
+        :return: the nearest existing business if it is a near duplicate, else the reservation to release if
+            the business is not kept. If the business cannot be embedded, it is let through unreserved
+        """
+        with span("scenario_dedup.check") as check_span:
+            text = business_text(business)
+            embedding = (
+                embed_text(text, embedding_function=self.embedding_model)
+                if text
+                else None
+            )
+            if embedding is None:
+                logger.warning(
+                    "Could not embed the business, skipping the duplicate check"
+                )
+                return DedupCheck(None, None, None)
+
+            with self._lock:
+                nearest_name, similarity = self.nearest([embedding])[0]
+                is_duplicate = similarity is not None and similarity >= threshold
+                reservation = (
+                    None if is_duplicate else self.add([business], [embedding])[0]
+                )
+            check_span.set(
+                nearest=nearest_name, similarity=similarity, duplicate=is_duplicate
+            )
+            result = "duplicate" if is_duplicate else "unique"
+            SCENARIO_DEDUP_RESULTS.inc(result=result)
+            with _dedup_counts_lock:
+                _dedup_counts[result] += 1
+            return DedupCheck(
+                nearest_name if is_duplicate else None, similarity, reservation
+            )
+
+    def release(self, reservation: str) -> None:
+        """Removes a reserved business that was rejected or not used."""
+        self.collection.delete(ids=[reservation])
+        if self.quantized is not None:
+            self.quantized.delete([reservation])
+
+    def add_business(self, business: dict) -> None:
+        embedding = embed_text(
+            business_text(business), embedding_function=self.embedding_model
+        )
+        if embedding is None:
+            logger.warning(f"Could not index {business['business_name']}")
+            return
+        self.add([business], [embedding])
+
+
+@lru_cache(maxsize=1)
+def get_scenario_index() -> ScenarioIndex:
+    """
+    The shared index, persisted in SCENARIO_DEDUP_DB_PATH. The few-shot example business is indexed first,
+    since the businesses generated from it tend to be copies of it
+    """
+    index = ScenarioIndex()
+    if not len(index):
+        index.add_business(example_scenario())
+    return index
+
+
+def reserve_business(business: dict) -> DedupCheck:
+    """
+    Checks a generated business against the shared index, reserving its place if it is not a near duplicate.
+    Every business passes unreserved when SCENARIO_DEDUP is off
+    """
+    if not SCENARIO_DEDUP:
+        return DedupCheck(None, None, None)
+    try:
+        result = get_scenario_index().reserve(business)
+    except Exception as e:
+        logger.error(f"Duplicate check failed, letting the business through: {e}")
+        return DedupCheck(None, None, None)
+    if result.duplicate_of:
+        set_span_attributes(duplicate_of=result.duplicate_of)
+        logger.warning(
+            f"{business['business_name']} is a near duplicate of {result.duplicate_of} "
+            f"(similarity {result.similarity:.3f})"
+        )
+    return result
+
+
+def release_business(reservation: str | None) -> None:
+    """Releases the reservation of a business that is not kept, e.g. rejected by the validator."""
+    if reservation is None:
+        return
+    try:
+        get_scenario_index().release(reservation)
+    except Exception as e:
+        logger.error(f"Could not release the duplicate check reservation: {e}")
+
+
+def get_dedup_stats() -> dict:
+    """Whether the check is on, its threshold, the businesses checked by outcome and the indexed ones."""
+    with _dedup_counts_lock:
+        counts = dict(_dedup_counts)
+    checked = sum(counts.values())
+    return {
+        "enabled": SCENARIO_DEDUP,
+        "threshold": SCENARIO_DEDUP_THRESHOLD,
+        **counts,
+        "duplicate_rate": round(counts["duplicate"] / checked, 3) if checked else None,
+        # The index is opened by the first check, not by this report
+        "indexed": (
+            len(get_scenario_index())
+            if get_scenario_index.cache_info().currsize
+            else None
+        ),
+    }
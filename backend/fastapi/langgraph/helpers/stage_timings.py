@@ -0,0 +1,19 @@
+import time
+from contextlib import contextmanager
+
+from backend.fastapi.langgraph.helpers.tracing import span
+
+
+@contextmanager
+def time_stage(timings: dict[str, float], stage: str):
+    """
+    Records how long the wrapped block took, in milliseconds, under timings[stage], and traces it as a span
+    :param timings: the dict collecting the timings of one request
+    :param stage: name of the pipeline stage
+    """
+    start_time = time.perf_counter()
+    try:
+        with span(stage):
+            yield
+    finally:
+        timings[stage] = round((time.perf_counter() - start_time) * 1000, 1)
@@ -0,0 +1,192 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import ollama
+from loguru import logger
+
+from backend.fastapi.langgraph.helpers.file_operations import (
+    preload_input_files,
+    preload_all_input_files,
+)
+from backend.fastapi.langgraph.helpers.chroma_client_registry import get_chroma_client
+from backend.fastapi.langgraph.helpers.model_routing import routed_model_names
+from backend.fastapi.langgraph.helpers.ollama_backend_pool import ollama_pool
+from backend.fastapi.langgraph.helpers.model_config import (
+    OLLAMA_KEEP_ALIVE,
+    OLLAMA_NUM_CTX,
+)
+
+# Models loaded into Ollama's memory at startup, comma separated. Defaults to every model of the routing table
+WARMUP_CHAT_MODELS = [
+    model.strip()
+    for model in os.environ.get(
+        "WARMUP_CHAT_MODELS", ",".join(routed_model_names())
+    ).split(",")
+    if model.strip()
+]
+WARMUP_EMBEDDING_MODELS = [
+    model.strip()
+    for model in os.environ.get("WARMUP_EMBEDDING_MODELS", "mxbai-embed-large").split(
+        ","
+    )
+    if model.strip()
+]
+
+# Reads every input file (prompt examples included) at startup, not just the templates
+PRELOAD_ALL_INPUT_FILES = (
+    os.environ.get("PRELOAD_ALL_INPUT_FILES", "true").lower() == "true"
+)
+PRELOADED_INPUT_FILES = [
+    "SecurityAssessmentTemplate-FrontendFile.md",
+    "SecurityAssessmentTemplate-Guide.md",
+]
+
+_status_lock = threading.Lock()
+_warmup_status = {"ready": False, "started_at": None, "finished_at": None, "steps": {}}
+
+
+def get_warmup_status() -> dict:
+    """Returns a copy of the startup warm-up progress: overall readiness and the state of every step."""
+    with _status_lock:
+        return {**_warmup_status, "steps": dict(_warmup_status["steps"])}
+
+
+def _set_step(step: str, **fields) -> None:
+    with _status_lock:
+        _warmup_status["steps"][step] = {
+            **_warmup_status["steps"].get(step, {}),
+            **fields,
+        }
+
+
+def _run_step(step: str, function, *args) -> bool:
+    """Runs one warm-up step, recording its state and duration. Errors are logged, not raised."""
+    _set_step(step, state="running")
+    start_time = time.perf_counter()
+    try:
+        function(*args)
+    except Exception as e:
+        logger.error(f"Warm-up step {step} failed: {e}")
+        _set_step(
+            step,
+            state="failed",
+            error=str(e),
+            duration_ms=round((time.perf_counter() - start_time) * 1000, 1),
+        )
+        return False
+
+    duration_ms = round((time.perf_counter() - start_time) * 1000, 1)
+    _set_step(step, state="done", duration_ms=duration_ms)
+    logger.info(f"Warm-up step {step} done in {duration_ms}ms")
+    return True
+
+
+def _on_every_backend(model_name: str, warm_up) -> None:
+    """Runs a warm-up on every Ollama server that has the model. Fails only if it failed everywhere."""
+    base_urls = [
+        backend.base_url
+        for backend in ollama_pool.backends
+        if backend.has_model(model_name)
+    ]
+    if not base_urls:
+        raise LookupError(f"No Ollama server has {model_name} pulled")
+
+    errors = []
+    for base_url in base_urls:
+        try:
+            warm_up(ollama.Client(host=base_url))
+        except Exception as e:
+            errors.append(f"{base_url}: {e}")
+    if len(errors) == len(base_urls):
+        raise RuntimeError("; ".join(errors))
+    for error in errors:
+        logger.warning(f"Could not warm up {model_name} on {error}")
+
+
+def warm_up_chat_model(model_name: str) -> None:
+    """
+    Loads a chat model into the memory of every Ollama server. An empty prompt loads the model without
+    generating anything. It is loaded with the same num_ctx as the real requests, otherwise the first of them
+    would reload it
+    """
+    _on_every_backend(
+        model_name,
+        lambda client: client.generate(
+            model=model_name,
+            prompt="",
+            keep_alive=OLLAMA_KEEP_ALIVE,
+            options={"num_ctx": OLLAMA_NUM_CTX},
+        ),
+    )
+
+
+def warm_up_embedding_model(model_name: str) -> None:
+    """Loads an embedding model into the memory of every Ollama server with a one-word embedding."""
+    _on_every_backend(
+        model_name,
+        lambda client: client.embed(
+            model=model_name, input="warm-up", keep_alive=OLLAMA_KEEP_ALIVE
+        ),
+    )
+
+
+def preload_templates() -> None:
+    missing = preload_input_files(PRELOADED_INPUT_FILES)
+    if missing:
+        raise FileNotFoundError(f"Missing input files: {', '.join(missing)}")
+    if PRELOAD_ALL_INPUT_FILES:
+        preload_all_input_files()
+
+
+def open_vectorstores() -> None:
+    """Opens the vectorstores: the security assistant's graph, with its retrieval index, and the chroma client."""
+    # Imported here, the agent module builds its thread pool and imports langgraph on import
+    from backend.fastapi.langgraph.ai_agents.security_assessment_assistant import (
+        create_security_assistant_graph,
+    )
+
+    create_security_assistant_graph()
+    get_chroma_client("backend/chromadb_vectorstore")
+
+
+def run_startup_warmup() -> bool:
+    """
+    Preloads the templates, opens the vectorstores and loads every configured model into Ollama, in parallel.
+    The service is marked ready once every step has finished, even if some of them failed, since a failed warm-up
+    only means the first request pays for it
+    :return: True if every step succeeded
+    """
+    with _status_lock:
+        _warmup_status.update(
+            ready=False, started_at=time.time(), finished_at=None, steps={}
+        )
+
+    steps = [("templates", preload_templates), ("vectorstores", open_vectorstores)]
+    steps += [
+        (f"chat_model:{model}", warm_up_chat_model, model)
+        for model in WARMUP_CHAT_MODELS
+    ]
+    steps += [
+        (f"embedding_model:{model}", warm_up_embedding_model, model)
+        for model in WARMUP_EMBEDDING_MODELS
+    ]
+    for step, *_ in steps:
+        _set_step(step, state="pending")
+
+    # Learn which server has which model before placing the model warm-ups
+    ollama_pool.check_backends()
+
+    with ThreadPoolExecutor(
+        max_workers=len(steps), thread_name_prefix="warmup"
+    ) as pool:
+        results = list(pool.map(lambda step: _run_step(*step), steps))
+
+    with _status_lock:
+        _warmup_status.update(ready=True, finished_at=time.time())
+
+    succeeded = all(results)
+    log = logger.success if succeeded else logger.warning
+    log(f"Startup warm-up finished, {sum(results)}/{len(results)} steps succeeded")
+    return succeeded
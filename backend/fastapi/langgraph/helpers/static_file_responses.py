@@ -0,0 +1,110 @@
+import gzip
+import hashlib
+import os
+import threading
+from typing import NamedTuple
+
+from backend.fastapi.langgraph.helpers.file_operations import retrieve_input_file_entry
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Browsers and the frontend may reuse a file for this long, then must revalidate it with If-None-Match
+STATIC_FILE_MAX_AGE_SECONDS = int(os.environ.get("STATIC_FILE_MAX_AGE_SECONDS", "300"))
+
+
+class EncodedInputFile(NamedTuple):
+    # The CachedInputFile.version the bodies were encoded from
+    version: tuple[int, int, int]
+    # Content-Encoding -> body. "identity" is the uncompressed body
+    bodies: dict[str, bytes]
+    # Content-Encoding -> strong ETag. Each encoding is a different representation, so it gets its own tag
+    etags: dict[str, str]
+
+
+_encoded_files: dict[str, EncodedInputFile] = {}
+_encoded_files_lock = threading.Lock()
+
+
+def _encode_bodies(raw: bytes) -> dict[str, bytes]:
+    bodies = {"identity": raw, "gzip": gzip.compress(raw, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        bodies["br"] = brotli.compress(raw, quality=11)
+    # A compressed body that is not smaller is not worth the client's decompression
+    return {
+        encoding: body
+        for encoding, body in bodies.items()
+        if encoding == "identity" or len(body) < len(raw)
+    }
+
+
+def get_encoded_input_file(filename: str) -> EncodedInputFile | None:
+    """
+    Returns an input file with its precompressed bodies and their strong ETags. They are computed once per
+    version of the file, and recomputed when the input file cache re-reads it (mtime, size or inode change)
+    :param filename: name of a file in the input_files directory
+    :return: the encoded file, or None if it does not exist
+    """
+    entry = retrieve_input_file_entry(filename)
+    if entry is None:
+        return None
+
+    cached = _encoded_files.get(filename)
+    if cached and cached.version == entry.version:
+        return cached
+
+    raw = entry.content.encode("utf-8")
+    digest = hashlib.sha256(raw).hexdigest()[:32]
+    bodies = _encode_bodies(raw)
+    encoded = EncodedInputFile(
+        version=entry.version,
+        bodies=bodies,
+        etags={
+            encoding: (
+                f'"{digest}"' if encoding == "identity" else f'"{digest}-{encoding}"'
+            )
+            for encoding in bodies
+        },
+    )
+    with _encoded_files_lock:
+        _encoded_files[filename] = encoded
+    return encoded
+
+
+def etag_matches(if_none_match: str | None, etags: list[str]) -> bool:
+    """
+    Weak comparison of an If-None-Match header against the ETags of the current version, as RFC 9110 requires
+    for If-None-Match. Any encoding of the current version matches, since they all decode to the same content
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return not candidates.isdisjoint(etags)
+
+
+def choose_content_encoding(accept_encoding: str | None, available: list[str]) -> str:
+    """
+    Picks the best available encoding the client accepts, preferring brotli, then gzip
+    :param accept_encoding: the request's Accept-Encoding header
+    :param available: the encodings the file was precompressed with
+    :return: the chosen Content-Encoding, "identity" if no compressed body is acceptable
+    """
+    accepted = set()
+    for part in (accept_encoding or "").lower().split(","):
+        coding, _, parameters = part.partition(";")
+        quality = parameters.strip().removeprefix("q=")
+        try:
+            if parameters and float(quality) == 0:
+                continue
+        except ValueError:
+            pass
+        accepted.add(coding.strip())
+
+    for encoding in ("br", "gzip"):
+        if encoding in available and (encoding in accepted or "*" in accepted):
+            return encoding
+    return "identity"
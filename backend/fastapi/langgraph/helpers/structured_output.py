@@ -0,0 +1,166 @@
+import json
+import os
+import re
+import threading
+from typing import Iterator, Type
+
+from loguru import logger
+from pydantic import BaseModel, ValidationError
+from langchain_core.exceptions import OutputParserException
+from langchain_core.messages import BaseMessage
+from langchain_core.runnables import Runnable, RunnableLambda
+
+from backend.fastapi.langgraph.helpers.tracing import (
+    record_token_usage,
+    set_span_attributes,
+)
+
+# "json_schema" constrains Ollama's sampling to the Pydantic model's JSON schema (the `format` parameter) and
+# parses the output tolerantly. "function_calling" asks for a tool call instead, as older langchain-ollama did
+STRUCTURED_OUTPUT_METHOD = os.environ.get("STRUCTURED_OUTPUT_METHOD", "json_schema")
+
+_CODE_FENCE = re.compile(r"^\s*```(?:json)?\s*|\s*```\s*$")
+_CLOSERS = {"{": "}", "[": "]"}
+
+_parse_stats: dict[str, dict[str, int]] = {}
+_stats_lock = threading.Lock()
+
+
+def _record_parse(schema_name: str, outcome: str) -> None:
+    with _stats_lock:
+        stats = _parse_stats.setdefault(
+            schema_name, {"parsed": 0, "repaired": 0, "failed": 0}
+        )
+        stats[outcome] += 1
+    set_span_attributes(structured_output=outcome)
+
+
+def get_structured_output_stats() -> dict[str, dict[str, int]]:
+    """How many outputs of each schema parsed as is, needed a repair, or could not be parsed."""
+    with _stats_lock:
+        return {name: dict(stats) for name, stats in _parse_stats.items()}
+
+
+def repair_json_candidates(text: str) -> Iterator[str]:
+    """
+    Turns possibly truncated or wrapped JSON into parsable JSON. Code fences and text around the first JSON
+    value are dropped. A value cut off by the token limit is closed at every prefix that parses, longest
+    first: by closing the open string and brackets, then by backing off one complete element at a time
+    :param text: the raw model output
+    :return: the parsable JSON strings, best first. Nothing if there is no JSON value to recover
+    """
+    text = _CODE_FENCE.sub("", text)
+    start = min(
+        (index for index in (text.find("{"), text.find("[")) if index >= 0),
+        default=-1,
+    )
+    if start < 0:
+        return
+    text = text[start:]
+
+    stack = []
+    # (position right after a complete element, open brackets at that point)
+    checkpoints = []
+    in_string = escaped = False
+    for position, char in enumerate(text):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+            continue
+
+        if char == '"':
+            in_string = True
+        elif char in _CLOSERS:
+            stack.append(char)
+        elif char in "}]":
+            if not stack or _CLOSERS[stack[-1]] != char:
+                break
+            stack.pop()
+            if not stack:
+                # A complete value: anything after it is chatter
+                yield text[: position + 1]
+                return
+            checkpoints.append((position + 1, list(stack)))
+        elif char == ",":
+            checkpoints.append((position, list(stack)))
+
+    def close(prefix: str, open_brackets: list[str]) -> str:
+        prefix = prefix.rstrip().rstrip(",")
+        return prefix + "".join(_CLOSERS[b] for b in reversed(open_brackets))
+
+    candidates = [close(text + ('"' if in_string else ""), stack)]
+    candidates += [
+        close(text[:end], brackets) for end, brackets in reversed(checkpoints)
+    ]
+    candidates.append(close(text[:1], [text[0]]))
+    for candidate in candidates:
+        try:
+            json.loads(candidate)
+        except json.JSONDecodeError:
+            continue
+        yield candidate
+
+
+def repair_json(text: str) -> str | None:
+    """Returns the longest parsable repair of the text, or None if there is no JSON value to recover."""
+    return next(repair_json_candidates(text), None)
+
+
+def parse_structured_output(text: str, schema: Type[BaseModel]) -> BaseModel:
+    """
+    Parses a model output into the Pydantic schema, repairing truncated or wrapped JSON if needed
+    :param text: the raw model output
+    :param schema: the Pydantic model to validate against
+    :return: the validated model instance
+    :raises OutputParserException: if no valid instance can be recovered
+    """
+    try:
+        result = schema.model_validate_json(text)
+        _record_parse(schema.__name__, "parsed")
+        return result
+    except ValidationError:
+        pass
+
+    error = "no JSON value found"
+    # A truncated last element may be missing required fields: dropping it can still give a valid instance
+    for repaired in repair_json_candidates(text):
+        try:
+            result = schema.model_validate_json(repaired)
+        except ValidationError as e:
+            error = e
+            continue
+        _record_parse(schema.__name__, "repaired")
+        logger.info(f"Repaired malformed {schema.__name__} output")
+        return result
+
+    _record_parse(schema.__name__, "failed")
+    raise OutputParserException(
+        f"Could not parse {schema.__name__} from the model output: {error}",
+        llm_output=text,
+    )
+
+
+def with_json_schema_output(llm, schema: Type[BaseModel]) -> Runnable:
+    """
+    Binds the schema as Ollama's `format` constraint, so sampling can only produce JSON of that shape, and
+    parses the reply with parse_structured_output
+    """
+
+    def parse(message) -> BaseModel:
+        if not isinstance(message, BaseMessage):
+            return parse_structured_output(str(message), schema)
+        record_token_usage(message)
+        return parse_structured_output(message.content, schema)
+
+    return llm.bind(format=schema.model_json_schema()) | RunnableLambda(parse)
+
+
+def structured_output(llm, schema: Type[BaseModel]) -> Runnable:
+    """Returns the llm wrapped to output the schema, with the STRUCTURED_OUTPUT_METHOD mode."""
+    if STRUCTURED_OUTPUT_METHOD == "json_schema":
+        return with_json_schema_output(llm, schema)
+    return llm.with_structured_output(schema, method=STRUCTURED_OUTPUT_METHOD)
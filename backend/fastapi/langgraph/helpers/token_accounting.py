@@ -0,0 +1,205 @@
+import contextvars
+import os
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Iterator
+
+from loguru import logger
+from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage
+
+from backend.fastapi.langgraph.helpers.context_compression import estimate_token_count
+from backend.fastapi.langgraph.helpers.metrics import (
+    PROMPT_BUDGET_ACTIONS,
+    current_endpoint,
+)
+from backend.fastapi.langgraph.helpers.tracing import set_span_attributes
+
+# Sessions (chat thread ids) whose token usage is kept, least recently used ones are dropped first
+TOKEN_ACCOUNTING_MAX_SESSIONS = int(
+    os.environ.get("TOKEN_ACCOUNTING_MAX_SESSIONS", "1000")
+)
+# Chat templates add a few tokens of role markers around every message
+MESSAGE_OVERHEAD_TOKENS = 4
+
+current_session: contextvars.ContextVar[str | None] = contextvars.ContextVar(
+    "current_session", default=None
+)
+
+_usage_by_endpoint: dict[str, dict] = {}
+_usage_by_stage: dict[str, dict] = {}
+_usage_by_session: OrderedDict[str, dict] = OrderedDict()
+_usage_lock = threading.Lock()
+
+
+class PromptBudgetExceededError(ValueError):
+    """A prompt is larger than its stage's budget, even after trimming the conversation history."""
+
+
+@contextmanager
+def accounting_session(session_id: str | None) -> Iterator[None]:
+    """Attributes the token usage of the LLM calls made in the block to a chat session."""
+    token = current_session.set(session_id)
+    try:
+        yield
+    finally:
+        current_session.reset(token)
+
+
+def _message_text(message: Any) -> str:
+    if isinstance(message, BaseMessage):
+        content = message.content
+        return content if isinstance(content, str) else str(content)
+    return str(message)
+
+
+def estimate_prompt_tokens(model_input: Any) -> int:
+    """Estimates the prompt tokens of a model input: a string, or a list of messages."""
+    if isinstance(model_input, (list, tuple)):
+        return sum(
+            estimate_token_count(_message_text(message)) + MESSAGE_OVERHEAD_TOKENS
+            for message in model_input
+        )
+    return estimate_token_count(_message_text(model_input))
+
+
+def trim_messages_to_budget(messages: list, max_tokens: int) -> list:
+    """
+    Drops the oldest conversation turns until the messages fit the budget. The leading system messages and
+    everything from the last human message on (the question, and the tool calls answering it) are kept
+    :param messages: the chat messages
+    :param max_tokens: the estimated token budget
+    :return: the trimmed messages. They may still be over budget if only kept messages are left
+    """
+    head = 0
+    while head < len(messages) and isinstance(messages[head], SystemMessage):
+        head += 1
+    last_human = next(
+        (
+            index
+            for index in range(len(messages) - 1, head - 1, -1)
+            if isinstance(messages[index], HumanMessage)
+        ),
+        len(messages),
+    )
+
+    history = list(messages[head:last_human])
+    kept_tokens = estimate_prompt_tokens(messages[:head]) + estimate_prompt_tokens(
+        messages[last_human:]
+    )
+    history_tokens = [estimate_prompt_tokens([message]) for message in history]
+    dropped = False
+    # Whole turns are dropped: once trimming started, the history must start with a human message again
+    while history and (
+        kept_tokens + sum(history_tokens) > max_tokens
+        or (dropped and not isinstance(history[0], HumanMessage))
+    ):
+        history.pop(0)
+        history_tokens.pop(0)
+        dropped = True
+    return list(messages[:head]) + history + list(messages[last_human:])
+
+
+def enforce_prompt_budget(
+    stage: str, model_input: Any, max_tokens: int, over_budget: str = "trim"
+) -> tuple[Any, int]:
+    """
+    Checks a prompt against its stage's budget before it is sent
+    :param stage: the pipeline stage, for logging and stats
+    :param model_input: a string or a list of messages
+    :param max_tokens: the budget, in estimated tokens
+    :param over_budget: "trim" drops the oldest conversation turns first, "reject" fails right away
+    :return: the input to send, trimmed if needed, and its estimated token count
+    :raises PromptBudgetExceededError: if the input does not fit
+    """
+    estimated = estimate_prompt_tokens(model_input)
+    if estimated <= max_tokens:
+        return model_input, estimated
+
+    if over_budget == "trim" and isinstance(model_input, list):
+        trimmed = trim_messages_to_budget(model_input, max_tokens)
+        trimmed_estimate = estimate_prompt_tokens(trimmed)
+        if trimmed_estimate <= max_tokens:
+            logger.info(
+                f"{stage}: trimmed the prompt from ~{estimated} to ~{trimmed_estimate} tokens "
+                f"({len(model_input) - len(trimmed)} messages dropped)"
+            )
+            _record_budget_action(stage, "trimmed")
+            set_span_attributes(
+                prompt_trimmed_from=estimated,
+                messages_dropped=len(model_input) - len(trimmed),
+            )
+            return trimmed, trimmed_estimate
+
+    _record_budget_action(stage, "rejected")
+    raise PromptBudgetExceededError(
+        f"The {stage} prompt is ~{estimated} tokens, over its budget of {max_tokens}"
+    )
+
+
+def _new_usage() -> dict:
+    return {
+        "calls": 0,
+        "prompt_tokens": 0,
+        "eval_tokens": 0,
+        "estimated_prompt_tokens": 0,
+        "trimmed": 0,
+        "rejected": 0,
+    }
+
+
+def _usage_entries(stage: str) -> list[dict]:
+    """The usage entries a call counts towards: its stage, its endpoint and its session. Called under the lock."""
+    entries = [
+        _usage_by_stage.setdefault(stage, _new_usage()),
+        _usage_by_endpoint.setdefault(current_endpoint.get(), _new_usage()),
+    ]
+    session_id = current_session.get()
+    if session_id is not None:
+        if session_id not in _usage_by_session:
+            _usage_by_session[session_id] = _new_usage()
+        _usage_by_session.move_to_end(session_id)
+        while len(_usage_by_session) > TOKEN_ACCOUNTING_MAX_SESSIONS:
+            _usage_by_session.popitem(last=False)
+        entries.append(_usage_by_session[session_id])
+    return entries
+
+
+def _record_budget_action(stage: str, action: str) -> None:
+    PROMPT_BUDGET_ACTIONS.inc(stage=stage, action=action)
+    with _usage_lock:
+        for entry in _usage_entries(stage):
+            entry[action] += 1
+
+
+def record_call_tokens(stage: str, estimated_prompt_tokens: int, usage: dict) -> None:
+    """
+    Adds a call's token counts to its stage, endpoint and session
+    :param stage: the pipeline stage
+    :param estimated_prompt_tokens: the estimate the budget was checked against
+    :param usage: the counts Ollama reported, as recorded by record_token_usage
+    """
+    with _usage_lock:
+        for entry in _usage_entries(stage):
+            entry["calls"] += 1
+            entry["prompt_tokens"] += usage.get("prompt_tokens") or 0
+            entry["eval_tokens"] += usage.get("eval_tokens") or 0
+            entry["estimated_prompt_tokens"] += estimated_prompt_tokens
+
+
+def get_token_usage() -> dict:
+    """Token usage per stage and per endpoint, and the number of tracked sessions."""
+    with _usage_lock:
+        return {
+            "stages": {stage: dict(usage) for stage, usage in _usage_by_stage.items()},
+            "endpoints": {
+                endpoint: dict(usage) for endpoint, usage in _usage_by_endpoint.items()
+            },
+            "tracked_sessions": len(_usage_by_session),
+        }
+
+
+def get_session_token_usage(session_id: str) -> dict | None:
+    with _usage_lock:
+        usage = _usage_by_session.get(session_id)
+        return dict(usage) if usage is not None else None
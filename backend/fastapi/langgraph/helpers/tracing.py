@@ -0,0 +1,205 @@
+import contextvars
+import json
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator
+
+from loguru import logger
+
+# Finished traces kept in memory for GET /traces
+TRACE_BUFFER_SIZE = int(os.environ.get("TRACE_BUFFER_SIZE", "200"))
+# Optional JSONL file every finished span is appended to, one span per line
+TRACE_EXPORT_FILE = os.environ.get("TRACE_EXPORT_FILE")
+
+_current_span: contextvars.ContextVar["Span | None"] = contextvars.ContextVar(
+    "current_span", default=None
+)
+_finished_traces: OrderedDict[str, list[dict]] = OrderedDict()
+_traces_lock = threading.Lock()
+_export_lock = threading.Lock()
+
+
+class _Trace:
+    def __init__(self, trace_id: str):
+        self.trace_id = trace_id
+        self.spans: list[dict] = []
+        self.lock = threading.Lock()
+
+
+class Span:
+    """
+    A timed operation of a request. Spans started while another span is current become its children, also
+    across threads when the work is submitted with in_current_context
+    """
+
+    def __init__(
+        self, name: str, trace: _Trace | None, parent_id: str | None, attributes: dict
+    ):
+        self.name = name
+        self.trace = trace
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.attributes = attributes
+        self.start_time = time.time()
+        self._start = time.perf_counter()
+
+    @property
+    def trace_id(self) -> str | None:
+        return self.trace.trace_id if self.trace else None
+
+    def set(self, **attributes: Any) -> None:
+        self.attributes.update(attributes)
+
+    def _finish(self, error: BaseException | None) -> dict:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start_time": round(self.start_time, 6),
+            "duration_ms": round((time.perf_counter() - self._start) * 1000, 2),
+            "status": "error" if error else "ok",
+            "error": repr(error)[:300] if error else None,
+            "attributes": self.attributes,
+        }
+
+
+def _export(spans: list[dict]) -> None:
+    with _traces_lock:
+        _finished_traces[spans[-1]["trace_id"]] = spans
+        while len(_finished_traces) > TRACE_BUFFER_SIZE:
+            _finished_traces.popitem(last=False)
+
+    if not TRACE_EXPORT_FILE:
+        return
+    try:
+        with _export_lock, open(TRACE_EXPORT_FILE, "a", encoding="utf-8") as f:
+            f.writelines(json.dumps(s, default=str) + "\n" for s in spans)
+    except OSError as e:
+        logger.error(f"Could not export trace to {TRACE_EXPORT_FILE}: {e}")
+
+
+@contextmanager
+def _run_span(new_span: Span, is_root: bool) -> Iterator[Span]:
+    token = _current_span.set(new_span)
+    error = None
+    try:
+        yield new_span
+    except BaseException as e:
+        error = e
+        raise
+    finally:
+        _current_span.reset(token)
+        if new_span.trace is not None:
+            finished = new_span._finish(error)
+            with new_span.trace.lock:
+                new_span.trace.spans.append(finished)
+                spans = list(new_span.trace.spans) if is_root else None
+            if is_root:
+                _export(spans)
+
+
+@contextmanager
+def start_trace(name: str, trace_id: str | None = None, **attributes) -> Iterator[Span]:
+    """
+    Starts a trace with its root span. The trace is exported when the root span ends
+    :param name: name of the root span, e.g. the request's method and path
+    :param trace_id: an incoming trace id to continue, or None for a new one
+    :param attributes: attributes of the root span
+    :return: the root span
+    """
+    trace = _Trace(trace_id or uuid.uuid4().hex)
+    with _run_span(Span(name, trace, None, attributes), is_root=True) as root:
+        yield root
+
+
+@contextmanager
+def span(name: str, **attributes) -> Iterator[Span]:
+    """
+    Times the block as a child of the current span. Outside a trace (startup, background jobs) the span is
+    not recorded, so instrumented helpers can be called from anywhere
+    :param name: the operation, e.g. "llm.invoke"
+    :param attributes: e.g. the model or the attempt number. More can be added with Span.set
+    :return: the span
+    """
+    parent = _current_span.get()
+    trace = parent.trace if parent else None
+    with _run_span(
+        Span(name, trace, parent.span_id if parent else None, attributes), False
+    ) as child:
+        yield child
+
+
+def set_span_attributes(**attributes) -> None:
+    """Adds attributes to the current span, if there is one."""
+    current = _current_span.get()
+    if current is not None:
+        current.set(**attributes)
+
+
+def record_token_usage(message, target: Span | None = None) -> None:
+    """Adds the token counts and durations Ollama reported for a chat message to a span (the current one by default)."""
+    target = target or _current_span.get()
+    if target is None:
+        return
+    metadata = getattr(message, "response_metadata", None) or {}
+    attributes = {
+        "prompt_tokens": metadata.get("prompt_eval_count"),
+        "eval_tokens": metadata.get("eval_count"),
+        "load_ms": metadata.get("load_duration"),
+        "prompt_eval_ms": metadata.get("prompt_eval_duration"),
+        "eval_ms": metadata.get("eval_duration"),
+    }
+    target.set(
+        **{
+            key: round(value / 1e6, 1) if key.endswith("_ms") else value
+            for key, value in attributes.items()
+            if value is not None
+        }
+    )
+
+
+def current_trace_id() -> str | None:
+    current = _current_span.get()
+    return current.trace_id if current else None
+
+
+def in_current_context(function: Callable) -> Callable:
+    """
+    Wraps a function to run in the caller's trace context, e.g. when it is submitted to a thread pool.
+    Each call gets its own copy of the context, so the wrapper can run in several threads at once
+    """
+    context = contextvars.copy_context()
+
+    def run(*args, **kwargs):
+        return context.copy().run(function, *args, **kwargs)
+
+    return run
+
+
+def get_trace(trace_id: str) -> list[dict] | None:
+    """The spans of a finished trace, in the order they ended, or None if it is not in the buffer."""
+    with _traces_lock:
+        return _finished_traces.get(trace_id)
+
+
+def list_traces(limit: int = 50) -> list[dict]:
+    """Summaries of the most recent finished traces, newest first."""
+    with _traces_lock:
+        recent = list(_finished_traces.values())[-limit:]
+
+    return [
+        {
+            "trace_id": spans[-1]["trace_id"],
+            "name": spans[-1]["name"],
+            "start_time": spans[-1]["start_time"],
+            "duration_ms": spans[-1]["duration_ms"],
+            "status": spans[-1]["status"],
+            "span_count": len(spans),
+        }
+        for spans in reversed(recent)
+    ]
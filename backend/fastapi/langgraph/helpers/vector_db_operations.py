@@ -1,17 +1,51 @@
 import sys
 import os
+import json
+import hashlib
 from typing import Dict, Any
 
 from chromadb.api.models.Collection import Collection
 from loguru import logger
-from chromadb import PersistentClient
 import ollama
 import re
 from langchain_chroma import Chroma
 from langchain.embeddings.base import Embeddings
-from langchain_ollama import OllamaEmbeddings
 from langchain.schema import Document
 from backend.fastapi.langgraph.helpers.graph_state_classes import BusinessState
+from backend.fastapi.langgraph.helpers.chroma_client_registry import (
+    get_chroma_client,
+    get_chroma_collection,
+)
+from backend.fastapi.langgraph.helpers.numpy_vector_store import NumpyVectorStore
+from backend.fastapi.langgraph.helpers.quantized_index import (
+    Match,
+    get_quantized_index,
+    update_quantized_index,
+)
+from backend.fastapi.langgraph.helpers.context_compression import estimate_token_count
+from backend.fastapi.langgraph.helpers.tracing import span
+from backend.fastapi.langgraph.helpers.ollama_backend_pool import (
+    call_with_backend,
+    PooledOllamaEmbeddings,
+)
+
+# "chroma" or "numpy". The numpy backend keeps small corpora in an exact in-process index
+VECTORSTORE_BACKEND = os.environ.get("VECTORSTORE_BACKEND", "chroma")
+# Set to "int8" to keep numpy backend vectors quantized in memory. The business profiles and the scenario dedup
+# index are always searched through an int8 copy of their Chroma collection, see quantized_index.py
+VECTORSTORE_QUANTIZATION = os.environ.get("VECTORSTORE_QUANTIZATION") or None
+# With quantization, the int8 candidates re-scored exactly per result. The float32 vectors that needs are kept
+# on disk (memory-mapped), so the disk footprint only shrinks with 0, which ranks on the int8 scores alone
+VECTORSTORE_RERANK_FACTOR = int(os.environ.get("VECTORSTORE_RERANK_FACTOR", "4"))
+
+# "section" indexes one chunk per numbered header, "subsection" splits sections into token-bounded pieces.
+# Switching re-indexes the guide, so sub-section chunking is opt-in: compare them with benchmarks/guide_chunking.py
+GUIDE_CHUNKING = os.environ.get("GUIDE_CHUNKING", "section")
+GUIDE_CHUNK_MAX_TOKENS = int(os.environ.get("GUIDE_CHUNK_MAX_TOKENS", "256"))
+GUIDE_CHUNK_OVERLAP_TOKENS = int(os.environ.get("GUIDE_CHUNK_OVERLAP_TOKENS", "32"))
+
+# Every business profile is a document of this one collection, whether ingested one at a time or in bulk
+BUSINESS_PROFILES_COLLECTION = "business_profiles"
 
 
 def sanitize_chroma_collection_name(name: str) -> str:
@@ -105,6 +139,118 @@ def custom_numbered_header_split(markdown_text: str) -> list:
     return docs
 
 
+def _split_long_line(line: str, max_tokens: int) -> list[str]:
+    """Splits a single line that is over the token limit on word boundaries."""
+    pieces, current = [], []
+    for word in line.split():
+        if current and estimate_token_count(" ".join(current + [word])) > max_tokens:
+            pieces.append(" ".join(current))
+            current = []
+        current.append(word)
+    if current:
+        pieces.append(" ".join(current))
+    return pieces
+
+
+def token_bounded_split(
+    section_docs: list[Document],
+    max_tokens: int = GUIDE_CHUNK_MAX_TOKENS,
+    overlap_tokens: int = GUIDE_CHUNK_OVERLAP_TOKENS,
+) -> list[Document]:
+    """
+    Splits section documents into pieces of at most max_tokens (estimated), on line boundaries.
+    Consecutive pieces share up to overlap_tokens of lines, and every piece after the first repeats the section
+    header so it can be retrieved on its own
+    :param section_docs: the output of custom_numbered_header_split
+    :param max_tokens: the maximum estimated number of tokens per piece
+    :param overlap_tokens: the estimated number of tokens repeated from the end of the previous piece
+    :return: the pieces, with the section metadata plus parent_section_number, chunk_index and chunk_count
+    """
+    chunks = []
+    for section in section_docs:
+        lines = [line for line in section.page_content.splitlines() if line.strip()]
+        header, body = (lines[0], lines[1:]) if lines else ("", [])
+        header_tokens = estimate_token_count(header)
+        line_budget = max(max_tokens - header_tokens, 1)
+
+        body_lines = []
+        for line in body:
+            if estimate_token_count(line) > line_budget:
+                body_lines.extend(_split_long_line(line, line_budget))
+            else:
+                body_lines.append(line)
+
+        pieces, current = [], []
+        for line in body_lines:
+            if (
+                current
+                and estimate_token_count("\n".join(current + [line])) > line_budget
+            ):
+                pieces.append(current)
+                overlap = []
+                for previous_line in reversed(current):
+                    if (
+                        estimate_token_count("\n".join([previous_line] + overlap))
+                        > overlap_tokens
+                    ):
+                        break
+                    overlap.insert(0, previous_line)
+                current = overlap
+            current.append(line)
+        if current or not pieces:
+            pieces.append(current)
+
+        for index, piece in enumerate(pieces):
+            chunks.append(
+                Document(
+                    page_content="\n".join([header] + piece),
+                    metadata={
+                        **section.metadata,
+                        "parent_section_number": section.metadata.get("section_number"),
+                        "chunk_index": index,
+                        "chunk_count": len(pieces),
+                    },
+                )
+            )
+
+    return chunks
+
+
+def split_guide_for_indexing(
+    section_docs: list[Document], chunking: str | None = None
+) -> list[Document]:
+    """Returns the chunks to embed for the guide, according to the GUIDE_CHUNKING setting."""
+    chunking = chunking or GUIDE_CHUNKING
+    if chunking == "subsection":
+        return token_bounded_split(section_docs)
+    if chunking != "section":
+        raise ValueError(f"Unknown guide chunking: {chunking}")
+    return section_docs
+
+
+def expand_to_parent_sections(
+    chunks: list[Document], section_docs: list[Document]
+) -> list[Document]:
+    """
+    Replaces sub-section chunks by their whole parent sections, keeping the retrieval order and dropping duplicates.
+    Chunks without a parent are returned as they are
+    """
+    sections_by_number = {
+        doc.metadata["section_number"]: doc
+        for doc in section_docs
+        if "section_number" in doc.metadata
+    }
+    expanded, seen = [], set()
+    for chunk in chunks:
+        parent_number = chunk.metadata.get("parent_section_number")
+        parent = sections_by_number.get(parent_number, chunk)
+        key = parent_number or chunk.page_content
+        if key not in seen:
+            seen.add(key)
+            expanded.append(parent)
+    return expanded
+
+
 def embed_text(text_to_embed: str, embedding_function: str = "mxbai-embed-large"):
     """Takes a flat string and embeds it. This function can be used to embed user query and the business info
     :param text_to_embed:str - the flattened business state string
@@ -112,7 +258,13 @@ def embed_text(text_to_embed: str, embedding_function: str = "mxbai-embed-large"
     :param reason:str - the reason for the embedding. This is more of a logging parameter, leave as is
     """
     try:
-        response = ollama.embed(model=f"{embedding_function}", input=f"{text_to_embed}")
+        with span("embed", model=embedding_function, texts=1):
+            response = call_with_backend(
+                embedding_function,
+                lambda base_url: ollama.Client(host=base_url).embed(
+                    model=f"{embedding_function}", input=f"{text_to_embed}"
+                ),
+            )
         return response["embeddings"][0]
 
     except Exception as e:
@@ -120,6 +272,29 @@ def embed_text(text_to_embed: str, embedding_function: str = "mxbai-embed-large"
         return None
 
 
+def embed_texts(
+    texts_to_embed: list[str], embedding_function: str = "mxbai-embed-large"
+) -> list | None:
+    """Embeds several flat strings with a single request to the embedding model
+    :param texts_to_embed:list[str] - the strings to embed, e.g. flattened business states
+    :param embedding_function:str - the name of the embedding function to use from ollama
+    :returns list | None - one embedding per input string, in the same order, or None if embedding failed
+    """
+    try:
+        with span("embed", model=embedding_function, texts=len(texts_to_embed)):
+            response = call_with_backend(
+                embedding_function,
+                lambda base_url: ollama.Client(host=base_url).embed(
+                    model=f"{embedding_function}", input=texts_to_embed
+                ),
+            )
+        return response["embeddings"]
+
+    except Exception as e:
+        logger.error(e)
+        return None
+
+
 def update_chroma_collection(
     collection: Collection,
     collection_name: str,
@@ -127,9 +302,10 @@ def update_chroma_collection(
     embeddings: list,
     ids: list,
 ):
-    """Updates the existing collection in the current Chroma database"""
+    """Adds the documents to a collection of the current Chroma database, replacing the ones with the same ids"""
     try:
-        collection.add(documents=documents, embeddings=embeddings, ids=ids)
+        with span("chroma.upsert", collection=collection_name, documents=len(ids)):
+            collection.upsert(documents=documents, embeddings=embeddings, ids=ids)
         logger.info(f"Updated collection: {collection_name}")
         return None
     except Exception as e:
@@ -137,13 +313,19 @@ def update_chroma_collection(
         return None
 
 
+def business_profile_id(business_state: BusinessState) -> str:
+    """The id of a business in the profiles collection. Ingesting a business again replaces its profile"""
+    return business_state["business_name"].lower().replace(" ", "_")
+
+
 def ingest_business_profile(
     business_state: BusinessState,
     db_path: str = "../chromadb_vectorstore",
     embedding_model: str = "mxbai-embed-large",
+    collection_name: str = BUSINESS_PROFILES_COLLECTION,
 ):
-    """Brings together the helper functions to ingest the business into a vectorstore"""
-    collection_name = sanitize_chroma_collection_name(business_state["business_name"])
+    """Brings together the helper functions to ingest the business into the business profiles collection"""
+    collection_name = sanitize_chroma_collection_name(collection_name)
     flat_business = flatten_business_state(business_state)
     if not flat_business:
         logger.warning("Failed to flatten business state.")
@@ -155,46 +337,88 @@ def ingest_business_profile(
         return
 
     # Create or fetch collection
-    client = PersistentClient(db_path)
-    existing_collections = [col.name for col in client.list_collections()]
-    if collection_name in existing_collections:
-        collection = client.get_collection(collection_name)
-    else:
-        collection_name = sanitize_chroma_collection_name(collection_name)
-        collection = client.create_collection(collection_name)
-
-    doc_id = business_state["business_name"].lower().replace(" ", "_")
+    collection = get_chroma_collection(db_path, collection_name)
 
     update_chroma_collection(
         collection=collection,
         collection_name=collection_name,
         documents=[flat_business],
         embeddings=[embedding],
-        ids=[doc_id],
+        ids=[business_profile_id(business_state)],
+    )
+    update_quantized_index(
+        db_path, collection_name, [business_profile_id(business_state)], [embedding]
     )
 
 
+def search_business_profiles(
+    query_text: str,
+    k: int = 5,
+    db_path: str = "../chromadb_vectorstore",
+    embedding_model: str = "mxbai-embed-large",
+    collection_name: str = BUSINESS_PROFILES_COLLECTION,
+) -> list[Match]:
+    """
+    Finds the business profiles most similar to a text, e.g. a flattened business state. The profiles are
+    scanned in their int8 form and the best VECTORSTORE_RERANK_FACTOR * k are re-scored with their float vectors
+    :param query_text: the text to compare the profiles with
+    :param k: the number of profiles to return
+    :param db_path: path to the ChromaDB directory
+    :param embedding_model: Ollama model name for embeddings, the one the profiles were ingested with
+    :param collection_name: the profiles collection
+    :return: the most similar profiles, with their exact cosine similarity and flattened business
+    """
+    collection_name = sanitize_chroma_collection_name(collection_name)
+    embedding = embed_text(query_text, embedding_function=embedding_model)
+    if embedding is None:
+        logger.warning("Failed to embed the profile search query.")
+        return []
+
+    with span("business_profiles.search", k=k):
+        return get_quantized_index(db_path, collection_name).query(
+            get_chroma_collection(db_path, collection_name),
+            [embedding],
+            k=k,
+            candidates=k * VECTORSTORE_RERANK_FACTOR,
+            include=["documents"],
+        )[0]
+
+
 def get_vectorstore(
     collection_name: str,
     db_path: str = "../chromadb_vectorstore",
     embedding_model: str = "mxbai-embed-large",
+    backend: str | None = None,
 ):
     """
-    Returns a Chroma vectorstore for the specified collection.
+    Returns a vectorstore for the specified collection.
 
     :param collection_name: The name of the ChromaDB collection
     :param db_path: Path to the ChromaDB directory
     :param embedding_model: Ollama model name for embeddings
-    :return: Chroma vectorstore instance
+    :param backend: "chroma" or "numpy". Defaults to the VECTORSTORE_BACKEND environment variable
+    :return: Chroma or NumpyVectorStore instance
     """
     try:
         sanitized_name = sanitize_chroma_collection_name(collection_name)
+        backend = backend or VECTORSTORE_BACKEND
 
         # Set up LangChain-compatible embedding function
-        embedding_function: Embeddings = OllamaEmbeddings(model=embedding_model)
+        embedding_function: Embeddings = PooledOllamaEmbeddings(embedding_model)
+
+        if backend == "numpy":
+            return NumpyVectorStore(
+                embedding=embedding_function,
+                persist_dir=os.path.join(db_path, "numpy", sanitized_name),
+                quantization=VECTORSTORE_QUANTIZATION,
+                rerank_factor=VECTORSTORE_RERANK_FACTOR,
+            )
+
+        if backend != "chroma":
+            raise ValueError(f"Unknown vectorstore backend: {backend}")
 
         vectorstore = Chroma(
-            client=PersistentClient(path=db_path),
+            client=get_chroma_client(db_path),
             collection_name=sanitized_name,
             embedding_function=embedding_function,
         )
@@ -206,31 +430,171 @@ def get_vectorstore(
         raise
 
 
+def hash_document_chunk(document: Document) -> str:
+    """
+    Computes a stable content hash for a split document. The hash covers the chunk text and its metadata,
+    so a renamed header is treated as a changed chunk even if the body is the same
+    :param document: the chunk produced by custom_numbered_header_split
+    :return: the hex sha256 digest of the chunk
+    """
+    hasher = hashlib.sha256()
+    hasher.update(document.page_content.encode("utf-8"))
+    hasher.update(json.dumps(document.metadata, sort_keys=True).encode("utf-8"))
+    return hasher.hexdigest()
+
+
+def load_index_manifest(manifest_path: str) -> dict:
+    """Loads the chunk manifest of an indexed collection. Returns an empty manifest if missing or unreadable."""
+    try:
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+    except (OSError, json.JSONDecodeError) as e:
+        logger.warning(f"Ignoring unreadable index manifest {manifest_path}: {e}")
+        return {}
+
+
+def save_index_manifest(manifest_path: str, manifest: dict) -> None:
+    """Writes the manifest atomically so a crash mid-write never leaves a half-written manifest behind."""
+    os.makedirs(os.path.dirname(manifest_path) or ".", exist_ok=True)
+    tmp_path = f"{manifest_path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, manifest_path)
+
+
+def _list_stored_ids(vectorstore) -> list[str]:
+    """The ids of every chunk in a vectorstore: NumpyVectorStore lists its documents, Chroma its ids."""
+    if hasattr(vectorstore, "get_all_documents"):
+        return [doc.id for doc in vectorstore.get_all_documents()]
+    return vectorstore.get(include=[])["ids"]
+
+
+def sync_vectorstore_with_documents(
+    vectorstore,
+    documents: list[Document],
+    manifest_path: str,
+    embedding_model: str = "mxbai-embed-large",
+    batch_size: int = 16,
+) -> dict:
+    """
+    Incrementally re-indexes a vectorstore so it holds exactly the given documents.
+    Each chunk is keyed by its content hash: unchanged chunks are skipped, removed chunks are deleted and
+    new or edited chunks are embedded in batches. The manifest is rewritten after every step, so it always
+    describes what is actually stored, even if indexing is interrupted
+    :param vectorstore: a Chroma or NumpyVectorStore. Chunks it holds that are not in the manifest are deleted
+    :param documents: the full list of chunks that should be indexed
+    :param manifest_path: path of the json manifest tracking the indexed chunk hashes
+    :param embedding_model: name of the embedding model. Changing it forces a full re-index
+    :param batch_size: number of chunks embedded per request to the embedding model
+    :return: counts of added, removed and unchanged chunks
+    """
+    manifest = load_index_manifest(manifest_path)
+    indexed_chunks = manifest.get("chunks", {})
+    stored_ids = set(_list_stored_ids(vectorstore))
+
+    if indexed_chunks and manifest.get("embedding_model") != embedding_model:
+        logger.info(
+            f"Embedding model changed from {manifest.get('embedding_model')} to {embedding_model}. Re-indexing everything."
+        )
+        indexed_chunks = {}
+
+    # The store must hold exactly the chunks of the manifest. Anything else, e.g. the random-id copies
+    # indexed before there was a manifest, would be retrieved next to the current chunks
+    untracked_ids = [
+        chunk_id for chunk_id in stored_ids if chunk_id not in indexed_chunks
+    ]
+    if untracked_ids:
+        logger.warning(
+            f"Deleting {len(untracked_ids)} chunks missing from the manifest of the vectorstore"
+        )
+        vectorstore.delete(ids=untracked_ids)
+    missing_ids = [
+        chunk_id for chunk_id in indexed_chunks if chunk_id not in stored_ids
+    ]
+    if missing_ids:
+        logger.warning(
+            f"{len(missing_ids)} chunks of the manifest are missing from the vectorstore, re-indexing them"
+        )
+        indexed_chunks = {
+            chunk_id: metadata
+            for chunk_id, metadata in indexed_chunks.items()
+            if chunk_id in stored_ids
+        }
+
+    current_chunks = {hash_document_chunk(doc): doc for doc in documents}
+    removed_ids = [
+        chunk_id for chunk_id in indexed_chunks if chunk_id not in current_chunks
+    ]
+    new_ids = [
+        chunk_id for chunk_id in current_chunks if chunk_id not in indexed_chunks
+    ]
+
+    manifest = {"embedding_model": embedding_model, "chunks": dict(indexed_chunks)}
+
+    if removed_ids:
+        vectorstore.delete(ids=removed_ids)
+        for chunk_id in removed_ids:
+            manifest["chunks"].pop(chunk_id, None)
+        save_index_manifest(manifest_path, manifest)
+
+    for start in range(0, len(new_ids), batch_size):
+        batch_ids = new_ids[start : start + batch_size]
+        vectorstore.add_documents(
+            documents=[current_chunks[chunk_id] for chunk_id in batch_ids],
+            ids=batch_ids,
+        )
+        for chunk_id in batch_ids:
+            manifest["chunks"][chunk_id] = current_chunks[chunk_id].metadata
+        save_index_manifest(manifest_path, manifest)
+
+    if not removed_ids and not new_ids:
+        save_index_manifest(manifest_path, manifest)
+
+    stats = {
+        "added": len(new_ids),
+        "removed": len(removed_ids),
+        "unchanged": len(current_chunks) - len(new_ids),
+    }
+    logger.info(f"Vectorstore synced with {manifest_path}: {stats}")
+    return stats
+
+
 def setup_vectorstore_saa(
     file_name: str,
     persist_dir: str = "../chromadb_vectorstore",
     embedding_model: str = "mxbai-embed-large",
     input_file_path: str = "../input_files/Security Assessment",
+    backend: str | None = None,
 ):
-    """Initialize vector store. Load vectorstore if exists."""
+    """Initialize vector store. Only chunks that changed since the last run are re-embedded."""
 
     collection_name = sanitize_chroma_collection_name(file_name)
-    vectorstore_path = os.path.join(persist_dir, collection_name)
-
-    if os.path.exists(vectorstore_path) and os.listdir(vectorstore_path):
-        logger.info(f"Loading existing vectorstore from {vectorstore_path}")
-        vectorstore = get_vectorstore(collection_name=collection_name)
-    else:
-        logger.info(f"Creating new vectorstore at {vectorstore_path}")
-        # Create new vectorstore
-        vectorstore = Chroma.from_documents(
-            documents=custom_numbered_header_split(load_markdown(input_file_path)),
-            embedding=OllamaEmbeddings(
-                model=embedding_model,
-                base_url=os.environ.get("OLLAMA_BASE_URL", "http://localhost:11434"),
-            ),
-            persist_directory=persist_dir,
-            collection_name=collection_name,
-        )
+    backend = backend or VECTORSTORE_BACKEND
+    # Each backend keeps its own manifest, so switching backends never trusts the other one's index
+    manifest_name = (
+        f"{collection_name}_manifest.json"
+        if backend == "chroma"
+        else f"{collection_name}_{backend}_manifest.json"
+    )
+    manifest_path = os.path.join(persist_dir, manifest_name)
+
+    logger.info(f"Loading {backend} vectorstore {collection_name} from {persist_dir}")
+    vectorstore = get_vectorstore(
+        collection_name=collection_name,
+        db_path=persist_dir,
+        embedding_model=embedding_model,
+        backend=backend,
+    )
+
+    sync_vectorstore_with_documents(
+        vectorstore=vectorstore,
+        documents=split_guide_for_indexing(
+            custom_numbered_header_split(load_markdown(input_file_path))
+        ),
+        manifest_path=manifest_path,
+        embedding_model=embedding_model,
+    )
 
     return vectorstore
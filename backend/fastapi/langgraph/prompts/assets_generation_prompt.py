@@ -1,15 +1,9 @@
+# The static instructions and example come first and the business fields last, so consecutive requests share
+# a byte-identical prefix that Ollama can reuse from its KV cache
 asset_generator_prompt_message = """
             You are a cybersecurity audit specialist. 
             Generate a list of digital assets from a business' activities and description that you will be given, which the given business is likely to possess.
 
-            Here are the business description and business activities that you will use to generate the list of digital assets:
-
-            Business Description:
-            {business_description}
-
-            Business Activity:
-            {business_activity}
-
             Here are the requirements for the bullet list of assets:
             1. Assets must be relevant to the business description.
             2. Each asset needs a brief description describing how it is used. Here is an example description: "The company website is a wordpress site hosted with a shared hosting provider and is used for marketing and displaying business hours."
@@ -18,4 +12,12 @@ asset_generator_prompt_message = """
 
             Here is an example list of assets:
             {assets_listing_example}
+
+            Here are the business description and business activities that you will use to generate the list of digital assets:
+
+            Business Description:
+            {business_description}
+
+            Business Activity:
+            {business_activity}
 """
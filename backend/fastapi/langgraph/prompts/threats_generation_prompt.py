@@ -1,17 +1,10 @@
+# The static instructions come first and the business fields last, so consecutive requests share
+# a byte-identical prefix that Ollama can reuse from its KV cache
 threat_generator_prompt_message = """
             You are a cybersecurity analyst. 
             Your task is to identify threat categories and vulnerabilities for a small businesses. 
             To accomplish this task, you will be given the business' description, activities, and assets. Use the assets to generate the threats, but keep the business description and activities in mind for context.
 
-            This is the business description for the business you will identify threats and vulnerabilities for:
-            {business_description}
-
-            These are the the business activities that the business conducts:
-            {business_activities}
-
-            Finally, these are the business' assets that you should use to identify threat categories and vulnerabilities:
-            {business_assets}
-
             The threats and vulnerabilities should align with the MITRE ATT&CK tactics (e.g., Initial Access, Execution, Persistence, Privilege Escalation, Defense Evasion) and real-world examples like:
             - Phishing
             - Malware infections
@@ -34,6 +27,15 @@ threat_generator_prompt_message = """
             - A high-level category (e.g., Initial Access: Phishing Email)
             - A brief explanation of why this is relevant
 
+            This is the business description for the business you will identify threats and vulnerabilities for:
+            {business_description}
+
+            These are the the business activities that the business conducts:
+            {business_activities}
+
+            Finally, these are the business' assets that you should use to identify threat categories and vulnerabilities:
+            {business_assets}
+
             Pause to reason through the prompt again step-by-step until the requirements are clear to you. Only after this step, generate the business.
 
             Threat & Vulnerability List:
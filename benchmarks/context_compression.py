@@ -0,0 +1,66 @@
+"""
+Size of the retrieved context sent to the assistant's final LLM call, with and without compression.
+
+Retrieval is approximated lexically (top-k sections by query overlap) so it runs without Ollama.
+
+    python -m benchmarks.context_compression --budget 600
+"""
+
+import argparse
+import statistics
+import time
+
+from benchmarks.vectorstore_backends import GUIDE_PATH
+from backend.fastapi.langgraph.helpers.context_compression import (
+    compress_documents,
+    estimate_token_count,
+    score_passage,
+    _content_words,
+)
+from backend.fastapi.langgraph.helpers.vector_db_operations import (
+    custom_numbered_header_split,
+    load_markdown,
+)
+
+QUERIES = [
+    "What should be in scope for the assessment?",
+    "Which CIS 18 controls should I review for the organization profile?",
+    "How do I build the risk matrix from likelihood and impact?",
+    "How do I identify gaps between the current and target profile?",
+    "How should improvements be ranked?",
+    "What does NIST maturity measurement involve?",
+    "What should the final report to the client include?",
+    "How do I assess data protection and account management?",
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--budget", type=int, default=600)
+    parser.add_argument("-k", type=int, default=3)
+    args = parser.parse_args()
+
+    sections = custom_numbered_header_split(load_markdown(GUIDE_PATH))
+    before, after, durations = [], [], []
+    for query in QUERIES:
+        query_words = _content_words(query)
+        retrieved = sorted(
+            sections, key=lambda doc: -score_passage(doc.page_content, query_words)
+        )[: args.k]
+
+        start = time.perf_counter()
+        compressed = compress_documents(query, retrieved, args.budget)
+        durations.append((time.perf_counter() - start) * 1000)
+
+        before.append(sum(estimate_token_count(d.page_content) for d in retrieved))
+        after.append(sum(estimate_token_count(d.page_content) for d in compressed))
+        print(f"{before[-1]:>5} -> {after[-1]:>4} tokens | {query}")
+
+    print(
+        f"mean context tokens {statistics.mean(before):.0f} -> {statistics.mean(after):.0f} "
+        f"(budget {args.budget}), compression takes {statistics.mean(durations):.2f}ms"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+Recall, latency and memory of the int8 side index the business profiles are searched through, vs the float32
+vectors in the profiles' Chroma collection (an exact numpy scan and Chroma's HNSW index).
+
+Uses synthetic 1024-dim vectors (the mxbai-embed-large size) shaped like a scenario library, so it runs
+without Ollama: businesses come in tight groups of similar ones (e.g. the many bakeries a generator produces),
+and the queries are new businesses of the same groups.
+
+    python -m benchmarks.embedding_quantization --vectors 20000 --queries 200
+"""
+
+import argparse
+import shutil
+import statistics
+import tempfile
+import time
+
+import numpy as np
+
+from backend.fastapi.langgraph.helpers.chroma_client_registry import (
+    close_chroma_clients,
+    get_chroma_client,
+    get_chroma_collection,
+)
+from backend.fastapi.langgraph.helpers.numpy_vector_store import (
+    normalize_rows,
+    top_k_indices,
+)
+from backend.fastapi.langgraph.helpers.quantized_index import QuantizedIndex
+from backend.fastapi.langgraph.helpers.vector_db_operations import (
+    BUSINESS_PROFILES_COLLECTION,
+)
+
+
+def clustered_vectors(count: int, dim: int, clusters: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dim)).astype(np.float32)
+    labels = rng.integers(0, clusters, count)
+    noise = rng.standard_normal((count, dim)).astype(np.float32) * 0.8
+    return centers[labels] + noise
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--vectors", type=int, default=20000)
+    parser.add_argument("--dim", type=int, default=1024)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("-k", type=int, default=10)
+    args = parser.parse_args()
+
+    # Groups of ~20 similar businesses, and queries from the same generator
+    everything = clustered_vectors(
+        args.vectors + args.queries, args.dim, clusters=max(args.vectors // 20, 1)
+    )
+    data, queries = everything[: args.vectors], everything[args.vectors :]
+    ids = [f"business_{i}" for i in range(args.vectors)]
+
+    print(
+        f"{args.vectors} business profiles x {args.dim} dims, {args.queries} queries, k={args.k}"
+    )
+    db_path = tempfile.mkdtemp(prefix="bench_quant_")
+    try:
+        collection = get_chroma_collection(db_path, BUSINESS_PROFILES_COLLECTION)
+        batch_size = get_chroma_client(db_path).get_max_batch_size()
+        for first in range(0, args.vectors, batch_size):
+            collection.add(
+                ids=ids[first : first + batch_size],
+                embeddings=data[first : first + batch_size],
+            )
+
+        start = time.perf_counter()
+        index = QuantizedIndex.from_collection(collection)
+        print(
+            f"int8 index built from the collection in {time.perf_counter() - start:.1f}s"
+        )
+
+        matrix = normalize_rows(data)
+        searches = [
+            (
+                "exact float32",
+                lambda q: [
+                    ids[i] for i in top_k_indices(matrix @ normalize_rows(q)[0], args.k)
+                ],
+                matrix.nbytes,
+            ),
+            (
+                "chroma hnsw",
+                lambda q: collection.query(query_embeddings=[q], n_results=args.k)[
+                    "ids"
+                ][0],
+                matrix.nbytes,
+            ),
+            (
+                "int8 + rerank x4",
+                lambda q: [
+                    m.id
+                    for m in index.query(
+                        collection, [q], k=args.k, candidates=4 * args.k
+                    )[0]
+                ],
+                index.memory_footprint_bytes(),
+            ),
+            (
+                "int8 only",
+                lambda q: index.candidates(q, args.k),
+                index.memory_footprint_bytes(),
+            ),
+        ]
+
+        exact_results = None
+        for label, search, ram_bytes in searches:
+            latencies, results = [], []
+            for query in queries:
+                start = time.perf_counter()
+                results.append(set(search(query)))
+                latencies.append((time.perf_counter() - start) * 1000)
+
+            if exact_results is None:
+                exact_results = results
+            recall = statistics.mean(
+                len(r & e) / args.k for r, e in zip(results, exact_results)
+            )
+            print(
+                f"{label:>17}: recall@{args.k} {recall:.3f} | "
+                f"query p50 {statistics.median(latencies):.2f}ms | "
+                f"vectors in RAM {ram_bytes / 1e6:.1f}MB"
+            )
+    finally:
+        close_chroma_clients()
+        shutil.rmtree(db_path, ignore_errors=True)
+
+    print(
+        "int8 RAM includes the room the index keeps for new profiles; the float32 vectors the re-rank "
+        "reads are fetched from Chroma per query"
+    )
+
+
+if __name__ == "__main__":
+    main()
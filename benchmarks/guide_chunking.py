@@ -0,0 +1,123 @@
+"""
+Retrieval precision and prompt size of section-level vs token-bounded sub-section chunking of the guide.
+
+Each question is labelled with the section that answers it. Precision@k is the share of retrieved chunks that
+belong to that section, and the prompt size is the estimated tokens of the retrieved chunks.
+A lexical hashing embedding is used by default so it runs offline; pass --ollama for mxbai-embed-large.
+
+    python -m benchmarks.guide_chunking --max-tokens 256 --overlap 32
+"""
+
+import argparse
+import hashlib
+import os
+import re
+import statistics
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain_ollama import OllamaEmbeddings
+
+from benchmarks.vectorstore_backends import GUIDE_PATH
+from backend.fastapi.langgraph.helpers.context_compression import estimate_token_count
+from backend.fastapi.langgraph.helpers.numpy_vector_store import NumpyVectorStore
+from backend.fastapi.langgraph.helpers.vector_db_operations import (
+    custom_numbered_header_split,
+    load_markdown,
+    token_bounded_split,
+)
+
+LABELLED_QUESTIONS = [
+    ("What should be in scope for the assessment and why was it requested?", "1"),
+    ("How do I set future meeting dates and conclude the assessment?", "1"),
+    ("Which CIS 18 areas should I review for data protection?", "2"),
+    ("How do I measure the current NIST maturity of the organization?", "2"),
+    ("What questions should I ask about risk management strategy?", "2"),
+    ("How do I check incident response management and penetration testing?", "2"),
+    ("How do I develop a reasonable target profile using industry standards?", "3"),
+    ("How do I identify gaps between the current and target profiles?", "4"),
+    ("How is risk computed from likelihood and impact for each asset?", "5"),
+    ("How should gaps be ranked by remaining vulnerability and remediation?", "6"),
+    ("How do I rank improvements using agreed upon metrics?", "7"),
+    ("What final maturity target should the organization measure?", "8"),
+    ("What should the final report delivered to the client include?", "9"),
+]
+
+
+class HashingEmbeddings(Embeddings):
+    """Bag-of-words vectors with the hashing trick. A purely lexical stand-in for a real embedding model."""
+
+    def __init__(self, size: int = 2048):
+        self.size = size
+
+    def _embed(self, text: str) -> list[float]:
+        vector = np.zeros(self.size, dtype=np.float32)
+        for word in re.findall(r"[a-z0-9]+", text.lower()):
+            if len(word) > 2:
+                bucket = int(hashlib.md5(word.encode()).hexdigest(), 16) % self.size
+                vector[bucket] += 1.0
+        return vector.tolist()
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> list[float]:
+        return self._embed(text)
+
+
+def evaluate(chunks, embeddings, k):
+    store = NumpyVectorStore(embedding=embeddings)
+    store.add_documents(chunks)
+    precisions, prompt_tokens = [], []
+    for question, section in LABELLED_QUESTIONS:
+        retrieved = store.similarity_search(question, k=k)
+        precisions.append(
+            sum(doc.metadata.get("section_number") == section for doc in retrieved)
+            / len(retrieved)
+        )
+        prompt_tokens.append(
+            sum(estimate_token_count(doc.page_content) for doc in retrieved)
+        )
+    return (
+        statistics.mean(precisions),
+        statistics.mean(prompt_tokens),
+        max(prompt_tokens),
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--max-tokens", type=int, default=256)
+    parser.add_argument("--overlap", type=int, default=32)
+    parser.add_argument("-k", type=int, default=3)
+    parser.add_argument("--ollama", action="store_true", help="use mxbai-embed-large")
+    args = parser.parse_args()
+
+    if args.ollama:
+        embeddings = OllamaEmbeddings(
+            model="mxbai-embed-large",
+            base_url=os.environ.get("OLLAMA_BASE_URL", "http://localhost:11434"),
+        )
+    else:
+        embeddings = HashingEmbeddings()
+
+    sections = custom_numbered_header_split(load_markdown(GUIDE_PATH))
+    configurations = [
+        ("section", sections),
+        (
+            f"subsection {args.max_tokens}/{args.overlap}",
+            token_bounded_split(sections, args.max_tokens, args.overlap),
+        ),
+    ]
+
+    print(f"{len(LABELLED_QUESTIONS)} labelled questions, k={args.k}")
+    for label, chunks in configurations:
+        precision, mean_tokens, max_tokens = evaluate(chunks, embeddings, args.k)
+        print(
+            f"{label:>18}: {len(chunks):>3} chunks | precision@{args.k} {precision:.2f} | "
+            f"prompt tokens mean {mean_tokens:.0f} max {max_tokens}"
+        )
+
+
+if __name__ == "__main__":
+    main()
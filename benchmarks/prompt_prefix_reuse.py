@@ -0,0 +1,117 @@
+"""
+How much of each generation prompt is a byte-identical prefix shared between requests for different businesses.
+Ollama keeps the KV cache of a loaded model's last prompt, so a shared prefix is not evaluated again.
+
+Offline, the shared prefix is measured on the rendered prompts (tokens estimated at 4 characters per token).
+With --ollama, each prompt is sent for two businesses in a row and Ollama's prompt_eval_count and
+prompt_eval_duration of the second request show what was actually re-evaluated.
+
+    python -m benchmarks.prompt_prefix_reuse [--ollama --model llama3.2]
+"""
+
+import argparse
+import os
+
+import ollama
+
+from backend.fastapi.langgraph.helpers.context_compression import estimate_token_count
+from backend.fastapi.langgraph.helpers.file_operations import (
+    format_prompt_with_input_files,
+)
+from backend.fastapi.langgraph.helpers.model_config import (
+    OLLAMA_KEEP_ALIVE,
+    OLLAMA_NUM_CTX,
+)
+from backend.fastapi.langgraph.prompts.assets_generation_prompt import (
+    asset_generator_prompt_message,
+)
+from backend.fastapi.langgraph.prompts.business_owner_prompt import (
+    business_owner_prompt_message,
+)
+from backend.fastapi.langgraph.prompts.threats_generation_prompt import (
+    threat_generator_prompt_message,
+)
+
+BUSINESSES = [
+    {
+        "name": "Tidal Tabletops",
+        "description": "A San Francisco startup designing custom tabletops and desks for home offices and restaurants.",
+        "activity": "Design and manufacturing of custom furniture, sold online and to co-working spaces.",
+        "assets": "\n- Website: Shopify store with customer accounts\n- Email: shared mailbox protected by a password",
+    },
+    {
+        "name": "Maple Street Bakery",
+        "description": "A family-run bakery in Portland with two storefronts and a catering service.",
+        "activity": "Baking and selling bread and pastries, taking catering orders by phone and email.",
+        "assets": "\n- POS: card terminals connected to the shop Wi-Fi\n- Laptop: used for orders and payroll",
+    },
+]
+
+
+def render_prompts(business: dict) -> dict[str, str]:
+    return {
+        "assets_generation": format_prompt_with_input_files(
+            asset_generator_prompt_message,
+            assets_listing_example="Assets_ZenithPoint.txt",
+        ).format(
+            business_description=business["description"],
+            business_activity=business["activity"],
+        ),
+        "threats_generation": threat_generator_prompt_message.format(
+            business_description=business["description"],
+            business_activities=business["activity"],
+            business_assets=business["assets"],
+        ),
+        "business_owner_chat": business_owner_prompt_message.format(
+            business_name=business["name"],
+            business_description=business["description"],
+            assets_info=business["assets"],
+        ),
+    }
+
+
+def measure_with_ollama(model: str, first: str, second: str) -> tuple[dict, dict]:
+    client = ollama.Client(
+        host=os.environ.get("OLLAMA_BASE_URL", "http://localhost:11434")
+    )
+    options = {"num_ctx": OLLAMA_NUM_CTX, "num_predict": 1}
+    results = []
+    for prompt in (first, second):
+        response = client.generate(
+            model=model, prompt=prompt, options=options, keep_alive=OLLAMA_KEEP_ALIVE
+        )
+        results.append(
+            {
+                "prompt_eval_count": response.prompt_eval_count,
+                "prompt_eval_ms": (response.prompt_eval_duration or 0) / 1e6,
+            }
+        )
+    return results[0], results[1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--ollama", action="store_true")
+    parser.add_argument("--model", default="llama3.2")
+    args = parser.parse_args()
+
+    first, second = (render_prompts(business) for business in BUSINESSES)
+    for task in first:
+        shared = len(os.path.commonprefix([first[task], second[task]]))
+        total_tokens = estimate_token_count(second[task])
+        shared_tokens = estimate_token_count(second[task][:shared])
+        print(
+            f"{task:>20}: ~{total_tokens} prompt tokens, ~{shared_tokens} shared prefix "
+            f"({shared_tokens / total_tokens:.0%})"
+        )
+
+        if args.ollama:
+            cold, warm = measure_with_ollama(args.model, first[task], second[task])
+            print(
+                f"{'':>20}  evaluated {cold['prompt_eval_count']} tokens in {cold['prompt_eval_ms']:.0f}ms, "
+                f"then {warm['prompt_eval_count']} tokens in {warm['prompt_eval_ms']:.0f}ms"
+            )
+
+
+if __name__ == "__main__":
+    main()
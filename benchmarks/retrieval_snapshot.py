@@ -0,0 +1,61 @@
+"""
+Cold-start cost of the security assistant's retrieval state: building it from the guide vs loading a snapshot.
+
+Synthetic embeddings stand in for Ollama, so the build numbers are a lower bound. With mxbai-embed-large the
+build additionally pays one embedding call per chunk, while the snapshot load stays the same.
+
+    python -m benchmarks.retrieval_snapshot
+"""
+
+import shutil
+import tempfile
+import time
+
+from benchmarks.vectorstore_backends import GUIDE_PATH, SyntheticEmbeddings
+from backend.fastapi.langgraph.helpers.numpy_vector_store import NumpyVectorStore
+from backend.fastapi.langgraph.helpers.retrieval_snapshot import (
+    build_retrieval_snapshot,
+    load_retrieval_snapshot,
+    build_section_map,
+)
+from backend.fastapi.langgraph.helpers.vector_db_operations import (
+    custom_numbered_header_split,
+    load_markdown,
+    split_guide_for_indexing,
+    sync_vectorstore_with_documents,
+)
+
+
+def main():
+    work_dir = tempfile.mkdtemp(prefix="bench_snapshot_")
+    embeddings = SyntheticEmbeddings()
+    try:
+        start = time.perf_counter()
+        split_docs = custom_numbered_header_split(load_markdown(GUIDE_PATH))
+        build_section_map(split_docs)
+        sync_vectorstore_with_documents(
+            NumpyVectorStore(embeddings, persist_dir=f"{work_dir}/cold"),
+            split_guide_for_indexing(split_docs),
+            manifest_path=f"{work_dir}/cold_manifest.json",
+        )
+        cold_ms = (time.perf_counter() - start) * 1000
+
+        snapshot_dir = f"{work_dir}/snapshot"
+        build_retrieval_snapshot(GUIDE_PATH, snapshot_dir, embeddings=embeddings)
+        start = time.perf_counter()
+        snapshot = load_retrieval_snapshot(
+            GUIDE_PATH, snapshot_dir, embeddings=embeddings
+        )
+        load_ms = (time.perf_counter() - start) * 1000
+
+        print(
+            f"{len(snapshot.split_docs)} sections, {len(snapshot.vectorstore)} chunks"
+        )
+        print(f"cold build (split + embed + index): {cold_ms:.1f}ms")
+        print(f"snapshot load (verify + mmap):      {load_ms:.1f}ms")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""
+Insert throughput, query latency, recall and memory of the near-duplicate scenario index, with its int8 copy
+(the default) or Chroma's HNSW index finding the candidates re-scored exactly, vs an exact float32 numpy scan,
+and whether the index survives a reopen.
+
+Uses clustered synthetic 1024-dim vectors (the mxbai-embed-large size), so it runs without Ollama. Half of the
+queries are near copies of indexed scenarios, the other half new businesses.
+
+    python -m benchmarks.scenario_dedup --scenarios 20000 --queries 200
+"""
+
+import argparse
+import shutil
+import statistics
+import tempfile
+import time
+
+import numpy as np
+
+from backend.fastapi.langgraph.helpers.chroma_client_registry import (
+    close_chroma_clients,
+)
+from backend.fastapi.langgraph.helpers.numpy_vector_store import normalize_rows
+from backend.fastapi.langgraph.helpers.scenario_dedup import (
+    SCENARIO_DEDUP_THRESHOLD,
+    ScenarioIndex,
+)
+from benchmarks.embedding_quantization import clustered_vectors
+
+# Chroma refuses larger upserts
+INSERT_BATCH_SIZE = 2000
+
+
+def fake_business(number: int) -> dict:
+    return {
+        "business_name": f"Scenario {number}",
+        "business_description": f"Synthetic business {number}",
+        "business_activity": "Benchmarking",
+        "business_location": "Nowhere",
+    }
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    return sorted(values)[min(int(len(values) * fraction), len(values) - 1)]
+
+
+def exact_nearest(matrix: np.ndarray, names: list[str], query: np.ndarray):
+    scores = matrix @ normalize_rows(query)[0]
+    best = int(np.argmax(scores))
+    return names[best], float(scores[best])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--scenarios", type=int, default=20000)
+    parser.add_argument("--dim", type=int, default=1024)
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    data = clustered_vectors(
+        args.scenarios, args.dim, clusters=max(args.scenarios // 100, 1)
+    )
+    rng = np.random.default_rng(1)
+    copies = data[rng.integers(0, args.scenarios, args.queries // 2)]
+    copies = copies + rng.standard_normal(copies.shape).astype(np.float32) * 0.1
+    novel = clustered_vectors(
+        args.queries - len(copies),
+        args.dim,
+        clusters=max(args.queries // 10, 1),
+        seed=2,
+    )
+    queries = np.vstack([copies, novel])
+
+    print(f"{args.scenarios} scenarios x {args.dim} dims, {len(queries)} queries")
+    db_path = tempfile.mkdtemp(prefix="bench_dedup_")
+    try:
+        index = ScenarioIndex(db_path=db_path)
+        start = time.perf_counter()
+        for first in range(0, args.scenarios, INSERT_BATCH_SIZE):
+            batch = range(first, min(first + INSERT_BATCH_SIZE, args.scenarios))
+            index.add([fake_business(i) for i in batch], data[batch.start : batch.stop])
+        insert_seconds = time.perf_counter() - start
+        print(
+            f"insert: {args.scenarios / insert_seconds:.0f} scenarios/s "
+            f"({insert_seconds:.1f}s)"
+        )
+
+        # Reopened from disk, as after a restart. The int8 copy is rebuilt from the collection
+        close_chroma_clients()
+        start = time.perf_counter()
+        index = ScenarioIndex(db_path=db_path)
+        print(
+            f"reopen: {len(index)} scenarios indexed, "
+            f"{(time.perf_counter() - start) * 1000:.0f}ms"
+        )
+        hnsw_index = ScenarioIndex(db_path=db_path, quantization=None)
+
+        matrix = normalize_rows(data)
+        print(
+            f"vectors in RAM: float32 {matrix.nbytes / 1e6:.1f}MB, "
+            f"int8 {index.quantized.memory_footprint_bytes() / 1e6:.1f}MB"
+        )
+        names = [fake_business(i)["business_name"] for i in range(args.scenarios)]
+        results = {}
+        for label, nearest in (
+            ("exact numpy", lambda q: exact_nearest(matrix, names, q)),
+            ("int8 scan", lambda q: index.nearest([q.tolist()])[0]),
+            ("chroma hnsw", lambda q: hnsw_index.nearest([q.tolist()])[0]),
+        ):
+            latencies, found = [], []
+            for query in queries:
+                start = time.perf_counter()
+                found.append(nearest(query))
+                latencies.append((time.perf_counter() - start) * 1000)
+            results[label] = found
+            duplicates = sum(s >= SCENARIO_DEDUP_THRESHOLD for _, s in found)
+            print(
+                f"{label:>12}: query p50 {statistics.median(latencies):.2f}ms | "
+                f"p95 {percentile(latencies, 0.95):.2f}ms | "
+                f"{1000 / statistics.mean(latencies):.0f} checks/s | "
+                f"{duplicates} duplicates at {SCENARIO_DEDUP_THRESHOLD}"
+            )
+
+        # For a new business the nearest scenario does not matter, only that it is below the threshold
+        for label in ("int8 scan", "chroma hnsw"):
+            recall = statistics.mean(
+                a == e
+                for (a, _), (e, _) in zip(
+                    results[label][: len(copies)],
+                    results["exact numpy"][: len(copies)],
+                )
+            )
+            agreement = statistics.mean(
+                (a >= SCENARIO_DEDUP_THRESHOLD) == (e >= SCENARIO_DEDUP_THRESHOLD)
+                for (_, a), (_, e) in zip(results[label], results["exact numpy"])
+            )
+            print(
+                f"{label} recall@1 on near copies {recall:.3f}, "
+                f"same duplicate decision on all queries {agreement:.3f}"
+            )
+    finally:
+        close_chroma_clients()
+        shutil.rmtree(db_path, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+How often structured generation outputs can be used without another generation attempt.
+
+Offline, the example assets are serialized as an AssetCollection and cut at every position, like an output
+stopped by num_predict, and the share that still gives a valid AssetCollection is compared between a strict
+parse and the repairing parser. With --ollama, the assets stage is run for real with both structured output
+methods and the parse failures and latency per call are compared.
+
+    python -m benchmarks.structured_output [--ollama --runs 5]
+"""
+
+import argparse
+import json
+import time
+
+from loguru import logger
+from pydantic import ValidationError
+
+from backend.fastapi.langgraph.helpers.file_operations import retrieve_input_file
+from backend.fastapi.langgraph.helpers.graph_state_classes import AssetCollection
+from backend.fastapi.langgraph.helpers import structured_output
+
+BUSINESS = {
+    "business_name": "Tidal Tabletops",
+    "business_location": "San Francisco",
+    "business_contact_info": "hello@tidaltabletops.example",
+    "business_description": "A San Francisco startup designing custom tabletops and desks for home offices and restaurants.",
+    "business_activity": "Design and manufacturing of custom furniture, sold online and to co-working spaces.",
+}
+
+
+def sample_output() -> str:
+    example = json.loads(retrieve_input_file("Assets_ZenithPoint.txt"))
+    return AssetCollection(
+        assets=[
+            {"category": item["Asset_Name"], "description": item["Description"]}
+            for item in example
+        ]
+    ).model_dump_json()
+
+
+def measure_truncation(text: str) -> tuple[int, int, int]:
+    """Parses every prefix of the output, strictly and with repairs. Returns (prefixes, strict, repaired)."""
+    strict = repaired = 0
+    for end in range(1, len(text) + 1):
+        prefix = text[:end]
+        try:
+            AssetCollection.model_validate_json(prefix)
+            strict += 1
+        except ValidationError:
+            pass
+        try:
+            structured_output.parse_structured_output(prefix, AssetCollection)
+            repaired += 1
+        except Exception:
+            pass
+    return len(text), strict, repaired
+
+
+def measure_with_ollama(method: str, runs: int) -> dict:
+    # Imported here so the offline measurement does not need the agents' dependencies
+    from backend.fastapi.langgraph.ai_agents.assets_generation import generate_assets
+
+    structured_output.STRUCTURED_OUTPUT_METHOD = method
+    failures = 0
+    latencies = []
+    for _ in range(runs):
+        start_time = time.perf_counter()
+        result = generate_assets(BUSINESS)
+        latencies.append((time.perf_counter() - start_time) * 1000)
+        if not isinstance(result, AssetCollection) or not result.assets:
+            failures += 1
+    latencies.sort()
+    return {
+        "failures": failures,
+        "p50_ms": latencies[len(latencies) // 2],
+        "max_ms": latencies[-1],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--ollama", action="store_true")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    # Every repaired prefix would be logged
+    logger.disable(structured_output.__name__)
+    prefixes, strict, repaired = measure_truncation(sample_output())
+    logger.enable(structured_output.__name__)
+    print(
+        f"truncated outputs usable: strict {strict}/{prefixes} ({strict / prefixes:.1%}), "
+        f"repaired {repaired}/{prefixes} ({repaired / prefixes:.1%})"
+    )
+
+    if args.ollama:
+        for method in ("function_calling", "json_schema"):
+            result = measure_with_ollama(method, args.runs)
+            print(
+                f"{method:>16}: {result['failures']}/{args.runs} failed, "
+                f"p50 {result['p50_ms']:.0f}ms, max {result['max_ms']:.0f}ms"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""
+Compares the Chroma and NumPy vectorstore backends on the security assessment guide.
+
+Synthetic embeddings are used by default so the numbers measure the stores themselves, not Ollama.
+Pass --ollama to embed with the real model instead.
+
+    python -m benchmarks.vectorstore_backends --copies 10 --queries 200
+"""
+
+import argparse
+import hashlib
+import os
+import shutil
+import statistics
+import tempfile
+import time
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain_ollama import OllamaEmbeddings
+
+from langchain_chroma import Chroma
+
+from backend.fastapi.langgraph.helpers.vector_db_operations import (
+    custom_numbered_header_split,
+    load_markdown,
+    hash_document_chunk,
+)
+from backend.fastapi.langgraph.helpers.numpy_vector_store import NumpyVectorStore
+from backend.fastapi.langgraph.helpers.chroma_client_registry import (
+    get_chroma_client,
+    close_chroma_clients,
+)
+
+GUIDE_PATH = "backend/fastapi/langgraph/input_files/SecurityAssessmentTemplate-Guide.md"
+
+
+class SyntheticEmbeddings(Embeddings):
+    """Deterministic pseudo-random unit vectors, seeded by the text hash."""
+
+    def __init__(self, size: int = 1024):
+        self.size = size
+
+    def _embed(self, text: str) -> list[float]:
+        seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "big")
+        vector = np.random.default_rng(seed).standard_normal(self.size)
+        return (vector / np.linalg.norm(vector)).tolist()
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> list[float]:
+        return self._embed(text)
+
+
+def directory_size_mb(path: str) -> float:
+    total = 0
+    for root, _, files in os.walk(path):
+        total += sum(os.path.getsize(os.path.join(root, f)) for f in files)
+    return total / 1e6
+
+
+def open_store(backend: str, db_path: str, embeddings: Embeddings):
+    if backend == "numpy":
+        return NumpyVectorStore(embedding=embeddings, persist_dir=db_path)
+    return Chroma(
+        client=get_chroma_client(db_path),
+        collection_name="benchmark",
+        embedding_function=embeddings,
+    )
+
+
+def run_backend(backend, embeddings, documents, queries, k):
+    db_path = tempfile.mkdtemp(prefix=f"bench_{backend}_")
+    try:
+        store = open_store(backend, db_path, embeddings)
+
+        start = time.perf_counter()
+        store.add_documents(documents, ids=[hash_document_chunk(d) for d in documents])
+        build_seconds = time.perf_counter() - start
+
+        close_chroma_clients()
+        start = time.perf_counter()
+        store = open_store(backend, db_path, embeddings)
+        open_seconds = time.perf_counter() - start
+
+        query_vectors = [embeddings.embed_query(q) for q in queries]
+        latencies, results = [], []
+        for vector in query_vectors:
+            start = time.perf_counter()
+            docs = store.similarity_search_by_vector(vector, k=k)
+            latencies.append((time.perf_counter() - start) * 1000)
+            results.append([hash_document_chunk(d) for d in docs])
+
+        return {
+            "build_s": build_seconds,
+            "open_ms": open_seconds * 1000,
+            "p50_ms": statistics.median(latencies),
+            "p95_ms": sorted(latencies)[int(len(latencies) * 0.95) - 1],
+            "disk_mb": directory_size_mb(db_path),
+        }, results
+    finally:
+        close_chroma_clients()
+        shutil.rmtree(db_path, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--copies", type=int, default=1, help="replicate the guide N times"
+    )
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("-k", type=int, default=3)
+    parser.add_argument("--ollama", action="store_true", help="use mxbai-embed-large")
+    args = parser.parse_args()
+
+    if args.ollama:
+        embeddings = OllamaEmbeddings(
+            model="mxbai-embed-large",
+            base_url=os.environ.get("OLLAMA_BASE_URL", "http://localhost:11434"),
+        )
+    else:
+        embeddings = SyntheticEmbeddings()
+
+    sections = custom_numbered_header_split(load_markdown(GUIDE_PATH))
+    documents = [
+        type(doc)(page_content=f"{doc.page_content}\n(copy {i})", metadata=doc.metadata)
+        for i in range(args.copies)
+        for doc in sections
+    ]
+    queries = [f"What belongs in section {i % 10}? ({i})" for i in range(args.queries)]
+
+    print(f"{len(documents)} chunks, {len(queries)} queries, k={args.k}")
+    exact_results = None
+    for backend in ("numpy", "chroma"):
+        stats, results = run_backend(backend, embeddings, documents, queries, args.k)
+        if exact_results is None:
+            exact_results = results
+            recall = 1.0
+        else:
+            recall = statistics.mean(
+                len(set(a) & set(b)) / len(a) for a, b in zip(exact_results, results)
+            )
+        print(
+            f"{backend:>6}: build {stats['build_s']:.2f}s | open {stats['open_ms']:.1f}ms | "
+            f"query p50 {stats['p50_ms']:.3f}ms p95 {stats['p95_ms']:.3f}ms | "
+            f"disk {stats['disk_mb']:.2f}MB | recall@{args.k} vs exact {recall:.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
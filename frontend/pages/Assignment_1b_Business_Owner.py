@@ -7,7 +7,7 @@ from loguru import logger
 # FastAPI endpoint
 url = os.environ.get("BACKEND_URL", "http://localhost:8000")
 FASTAPI_CHAT_URL = f"{url}/api/chat/owner/chat"
-FASTAPI_STATUS_URL = f"{url}/docs"
+FASTAPI_STATUS_URL = f"{url}/readyz"
 
 
 def init_session_state():
@@ -29,11 +29,15 @@ def init_session_state():
 
 
 def check_api_status() -> str:
-    """Ping the FastAPI server and return online/offline"""
+    """Ask the FastAPI server whether it is ready and return online/degraded/starting/offline"""
     try:
         response = requests.get(FASTAPI_STATUS_URL, timeout=5)
-        return "online" if response.status_code == 200 else "offline"
-    except requests.RequestException:
+        if response.status_code == 200:
+            # Degraded while Ollama is unreachable: answers come from caches and fallbacks
+            return "degraded" if response.json().get("degraded") else "online"
+        # 503 while models are still loading
+        return "starting" if response.status_code == 503 else "offline"
+    except (requests.RequestException, ValueError):
         return "offline"
 
 
@@ -76,6 +80,19 @@ def render_header():
 
     if st.session_state.api_status == "online":
         logger.success(f"Backend Business Owner Reached")
+    elif st.session_state.api_status == "degraded":
+        # Not remembered, so the next rerun checks whether it has recovered
+        st.session_state.api_status = "unknown"
+        st.warning(
+            "⚠️ The Business Owner is distracted today, their answers may be brief or repeated."
+        )
+        logger.warning("FastAPI server is degraded: Ollama is unreachable")
+    elif st.session_state.api_status == "starting":
+        # Not remembered, so the next rerun checks again
+        st.session_state.api_status = "unknown"
+        st.warning("⏳ The Business Owner is on their way. Please refresh in a moment.")
+        logger.warning("FastAPI server is not ready yet")
+        st.stop()
     else:
         st.error(
             "❌ Business Owner Had a Family Emergency to attend to. Please come back later"
@@ -3,6 +3,24 @@ import requests
 import os
 
 
+def fetch_security_template(base_url: str) -> str:
+    """Fetch the security template, revalidating the copy kept in the session with its ETag"""
+    cached = st.session_state.get("security_template")
+    headers = {"If-None-Match": cached["etag"]} if cached else {}
+    response = requests.get(
+        f"{base_url}/api/retrieve-file/retrieve-security-template", headers=headers
+    )
+    if response.status_code == 304 and cached:
+        return cached["content"]
+
+    if response.status_code == 200:
+        st.session_state.security_template = {
+            "etag": response.headers.get("ETag"),
+            "content": response.text,
+        }
+    return response.text
+
+
 def assignment_page():
     business_state = st.session_state.get("graph_state", {})
     business_name = business_state.get("business_name", "Unknown Business")
@@ -13,9 +31,7 @@ def assignment_page():
     business_activity = business_state.get("business_activity", "No activity provided.")
 
     base_url = os.environ.get("BACKEND_URL", "http://localhost:8000")
-    security_assessment_md = requests.get(
-        f"{base_url}/api/retrieve-file/retrieve-security-template"
-    ).text
+    security_assessment_md = fetch_security_template(base_url)
 
     if "threatsGeneratedState" not in st.session_state:
         st.session_state.threatsGeneratedState = False
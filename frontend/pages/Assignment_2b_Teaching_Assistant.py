@@ -6,7 +6,7 @@ import os
 # FastAPI endpoint
 url = os.environ.get("BACKEND_URL", "http://localhost:8000")
 FASTAPI_CHAT_URL = f"{url}/api/chat/assessment-assistant"
-FASTAPI_STATUS_URL = f"{url}/docs"
+FASTAPI_STATUS_URL = f"{url}/readyz"
 
 MSG_KEY = "assessment_messages"
 ENDED_KEY = "assessment_chat_ended"
@@ -30,11 +30,15 @@ def init_assessment_session_state():
 
 
 def check_api_status() -> str:
-    """Ping the FastAPI server and return online/offline"""
+    """Ask the FastAPI server whether it is ready and return online/degraded/starting/offline"""
     try:
         response = requests.get(FASTAPI_STATUS_URL, timeout=5)
-        return "online" if response.status_code == 200 else "offline"
-    except requests.RequestException:
+        if response.status_code == 200:
+            # Degraded while Ollama is unreachable: answers come from caches and fallbacks
+            return "degraded" if response.json().get("degraded") else "online"
+        # 503 while models are still loading
+        return "starting" if response.status_code == 503 else "offline"
+    except (requests.RequestException, ValueError):
         return "offline"
 
 
@@ -73,6 +77,17 @@ def render_header():
 
     if st.session_state[API_KEY] == "online":
         st.success("✅ TA is able to help!")
+    elif st.session_state[API_KEY] == "degraded":
+        # Not remembered, so the next rerun checks whether it has recovered
+        st.session_state[API_KEY] = "unknown"
+        st.warning(
+            "⚠️ The TA is short on time: only questions naming a guide section can be answered right now."
+        )
+    elif st.session_state[API_KEY] == "starting":
+        # Not remembered, so the next rerun checks again
+        st.session_state[API_KEY] = "unknown"
+        st.warning("⏳ The TA is still getting ready. Please refresh in a moment.")
+        st.stop()
     else:
         st.error("❌ FastAPI server is offline. Please start your FastAPI server.")
         st.stop()
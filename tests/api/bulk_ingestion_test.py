@@ -0,0 +1,116 @@
+import sys
+import os
+import hashlib
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../")))
+from backend.fastapi.langgraph.helpers import bulk_ingestion, vector_db_operations
+from backend.fastapi.langgraph.helpers.chroma_client_registry import (
+    get_chroma_client,
+    get_chroma_collection,
+)
+from backend.fastapi.langgraph.helpers.vector_db_operations import (
+    BUSINESS_PROFILES_COLLECTION,
+    ingest_business_profile,
+    search_business_profiles,
+)
+
+
+def make_business(name: str) -> dict:
+    return {
+        "business_name": name,
+        "business_location": "Southeast Portland",
+        "business_contact_info": "contact@example.org",
+        "business_activity": f"{name} activity",
+        "business_description": f"{name} description",
+        "assets": {"assets": []},
+    }
+
+
+def fake_embedding(text: str) -> list[float]:
+    return [float(len(text)), 1.0, 0.0]
+
+
+@pytest.fixture
+def db_path(tmp_path, monkeypatch):
+    monkeypatch.setattr(
+        vector_db_operations,
+        "embed_text",
+        lambda text, embedding_function=None: fake_embedding(text),
+    )
+    monkeypatch.setattr(
+        bulk_ingestion,
+        "embed_texts",
+        lambda texts, embedding_function=None: [fake_embedding(t) for t in texts],
+    )
+    return str(tmp_path)
+
+
+def _profile_ids(db_path: str) -> list[str]:
+    collection = get_chroma_collection(db_path, BUSINESS_PROFILES_COLLECTION)
+    return sorted(collection.get(include=[])["ids"])
+
+
+def test_single_and_bulk_ingestion_share_the_collection(db_path):
+    ingest_business_profile(make_business("Harbor Freight"), db_path=db_path)
+    stats = bulk_ingestion.ingest_business_profiles_bulk(
+        [make_business("Harbor Freight"), make_business("Crumb Corner")],
+        db_path=db_path,
+    )
+
+    assert stats["ingested"] == 2
+    # Harbor Freight was ingested by both paths, under the same id
+    assert _profile_ids(db_path) == ["crumb_corner", "harbor_freight"]
+    assert [c.name for c in get_chroma_client(db_path).list_collections()] == [
+        BUSINESS_PROFILES_COLLECTION
+    ]
+
+
+def test_legacy_collections_are_migrated(db_path):
+    legacy = get_chroma_collection(db_path, "zenith_wellness")
+    legacy.add(ids=["zenith_wellness"], documents=["profile"], embeddings=[[1, 2, 3]])
+    guide = get_chroma_collection(db_path, "security_assessment_guide")
+    guide.add(ids=["a1b2"], documents=["1. # Scope"], embeddings=[[3, 2, 1]])
+
+    assert bulk_ingestion.migrate_business_profile_collections(db_path) == 1
+    assert _profile_ids(db_path) == ["zenith_wellness"]
+    assert sorted(c.name for c in get_chroma_client(db_path).list_collections()) == [
+        BUSINESS_PROFILES_COLLECTION,
+        "security_assessment_guide",
+    ]
+
+
+def word_embedding(text: str) -> list[float]:
+    vector = [0.0] * 64
+    for word in text.lower().split():
+        vector[int(hashlib.md5(word.encode()).hexdigest(), 16) % 64] += 1
+    return vector
+
+
+def test_profiles_are_searched_through_the_quantized_index(db_path, monkeypatch):
+    monkeypatch.setattr(
+        vector_db_operations,
+        "embed_text",
+        lambda text, embedding_function=None: word_embedding(text),
+    )
+    monkeypatch.setattr(
+        bulk_ingestion,
+        "embed_texts",
+        lambda texts, embedding_function=None: [word_embedding(t) for t in texts],
+    )
+    ingest_business_profile(make_business("Harbor Freight"), db_path=db_path)
+    query = vector_db_operations.flatten_business_state(make_business("Crumb Corner"))
+    assert [m.id for m in search_business_profiles(query, k=1, db_path=db_path)] == [
+        "harbor_freight"
+    ]
+
+    # Profiles ingested once the index is built are added to it
+    bulk_ingestion.ingest_business_profiles_bulk(
+        [make_business("Crumb Corner"), make_business("Zenith Wellness Downtown")],
+        db_path=db_path,
+    )
+    [match] = search_business_profiles(query, k=1, db_path=db_path)
+    assert match.id == "crumb_corner"
+    assert match.similarity == pytest.approx(1.0)
+    assert match.document == query
@@ -0,0 +1,114 @@
+import sys
+import os
+import asyncio
+import json
+import threading
+import time
+
+from fastapi import FastAPI
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../")))
+from backend.fastapi.langgraph.helpers.cancellation import (
+    CancelOnDisconnectMiddleware,
+    is_cancelled,
+)
+from backend.fastapi.langgraph.helpers.metrics import CANCELLED_REQUESTS
+
+app = FastAPI()
+app.add_middleware(CancelOnDisconnectMiddleware)
+seen_cancellation = threading.Event()
+
+
+@app.post("/echo")
+def echo(payload: dict):
+    return payload
+
+
+@app.post("/quick")
+def quick():
+    time.sleep(0.05)
+    return {"cancelled": is_cancelled()}
+
+
+@app.post("/slow")
+def slow():
+    # A sync route: it runs in the threadpool, like the LLM endpoints
+    deadline = time.monotonic() + 5
+    while time.monotonic() < deadline:
+        if is_cancelled():
+            seen_cancellation.set()
+            return {"cancelled": True}
+        time.sleep(0.01)
+    return {"cancelled": False}
+
+
+def request(path: str, body: bytes, disconnect_after: float | None = None) -> list:
+    """Sends one request through the app, with the client disconnecting after a delay if given."""
+    sent = []
+    response_done = asyncio.Event()
+    messages = [
+        {"type": "http.request", "body": body[:5], "more_body": True},
+        {"type": "http.request", "body": body[5:], "more_body": False},
+    ]
+
+    async def receive():
+        if messages:
+            return messages.pop(0)
+        if disconnect_after is not None:
+            await asyncio.sleep(disconnect_after)
+        else:
+            # Servers report a disconnect once the response is complete
+            await response_done.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        sent.append(message)
+        if message["type"] == "http.response.body" and not message.get("more_body"):
+            response_done.set()
+
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "POST",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "headers": [(b"content-type", b"application/json")],
+        "client": ("testclient", 50000),
+        "server": ("testserver", 80),
+        "scheme": "http",
+        "root_path": "",
+    }
+    asyncio.run(app(scope, receive, send))
+    return sent
+
+
+def _body(sent: list) -> dict:
+    return json.loads(
+        b"".join(m.get("body", b"") for m in sent if m["type"] == "http.response.body")
+    )
+
+
+def test_body_is_replayed_to_the_route():
+    sent = request("/echo", json.dumps({"business_name": "Harbor Freight"}).encode())
+    assert sent[0]["status"] == 200
+    assert _body(sent) == {"business_name": "Harbor Freight"}
+
+
+def _cancelled_count(path: str) -> float:
+    return CANCELLED_REQUESTS._values.get((path,), 0)
+
+
+def test_completed_request_is_not_cancelled():
+    sent = request("/quick", b"{}")
+    assert _body(sent) == {"cancelled": False}
+    # The disconnect reported after the response does not count as a cancellation
+    assert _cancelled_count("/quick") == 0
+
+
+def test_disconnect_cancels_the_route():
+    seen_cancellation.clear()
+    request("/slow", b"{}", disconnect_after=0.1)
+    assert seen_cancellation.wait(2)
+    assert _cancelled_count("/slow") == 1
@@ -0,0 +1,80 @@
+import sys
+import os
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../")))
+from backend.fastapi.langgraph.helpers import chroma_client_registry
+from backend.fastapi.langgraph.helpers.chroma_client_registry import (
+    check_chroma_clients,
+    close_chroma_clients,
+    get_chroma_client,
+    get_chroma_collection,
+)
+
+
+class FakeClient:
+    opened = []
+
+    def __init__(self, path):
+        self.path = path
+        self.healthy = True
+        self.closed = False
+        FakeClient.opened.append(self)
+
+    def heartbeat(self):
+        if not self.healthy:
+            raise ConnectionError("sqlite is gone")
+        return 1
+
+    def get_or_create_collection(self, name):
+        return (self, name)
+
+    def clear_system_cache(self):
+        self.closed = True
+
+
+@pytest.fixture(autouse=True)
+def registry(monkeypatch):
+    FakeClient.opened = []
+    monkeypatch.setattr(chroma_client_registry, "PersistentClient", FakeClient)
+    monkeypatch.setattr(chroma_client_registry, "_clients", {})
+    monkeypatch.setattr(chroma_client_registry, "_collections", {})
+    monkeypatch.setattr(chroma_client_registry, "_last_health_check", {})
+
+
+def test_clients_are_opened_lazily_once_per_path(tmp_path):
+    assert FakeClient.opened == []
+    client = get_chroma_client(str(tmp_path))
+    assert get_chroma_client(str(tmp_path / ".." / tmp_path.name)) is client
+    assert get_chroma_client(str(tmp_path / "other")) is not client
+    assert len(FakeClient.opened) == 2
+
+
+def test_collection_handles_are_reused(tmp_path):
+    guide = get_chroma_collection(str(tmp_path), "guide")
+    assert get_chroma_collection(str(tmp_path), "guide") is guide
+    assert get_chroma_collection(str(tmp_path), "profiles") is not guide
+    assert len(FakeClient.opened) == 1
+
+
+def test_client_failing_its_health_check_is_reopened(tmp_path, monkeypatch):
+    client = get_chroma_client(str(tmp_path))
+    get_chroma_collection(str(tmp_path), "guide")
+    client.healthy = False
+    assert check_chroma_clients() == {str(tmp_path): False}
+
+    # Within the interval, the cached client is returned without a check
+    assert get_chroma_client(str(tmp_path)) is client
+    monkeypatch.setattr(chroma_client_registry, "HEALTH_CHECK_INTERVAL_SECONDS", 0)
+    reopened = get_chroma_client(str(tmp_path))
+    assert reopened is not client
+    # The handles of the broken client are dropped with it
+    assert get_chroma_collection(str(tmp_path), "guide")[0] is reopened
+
+
+def test_close_releases_every_client(tmp_path):
+    client = get_chroma_client(str(tmp_path))
+    close_chroma_clients()
+    assert client.closed
+    assert get_chroma_client(str(tmp_path)) is not client
@@ -0,0 +1,126 @@
+import sys
+import os
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../")))
+from backend.fastapi.langgraph.helpers import circuit_breaker
+from backend.fastapi.langgraph.helpers.circuit_breaker import (
+    CLOSED,
+    HALF_OPEN,
+    OPEN,
+    CircuitBreaker,
+    CircuitOpenError,
+)
+
+
+class Unreachable(ConnectionError):
+    pass
+
+
+class Cancelled(Exception):
+    pass
+
+
+@pytest.fixture
+def circuit():
+    return CircuitBreaker(
+        "test",
+        is_failure=lambda e: isinstance(e, ConnectionError),
+        ignored=(Cancelled,),
+    )
+
+
+def call(circuit: CircuitBreaker, error: BaseException | None = None, **guard):
+    try:
+        with circuit.guard(**guard):
+            if error is not None:
+                raise error
+    except type(error) if error is not None else ():
+        pass
+
+
+def trip(circuit: CircuitBreaker) -> None:
+    for _ in range(circuit_breaker.MIN_CALLS_TO_OPEN):
+        call(circuit, Unreachable())
+    assert circuit.state == OPEN
+
+
+def let_open_period_pass(circuit: CircuitBreaker) -> None:
+    circuit.opened_at -= circuit_breaker.CIRCUIT_OPEN_SECONDS
+
+
+def test_stays_closed_below_the_minimum_calls(circuit):
+    for _ in range(circuit_breaker.MIN_CALLS_TO_OPEN - 1):
+        call(circuit, Unreachable())
+    assert circuit.state == CLOSED
+
+
+def test_stays_closed_below_the_failure_rate(circuit):
+    for _ in range(10):
+        call(circuit)
+    for _ in range(5):
+        call(circuit, Unreachable())
+    assert circuit.state == CLOSED
+
+
+def test_answered_errors_do_not_count(circuit):
+    for _ in range(10):
+        call(circuit, ValueError("unparsable output"))
+    assert circuit.state == CLOSED
+
+
+def test_opens_on_failures_and_fails_fast(circuit):
+    trip(circuit)
+    ran = []
+    with pytest.raises(CircuitOpenError) as error:
+        with circuit.guard():
+            ran.append(True)
+    assert not ran
+    assert 0 < error.value.retry_after <= circuit_breaker.CIRCUIT_OPEN_SECONDS
+    assert circuit.status()["times_opened"] == 1
+
+
+def test_slow_calls_count_as_failures(circuit):
+    for _ in range(circuit_breaker.MIN_CALLS_TO_OPEN):
+        call(circuit, slow_call_seconds=-1)
+    assert circuit.state == OPEN
+
+
+def test_successful_probe_closes_the_circuit(circuit):
+    trip(circuit)
+    let_open_period_pass(circuit)
+    with circuit.guard():
+        assert circuit.state == HALF_OPEN
+        # A single probe at a time
+        with pytest.raises(CircuitOpenError):
+            with circuit.guard():
+                pass
+    assert circuit.state == CLOSED
+    assert circuit.status()["recent_calls"] == 0
+
+
+def test_failed_probe_opens_the_circuit_again(circuit):
+    trip(circuit)
+    let_open_period_pass(circuit)
+    call(circuit, Unreachable())
+    assert circuit.state == OPEN
+    assert circuit.retry_after() > 0
+    assert circuit.status()["times_opened"] == 2
+
+
+def test_ignored_probe_error_lets_the_next_call_probe(circuit):
+    trip(circuit)
+    let_open_period_pass(circuit)
+    call(circuit, Cancelled())
+    assert circuit.state == HALF_OPEN
+    call(circuit)
+    assert circuit.state == CLOSED
+
+
+def test_outcomes_of_calls_admitted_before_opening_are_ignored(circuit):
+    with circuit.guard():
+        trip(circuit)
+        let_open_period_pass(circuit)
+    # The late success is not mistaken for a probe
+    assert circuit.state == OPEN
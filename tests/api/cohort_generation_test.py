@@ -0,0 +1,106 @@
+import sys
+import os
+import json
+from itertools import count
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../")))
+from backend.fastapi.langgraph.helpers import cohort_generation
+from backend.fastapi.langgraph.helpers.circuit_breaker import CircuitOpenError
+from backend.fastapi.langgraph.helpers.cohort_generation import (
+    generate_cohort,
+    load_checkpoint,
+)
+
+
+def test_checkpoint_drops_cut_off_lines(tmp_path):
+    output = tmp_path / "cohort.jsonl"
+    output.write_text('{"business_name": "A"}\n{"business_na', encoding="utf-8")
+    assert load_checkpoint(str(output)) == [{"business_name": "A"}]
+    assert output.read_text(encoding="utf-8") == '{"business_name": "A"}\n'
+
+
+def test_checkpoint_ends_the_last_line(tmp_path):
+    output = tmp_path / "cohort.jsonl"
+    output.write_text('{"business_name": "A"}', encoding="utf-8")
+    assert load_checkpoint(str(output)) == [{"business_name": "A"}]
+    with open(output, "a", encoding="utf-8") as f:
+        f.write('{"business_name": "B"}\n')
+    assert load_checkpoint(str(output)) == [
+        {"business_name": "A"},
+        {"business_name": "B"},
+    ]
+
+
+@pytest.fixture
+def no_health_checks(monkeypatch):
+    monkeypatch.setattr(
+        cohort_generation.ollama_pool, "start_health_checks", lambda: None
+    )
+    monkeypatch.setattr(
+        cohort_generation.ollama_pool, "stop_health_checks", lambda: None
+    )
+
+
+def test_circuit_pauses_do_not_count_as_failures(
+    tmp_path, monkeypatch, no_health_checks
+):
+    calls = count()
+
+    def generate_scenario(names):
+        number = next(calls)
+        if number < 4:
+            raise CircuitOpenError("ollama", 0)
+        return "generated", {"business_name": f"Business {number}"}
+
+    monkeypatch.setattr(cohort_generation, "generate_scenario", generate_scenario)
+    output = tmp_path / "cohort.jsonl"
+    stats = generate_cohort(2, str(output), concurrency=1, max_failures=1)
+
+    assert stats["generated"] == 2 and stats["failed"] == 0
+    assert stats["paused"] == 4
+    assert len(output.read_text(encoding="utf-8").splitlines()) == 2
+
+
+@pytest.fixture
+def reserved_business(monkeypatch):
+    monkeypatch.setattr(
+        cohort_generation,
+        "reserve_validated_business",
+        lambda: ({"business_name": "Harbor Freight"}, "reservation-1"),
+    )
+    released = []
+    monkeypatch.setattr(cohort_generation, "release_business", released.append)
+    return released
+
+
+def test_business_is_released_when_a_stage_raises(monkeypatch, reserved_business):
+    def open_circuit(business):
+        raise CircuitOpenError("ollama", 0)
+
+    monkeypatch.setattr(cohort_generation, "get_validated_assets", open_circuit)
+    names = cohort_generation._BusinessNames([])
+    with pytest.raises(CircuitOpenError):
+        cohort_generation.generate_scenario(names)
+    assert names.reserve("Harbor Freight")
+    assert reserved_business == ["reservation-1"]
+
+
+def test_business_is_released_when_a_stage_fails(monkeypatch, reserved_business):
+    monkeypatch.setattr(cohort_generation, "get_validated_assets", lambda b: b)
+    monkeypatch.setattr(cohort_generation, "get_validated_threats", lambda b: None)
+    names = cohort_generation._BusinessNames([])
+    assert cohort_generation.generate_scenario(names) == ("failed", None)
+    assert reserved_business == ["reservation-1"]
+
+
+def test_written_business_stays_reserved(monkeypatch, reserved_business):
+    monkeypatch.setattr(cohort_generation, "get_validated_assets", lambda b: b)
+    monkeypatch.setattr(cohort_generation, "get_validated_threats", lambda b: b)
+    names = cohort_generation._BusinessNames([])
+    assert cohort_generation.generate_scenario(names)[0] == "generated"
+    assert reserved_business == []
+    # Another business with the same name is a cohort duplicate, and its reservation is released
+    assert cohort_generation.generate_scenario(names) == ("duplicate", None)
+    assert reserved_business == ["reservation-1"]
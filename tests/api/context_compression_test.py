@@ -0,0 +1,53 @@
+import sys
+import os
+
+from langchain.schema import Document
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../")))
+from backend.fastapi.langgraph.helpers.context_compression import (
+    compress_documents,
+    estimate_token_count,
+    split_into_passages,
+)
+
+SECTION = "\n".join(
+    ["2. # **Develop a profile of the organization**"]
+    + [
+        f"- Record the organization's mission, staff, suppliers and customers, item {i}."
+        for i in range(40)
+    ]
+)
+
+
+def test_documents_within_budget_are_unchanged():
+    documents = [Document(page_content="1. # Scope\nShort section.")]
+    assert compress_documents("scope", documents, token_budget=100) is documents
+
+
+def test_relevant_passages_are_kept_first():
+    document = Document(
+        page_content="3. # Assets\nPrinters hold scanned records.\n"
+        + "\n".join(f"Unrelated filler line {i}." for i in range(50))
+    )
+    compressed = compress_documents("printers", [document], token_budget=30)[0]
+    assert compressed.page_content.startswith(
+        "3. # Assets\nPrinters hold scanned records."
+    )
+    assert estimate_token_count(compressed.page_content) <= 30
+
+
+def test_query_without_overlap_fills_the_budget_in_document_order():
+    compressed = compress_documents(
+        "Explain section 2", [Document(page_content=SECTION)], token_budget=200
+    )[0]
+    passages = split_into_passages(compressed.page_content)
+    assert passages[0] == "2. # **Develop a profile of the organization**"
+    assert len(passages) > 5
+    assert passages[1:] == split_into_passages(SECTION)[1 : len(passages)]
+    assert estimate_token_count(compressed.page_content) <= 200
+
+
+def test_a_document_is_never_cut_down_to_its_header():
+    documents = [Document(page_content=SECTION), Document(page_content=SECTION)]
+    compressed = compress_documents("Explain section 2", documents, token_budget=20)
+    assert all(len(split_into_passages(doc.page_content)) == 2 for doc in compressed)
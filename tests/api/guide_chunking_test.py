@@ -0,0 +1,67 @@
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../")))
+from backend.fastapi.langgraph.helpers.context_compression import estimate_token_count
+from backend.fastapi.langgraph.helpers.vector_db_operations import (
+    custom_numbered_header_split,
+    expand_to_parent_sections,
+    token_bounded_split,
+)
+
+GUIDE = "\n".join(
+    [
+        "1. # Scope",
+        "Describe what the assessment covers.",
+        "2. # Threats",
+        *[f"Threat line {i} describing an attack on the business." for i in range(30)],
+        "3. ## Controls",
+        "word " * 200,
+    ]
+)
+
+
+def test_sections_are_split_on_numbered_headers():
+    sections = custom_numbered_header_split(GUIDE)
+    assert [doc.metadata["section_number"] for doc in sections] == ["1", "2", "3"]
+    assert sections[2].metadata["level"] == 2
+    assert sections[1].metadata["title"] == "Threats"
+
+
+def test_pieces_stay_within_the_token_limit():
+    sections = custom_numbered_header_split(GUIDE)
+    chunks = token_bounded_split(sections, max_tokens=64, overlap_tokens=16)
+    assert all(estimate_token_count(chunk.page_content) <= 64 for chunk in chunks)
+    # The long single line of section 3 is split on word boundaries
+    assert sum(c.metadata["parent_section_number"] == "3" for c in chunks) > 1
+
+
+def test_pieces_repeat_the_header_and_overlap():
+    sections = custom_numbered_header_split(GUIDE)
+    chunks = [
+        chunk
+        for chunk in token_bounded_split(sections, max_tokens=64, overlap_tokens=16)
+        if chunk.metadata["parent_section_number"] == "2"
+    ]
+    assert len(chunks) > 1
+    assert all(chunk.page_content.startswith("2. # Threats") for chunk in chunks)
+    assert [chunk.metadata["chunk_index"] for chunk in chunks] == list(
+        range(len(chunks))
+    )
+    assert {chunk.metadata["chunk_count"] for chunk in chunks} == {len(chunks)}
+    first_lines, second_lines = (c.page_content.splitlines() for c in chunks[:2])
+    assert first_lines[-1] in second_lines[1:]
+
+
+def test_short_sections_are_a_single_piece():
+    sections = custom_numbered_header_split(GUIDE)
+    chunks = token_bounded_split(sections[:1], max_tokens=64, overlap_tokens=16)
+    assert [chunk.page_content for chunk in chunks] == [sections[0].page_content]
+
+
+def test_chunks_expand_to_their_sections_once():
+    sections = custom_numbered_header_split(GUIDE)
+    chunks = token_bounded_split(sections, max_tokens=64, overlap_tokens=16)
+    threats = [c for c in chunks if c.metadata["parent_section_number"] == "2"]
+    expanded = expand_to_parent_sections(threats + chunks[:1], sections)
+    assert expanded == [sections[1], sections[0]]
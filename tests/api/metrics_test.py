@@ -0,0 +1,63 @@
+import sys
+import os
+import uuid
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../")))
+from backend.fastapi.langgraph.helpers.metrics import (
+    Counter,
+    Gauge,
+    Histogram,
+    render_metrics,
+)
+
+
+def metric_name(kind: str) -> str:
+    return f"test_{kind}_{uuid.uuid4().hex[:8]}"
+
+
+def test_counter_renders_help_type_and_samples():
+    counter = Counter(metric_name("counter"), "Test counter", ("stage",))
+    counter.inc(stage="business")
+    counter.inc(2.5, stage="business")
+    assert counter.render().splitlines() == [
+        f"# HELP {counter.name} Test counter",
+        f"# TYPE {counter.name} counter",
+        f'{counter.name}{{stage="business"}} 3.5',
+    ]
+
+
+def test_label_values_are_escaped():
+    gauge = Gauge(metric_name("gauge"), "Test gauge", ("path",))
+    gauge.set(1, path='C:\\say "hi"\n')
+    assert f'{gauge.name}{{path="C:\\\\say \\"hi\\"\\n"}} 1' in gauge.render()
+
+
+def test_labels_must_match():
+    counter = Counter(metric_name("counter"), "Test counter", ("stage",))
+    with pytest.raises(ValueError):
+        counter.inc(model="llama3.2")
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram(metric_name("histogram"), "Test", buckets=(1, 5))
+    for value in (0.5, 1, 3, 10):
+        histogram.observe(value)
+    samples = histogram.render().splitlines()[2:]
+    assert samples == [
+        f'{histogram.name}_bucket{{le="1"}} 2',
+        f'{histogram.name}_bucket{{le="5"}} 3',
+        f'{histogram.name}_bucket{{le="+Inf"}} 4',
+        f"{histogram.name}_sum 14.5",
+        f"{histogram.name}_count 4",
+    ]
+
+
+def test_every_metric_is_rendered():
+    gauge = Gauge(metric_name("gauge"), "Test gauge")
+    gauge.set(7)
+    text = render_metrics()
+    assert text.endswith("\n")
+    assert f"# TYPE {gauge.name} gauge\n{gauge.name} 7" in text
+    assert "# TYPE http_request_duration_seconds histogram" in text
@@ -0,0 +1,167 @@
+import sys
+import os
+import json
+import uuid
+
+import pytest
+from pydantic import BaseModel
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../")))
+from backend.fastapi.langgraph.helpers import model_routing
+from backend.fastapi.langgraph.helpers.model_routing import (
+    DEFAULT_MODEL_ROUTES,
+    RoutedModel,
+    get_route_stats,
+    get_routed_model,
+    load_model_routes,
+    record_route_agreement,
+    record_route_call,
+)
+
+
+class Verdict(BaseModel):
+    is_valid: bool
+
+
+class FakeLLM:
+    def __init__(self, model_name, base_url, options, calls):
+        self.model_name, self.base_url, self.options = model_name, base_url, options
+        self.calls = calls
+
+    def invoke(self, model_input, config=None):
+        self.calls.append(self.model_name)
+        if self.model_name.startswith("broken"):
+            raise RuntimeError(f"{self.model_name} is not pulled")
+        return f"answer from {self.model_name}"
+
+
+@pytest.fixture
+def stage(monkeypatch):
+    """A route with two fallbacks, served by fake models on a fake server."""
+    name = f"test_stage_{uuid.uuid4().hex}"
+    monkeypatch.setitem(
+        model_routing.MODEL_ROUTES,
+        name,
+        {
+            "models": ["broken-primary", "fallback", "last"],
+            "temperature": 0.1,
+            "num_predict": 64,
+            "slow_call_seconds": 30,
+        },
+    )
+    calls, created = [], []
+
+    def fetch_model(model_name, base_url=None, **options):
+        created.append(model_name)
+        return FakeLLM(model_name, base_url, options, calls)
+
+    monkeypatch.setattr(model_routing, "fetch_model_from_ollama", fetch_model)
+    monkeypatch.setattr(
+        model_routing,
+        "call_with_backend",
+        lambda model_name, function, slow_call_seconds=None: function(
+            "http://fake-ollama:11434"
+        ),
+    )
+    return name, calls, created
+
+
+def _stats(stage: str) -> dict[str, dict]:
+    return {
+        entry["model"]: entry for entry in get_route_stats() if entry["stage"] == stage
+    }
+
+
+def test_config_file_overrides_stage_options(tmp_path):
+    config = tmp_path / "routes.json"
+    config.write_text(
+        json.dumps(
+            {
+                "output_validation": {"models": ["llama3.2"]},
+                "new_stage": {"models": ["qwen2.5"], "temperature": 0},
+            }
+        ),
+        encoding="utf-8",
+    )
+    routes = load_model_routes(str(config))
+    assert routes["output_validation"]["models"] == ["llama3.2"]
+    # Options the file does not set keep their defaults
+    assert (
+        routes["output_validation"]["num_predict"]
+        == DEFAULT_MODEL_ROUTES["output_validation"]["num_predict"]
+    )
+    assert routes["new_stage"] == {"models": ["qwen2.5"], "temperature": 0}
+    assert load_model_routes(str(tmp_path / "missing.json")) == load_model_routes(None)
+
+
+def test_unknown_stage_has_no_route():
+    with pytest.raises(KeyError):
+        RoutedModel("no_such_stage")
+
+
+def test_policy_keys_are_not_model_options(stage):
+    name, _, _ = stage
+    routed = RoutedModel(name)
+    assert routed._options == {"temperature": 0.1, "num_predict": 64}
+    assert routed.slow_call_seconds == 30
+    assert routed.max_prompt_tokens == model_routing.OLLAMA_NUM_CTX - 64
+
+
+def test_models_are_tried_in_fallback_order(stage):
+    name, calls, _ = stage
+    result, model_name = RoutedModel(name).invoke_with_model("Is this valid?")
+    assert (result, model_name) == ("answer from fallback", "fallback")
+    assert calls == ["broken-primary", "fallback"]
+    assert model_routing.get_last_routed_model(name) == "fallback"
+
+
+def test_pinned_model_replaces_the_chain(stage):
+    name, calls, _ = stage
+    assert RoutedModel(name, models=["last"]).invoke("Is this valid?") == (
+        "answer from last"
+    )
+    assert calls == ["last"]
+
+
+def test_every_model_failing_raises(stage):
+    name, calls, _ = stage
+    with pytest.raises(RuntimeError):
+        RoutedModel(name, models=["broken-a", "broken-b"]).invoke("Is this valid?")
+    assert calls == ["broken-a", "broken-b"]
+
+
+def test_calls_are_recorded_per_stage_and_model(stage):
+    name, _, _ = stage
+    RoutedModel(name).invoke("Is this valid?")
+    stats = _stats(name)
+    assert stats["broken-primary"]["calls"] == 1
+    assert stats["broken-primary"]["failures"] == 1
+    assert stats["broken-primary"]["latency_p50_ms"] is None
+    assert stats["fallback"]["calls"] == 1 and stats["fallback"]["failures"] == 0
+    assert stats["fallback"]["latency_p50_ms"] is not None
+
+
+def test_latency_percentiles_and_agreement_rate():
+    name = f"test_stage_{uuid.uuid4().hex}"
+    for latency in range(1, 101):
+        record_route_call(name, "small", float(latency), ok=True)
+    for agreed in (True, True, True, False):
+        record_route_agreement(name, "small", agreed)
+    stats = _stats(name)["small"]
+    assert stats["latency_p50_ms"] == 51.0
+    assert stats["latency_p95_ms"] == 96.0
+    assert stats["agreement_checks"] == 4
+    assert stats["agreement_rate"] == 0.75
+
+
+def test_routed_models_are_shared_and_build_each_model_once(stage):
+    name, _, created = stage
+    routed = get_routed_model(name, Verdict)
+    assert get_routed_model(name, Verdict) is routed
+    assert get_routed_model(name, Verdict, "last") is not routed
+    assert get_routed_model(name) is not routed
+
+    plain = get_routed_model(name)
+    plain.invoke("Is this valid?")
+    plain.invoke("Is this valid?")
+    assert created == ["broken-primary", "fallback"]
@@ -0,0 +1,60 @@
+import sys
+import os
+
+import pytest
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../")))
+from backend.fastapi.langgraph.helpers.numpy_vector_store import (
+    EMBEDDINGS_FILE_NAME,
+    INT8_CODES_FILE_NAME,
+    NumpyVectorStore,
+)
+
+TEXTS = [f"Section {i} of the security assessment guide" for i in range(40)]
+
+
+@pytest.fixture
+def embeddings():
+    return DeterministicFakeEmbedding(size=64)
+
+
+def _top_ids(store: NumpyVectorStore, query: str) -> list[str]:
+    return [doc.id for doc in store.similarity_search(query, k=5)]
+
+
+@pytest.mark.parametrize("rerank_factor", [4, 0])
+def test_int8_store_ranks_like_the_float_store(embeddings, tmp_path, rerank_factor):
+    exact = NumpyVectorStore.from_texts(TEXTS, embeddings, ids=TEXTS)
+    quantized = NumpyVectorStore.from_texts(
+        TEXTS,
+        embeddings,
+        ids=TEXTS,
+        persist_dir=str(tmp_path),
+        quantization="int8",
+        rerank_factor=rerank_factor,
+    )
+    query = TEXTS[7]
+    assert _top_ids(quantized, query)[0] == query
+    if rerank_factor:
+        assert _top_ids(quantized, query) == _top_ids(exact, query)
+
+
+def test_float_vectors_are_only_stored_while_reranking(embeddings, tmp_path):
+    NumpyVectorStore.from_texts(
+        TEXTS, embeddings, ids=TEXTS, persist_dir=str(tmp_path), quantization="int8"
+    )
+    assert (tmp_path / EMBEDDINGS_FILE_NAME).exists()
+
+    # Re-ranking turned off: the float vectors saved before are removed on the next write
+    store = NumpyVectorStore(
+        embeddings, str(tmp_path), quantization="int8", rerank_factor=0
+    )
+    store.add_texts(["A new section"], ids=["new"])
+    assert not (tmp_path / EMBEDDINGS_FILE_NAME).exists()
+    assert (tmp_path / INT8_CODES_FILE_NAME).exists()
+
+    reopened = NumpyVectorStore(
+        embeddings, str(tmp_path), quantization="int8", rerank_factor=0
+    )
+    assert len(reopened) == len(TEXTS) + 1
@@ -0,0 +1,140 @@
+import sys
+import os
+import threading
+import time
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../")))
+from backend.fastapi.langgraph.helpers import ollama_backend_pool
+from backend.fastapi.langgraph.helpers.ollama_backend_pool import (
+    EJECTION_BASE_SECONDS,
+    OllamaBackendPool,
+    call_with_backend,
+)
+
+GPU1, GPU2, GPU3 = "http://gpu1:11434", "http://gpu2:11434", "http://gpu3:11434"
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    pool = OllamaBackendPool([GPU1, GPU2, GPU3], max_concurrency=2)
+    monkeypatch.setattr(ollama_backend_pool, "ollama_pool", pool)
+    # A fresh circuit, so the failures of a test do not open it for the next ones
+    monkeypatch.setattr(
+        ollama_backend_pool,
+        "ollama_circuit",
+        ollama_backend_pool.CircuitBreaker(
+            "test", is_failure=ollama_backend_pool.is_connection_error
+        ),
+    )
+    return pool
+
+
+def _backend(pool, base_url):
+    return next(b for b in pool.backends if b.base_url == base_url)
+
+
+def test_least_outstanding_server_is_chosen(pool):
+    with pool.lease("llama3.2") as first, pool.lease("llama3.2") as second:
+        assert first != second
+        with pool.lease("llama3.2") as third:
+            assert third not in {first, second}
+            with pool.lease("llama3.2") as fourth:
+                assert _backend(pool, fourth).outstanding == 2
+    assert all(b.outstanding == 0 for b in pool.backends)
+
+
+def test_servers_with_the_model_are_preferred(pool):
+    for backend in pool.backends:
+        backend.models = {"llama3.2:latest"}
+    _backend(pool, GPU3).models = {"llama3.2:latest", "llama3.2:1b"}
+    with pool.lease("llama3.2:1b") as base_url:
+        assert base_url == GPU3
+    # No server has it: any server is tried, and Ollama reports the missing model
+    with pool.lease("qwen2.5") as base_url:
+        assert base_url in {GPU1, GPU2, GPU3}
+
+
+def test_ejection_backs_off_and_success_restores(pool):
+    before = time.monotonic()
+    pool.report_failure(GPU1, ConnectionError("refused"))
+    pool.report_failure(GPU1, ConnectionError("refused"))
+    backend = _backend(pool, GPU1)
+    assert backend.ejected_until - before >= 2 * EJECTION_BASE_SECONDS
+    for _ in range(3):
+        with pool.lease() as base_url:
+            assert base_url != GPU1
+
+    pool.report_success(GPU1)
+    assert backend.is_available(time.monotonic())
+
+
+def test_model_errors_do_not_eject(pool):
+    pool.report_failure(GPU1, ValueError("model not found"))
+    assert _backend(pool, GPU1).consecutive_failures == 0
+
+
+def test_waiting_for_a_slot_times_out(monkeypatch):
+    monkeypatch.setattr(ollama_backend_pool, "OLLAMA_BACKEND_WAIT_SECONDS", 0.2)
+    single = OllamaBackendPool([GPU1], max_concurrency=1)
+    with single.lease():
+        with pytest.raises(TimeoutError):
+            with single.lease():
+                pass
+        assert single.waiting == 0
+
+
+def test_waiter_gets_the_released_slot():
+    single = OllamaBackendPool([GPU1], max_concurrency=1)
+    acquired = threading.Event()
+    with single.lease():
+
+        def wait_for_slot():
+            with single.lease():
+                acquired.set()
+
+        waiter = threading.Thread(target=wait_for_slot)
+        waiter.start()
+        time.sleep(0.1)
+        assert single.waiting == 1 and not acquired.is_set()
+    assert acquired.wait(2)
+    waiter.join()
+
+
+def test_unreachable_server_is_excluded_and_retried(pool):
+    tried = []
+
+    def call(base_url):
+        tried.append(base_url)
+        if len(tried) == 1:
+            raise ConnectionError("refused")
+        return f"answer from {base_url}"
+
+    assert call_with_backend("llama3.2", call) == f"answer from {tried[1]}"
+    assert tried[0] != tried[1]
+    assert not _backend(pool, tried[0]).is_available(time.monotonic())
+
+
+def test_model_error_is_not_retried(pool):
+    tried = []
+
+    def call(base_url):
+        tried.append(base_url)
+        raise ValueError("invalid request")
+
+    with pytest.raises(ValueError):
+        call_with_backend("llama3.2", call)
+    assert len(tried) == 1
+
+
+def test_every_server_unreachable_raises_after_one_try_each(pool):
+    tried = []
+
+    def call(base_url):
+        tried.append(base_url)
+        raise ConnectionError("refused")
+
+    with pytest.raises(ConnectionError):
+        call_with_backend("llama3.2", call)
+    assert sorted(tried) == [GPU1, GPU2, GPU3]
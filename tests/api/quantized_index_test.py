@@ -0,0 +1,113 @@
+import sys
+import os
+import uuid
+
+import numpy as np
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../")))
+from backend.fastapi.langgraph.helpers import quantized_index
+from backend.fastapi.langgraph.helpers.chroma_client_registry import (
+    get_chroma_collection,
+)
+from backend.fastapi.langgraph.helpers.numpy_vector_store import normalize_rows
+from backend.fastapi.langgraph.helpers.quantized_index import (
+    QuantizedIndex,
+    get_quantized_index,
+    update_quantized_index,
+)
+
+DIM = 64
+
+
+def random_vectors(count: int, seed: int = 0) -> np.ndarray:
+    return np.random.default_rng(seed).standard_normal((count, DIM)).astype(np.float32)
+
+
+@pytest.fixture
+def collection(tmp_path):
+    vectors = random_vectors(300)
+    collection = get_chroma_collection(str(tmp_path), f"profiles_{uuid.uuid4().hex}")
+    collection.add(
+        ids=[f"business_{i}" for i in range(len(vectors))],
+        embeddings=vectors,
+        documents=[f"Business {i}" for i in range(len(vectors))],
+        metadatas=[{"business_name": f"Business {i}"} for i in range(len(vectors))],
+    )
+    return collection
+
+
+def exact_top_ids(collection, query: np.ndarray, k: int) -> list[str]:
+    stored = collection.get(include=["embeddings"])
+    scores = normalize_rows(stored["embeddings"]) @ normalize_rows(query)[0]
+    return [stored["ids"][i] for i in np.argsort(-scores)[:k]]
+
+
+def test_builds_from_the_collection_a_page_at_a_time(collection, monkeypatch):
+    monkeypatch.setattr(quantized_index, "LOAD_PAGE_SIZE", 128)
+    index = QuantizedIndex.from_collection(collection)
+    assert len(index) == collection.count()
+    # One byte per dimension, a quarter of the float32 vectors
+    assert index.memory_footprint_bytes() < collection.count() * DIM * 4 / 2
+
+
+def test_reranked_matches_equal_the_exact_ones(collection):
+    index = QuantizedIndex.from_collection(collection)
+    queries = random_vectors(20, seed=1)
+    results = index.query(collection, queries, k=5, include=["documents"])
+
+    for query, matches in zip(queries, results):
+        assert [m.id for m in matches] == exact_top_ids(collection, query, 5)
+        similarities = [m.similarity for m in matches]
+        assert similarities == sorted(similarities, reverse=True)
+    match = results[0][0]
+    assert match.document == f"Business {match.id.split('_')[1]}"
+
+
+def test_a_stored_vector_is_its_own_nearest_match(collection):
+    index = QuantizedIndex.from_collection(collection)
+    stored = collection.get(ids=["business_42"], include=["embeddings"])
+    [[match]] = index.query(
+        collection, stored["embeddings"], k=1, include=["metadatas"]
+    )
+    assert match.id == "business_42"
+    assert match.similarity == pytest.approx(1.0, abs=1e-5)
+    assert match.metadata == {"business_name": "Business 42"}
+
+
+def test_upsert_replaces_and_delete_moves_the_last_row():
+    index = QuantizedIndex()
+    vectors = random_vectors(3)
+    index.upsert(["a", "b", "c"], vectors)
+    index.upsert(["a"], vectors[2:])
+    assert len(index) == 3
+    assert set(index.candidates(vectors[2], 2)) == {"a", "c"}
+
+    index.delete(["a", "unknown"])
+    assert len(index) == 2
+    assert index.candidates(vectors[2], 1) == ["c"]
+    assert index.candidates(vectors[1], 1) == ["b"]
+    with pytest.raises(ValueError):
+        index.upsert(["d"], random_vectors(1)[:, :8])
+
+
+def test_ids_removed_from_the_collection_are_skipped(collection):
+    index = QuantizedIndex.from_collection(collection)
+    stored = collection.get(ids=["business_7"], include=["embeddings"])
+    collection.delete(ids=["business_7"])
+    [matches] = index.query(collection, stored["embeddings"], k=3)
+    assert "business_7" not in [m.id for m in matches]
+    assert len(matches) == 3
+
+
+def test_shared_index_only_follows_writes_once_built(tmp_path):
+    db_path, name = str(tmp_path), f"profiles_{uuid.uuid4().hex}"
+    vectors = random_vectors(2)
+    update_quantized_index(db_path, name, ["a"], vectors[:1])
+    get_chroma_collection(db_path, name).add(ids=["a"], embeddings=vectors[:1])
+
+    index = get_quantized_index(db_path, name)
+    assert len(index) == 1
+    update_quantized_index(db_path, name, ["b"], vectors[1:])
+    assert get_quantized_index(db_path, name) is index
+    assert len(index) == 2
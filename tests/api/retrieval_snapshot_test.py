@@ -0,0 +1,122 @@
+import sys
+import os
+import json
+
+import numpy as np
+import pytest
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../")))
+from backend.fastapi.langgraph.helpers import retrieval_snapshot
+from backend.fastapi.langgraph.helpers.retrieval_snapshot import (
+    SNAPSHOT_METADATA_FILE_NAME,
+    build_retrieval_snapshot,
+    load_retrieval_snapshot,
+    read_snapshot_metadata,
+)
+
+GUIDE = """1. # Scope
+Describe what the assessment covers.
+2. # Threats
+List the threats to the business.
+3. ## Controls
+Describe the controls in place.
+"""
+
+
+@pytest.fixture
+def embeddings(monkeypatch):
+    embeddings = DeterministicFakeEmbedding(size=16)
+    monkeypatch.setattr(retrieval_snapshot, "_ollama_embeddings", lambda _: embeddings)
+    return embeddings
+
+
+@pytest.fixture
+def guide(tmp_path):
+    path = tmp_path / "guide.md"
+    path.write_text(GUIDE, encoding="utf-8")
+    return path
+
+
+@pytest.fixture
+def snapshot_dir(tmp_path, guide, embeddings):
+    snapshot_dir = tmp_path / "snapshot"
+    build_retrieval_snapshot(str(guide), str(snapshot_dir))
+    return snapshot_dir
+
+
+def test_snapshot_round_trip(snapshot_dir, guide):
+    metadata = read_snapshot_metadata(str(snapshot_dir))
+    assert metadata["section_count"] == 3
+    assert metadata["document_count"] >= 3
+
+    snapshot = load_retrieval_snapshot(str(guide), str(snapshot_dir))
+    assert snapshot is not None
+    assert snapshot.section_map == {"1": "Scope", "2": "Threats", "3": "Controls"}
+    assert [doc.metadata["section_number"] for doc in snapshot.split_docs] == [
+        "1",
+        "2",
+        "3",
+    ]
+    assert len(snapshot.vectorstore) == metadata["document_count"]
+    # The embeddings are memory-mapped, not read into memory
+    assert isinstance(snapshot.vectorstore._matrix, np.memmap)
+    top = snapshot.vectorstore.similarity_search(
+        snapshot.vectorstore.get_all_documents()[1].page_content, k=1
+    )
+    assert (
+        top[0].page_content == snapshot.vectorstore.get_all_documents()[1].page_content
+    )
+
+
+def test_changed_guide_makes_the_snapshot_stale(snapshot_dir, guide):
+    guide.write_text(GUIDE + "4. # Appendix\nMore.\n", encoding="utf-8")
+    assert load_retrieval_snapshot(str(guide), str(snapshot_dir)) is None
+
+
+def test_other_embedding_model_makes_the_snapshot_stale(snapshot_dir, guide):
+    assert (
+        load_retrieval_snapshot(str(guide), str(snapshot_dir), "nomic-embed-text")
+        is None
+    )
+
+
+def test_tampered_version_is_rejected(snapshot_dir, guide):
+    metadata_path = snapshot_dir / SNAPSHOT_METADATA_FILE_NAME
+    metadata = json.loads(metadata_path.read_text(encoding="utf-8"))
+    metadata["version"] = "0" * 64
+    metadata_path.write_text(json.dumps(metadata), encoding="utf-8")
+    assert load_retrieval_snapshot(str(guide), str(snapshot_dir)) is None
+
+
+def test_incomplete_snapshot_is_rejected(snapshot_dir, guide):
+    metadata_path = snapshot_dir / SNAPSHOT_METADATA_FILE_NAME
+    metadata = json.loads(metadata_path.read_text(encoding="utf-8"))
+    metadata["document_count"] += 1
+    metadata_path.write_text(json.dumps(metadata), encoding="utf-8")
+    assert load_retrieval_snapshot(str(guide), str(snapshot_dir)) is None
+
+
+def test_missing_snapshot_is_not_loaded(tmp_path, guide, embeddings):
+    assert load_retrieval_snapshot(str(guide), str(tmp_path / "none")) is None
+
+
+def test_cli_builds_and_verifies(tmp_path, guide, embeddings, monkeypatch):
+    snapshot_dir = tmp_path / "cli_snapshot"
+    arguments = ["--input", str(guide), "--output", str(snapshot_dir)]
+    monkeypatch.setattr(sys, "argv", ["retrieval_snapshot", "build", *arguments])
+    retrieval_snapshot.main()
+    assert read_snapshot_metadata(str(snapshot_dir)) is not None
+
+    monkeypatch.setattr(sys, "argv", ["retrieval_snapshot", "verify", *arguments])
+    retrieval_snapshot.main()
+
+    guide.write_text(GUIDE.replace("Scope", "Purpose"), encoding="utf-8")
+    with pytest.raises(SystemExit) as exit_info:
+        retrieval_snapshot.main()
+    assert exit_info.value.code == 1
+    # The build left no temporary directory behind
+    assert sorted(p.name for p in tmp_path.iterdir()) == [
+        "cli_snapshot",
+        "guide.md",
+    ]
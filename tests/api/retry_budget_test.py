@@ -0,0 +1,114 @@
+import sys
+import os
+import threading
+import time
+import uuid
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../")))
+from backend.fastapi.langgraph.helpers import retry_budget
+from backend.fastapi.langgraph.helpers.cancellation import (
+    RequestCancelledError,
+    cancellation_scope,
+    raise_if_cancelled,
+)
+from backend.fastapi.langgraph.helpers.output_validation import (
+    ValidationUnavailableError,
+)
+
+
+@pytest.fixture
+def stage():
+    return f"test_stage_{uuid.uuid4().hex}"
+
+
+def _results(stage: str) -> list[bool]:
+    return [accepted for _, accepted in retry_budget._acceptance_windows.get(stage, ())]
+
+
+def test_plan_uses_default_attempts_until_enough_samples(stage):
+    for _ in range(retry_budget.MIN_ACCEPTANCE_SAMPLES - 1):
+        retry_budget.record_attempt(stage, "model", False, 1.0)
+    plan = retry_budget.plan_retries(stage)
+    assert plan.max_attempts == retry_budget.DEFAULT_STAGE_ATTEMPTS
+    assert plan.acceptance_rate is None
+
+
+def test_plan_sizes_attempts_from_acceptance_rate(stage):
+    for accepted in [True] * 18 + [False] * 2:
+        retry_budget.record_attempt(stage, "model", accepted, 1.0)
+    # Smoothed rate 19/22: 3 attempts reach the 0.99 target
+    assert retry_budget.plan_retries(stage).max_attempts == 3
+
+    for _ in range(30):
+        retry_budget.record_attempt(stage, "model", False, 1.0)
+    assert retry_budget.plan_retries(stage).max_attempts == (
+        retry_budget.MAX_STAGE_ATTEMPTS
+    )
+    assert retry_budget.plan_retries(stage, max_attempts=2).max_attempts == 2
+
+
+def test_plan_fans_out_when_attempts_do_not_fit_the_deadline(stage):
+    for _ in range(20):
+        retry_budget.record_attempt(
+            stage, "model", False, retry_budget.STAGE_DEADLINE_SECONDS
+        )
+    plan = retry_budget.plan_retries(stage)
+    assert plan.fan_out == min(retry_budget.MAX_SPECULATIVE_FAN_OUT, plan.max_attempts)
+
+
+def test_rejections_are_retried_and_recorded(stage):
+    outcomes = iter([(None, False), ("ok", True)])
+    assert retry_budget.run_validated_stage(stage, lambda _: next(outcomes)) == "ok"
+    assert _results(stage) == [False, True]
+
+
+def test_generation_failure_ends_the_run(stage):
+    calls = []
+    assert (
+        retry_budget.run_validated_stage(
+            stage, lambda number: calls.append(number) or (None, None)
+        )
+        is None
+    )
+    assert calls == [1]
+
+
+def test_validator_errors_are_retried_without_counting_as_rejections(stage):
+    def attempt(number):
+        if number == 1:
+            raise ValidationUnavailableError("Validation error: timeout")
+        return "ok", True
+
+    assert retry_budget.run_validated_stage(stage, attempt) == "ok"
+    assert _results(stage) == [True]
+
+
+def test_speculative_losers_are_cancelled(stage, monkeypatch):
+    monkeypatch.setattr(
+        retry_budget,
+        "plan_retries",
+        lambda *_: retry_budget.RetryPlan(2, 2, 60.0, 0.5, 1.0),
+    )
+    loser_cancelled = threading.Event()
+
+    def attempt(number):
+        if number == 1:
+            return "winner", True
+        # A slow generation, checking for cancellation between tokens
+        for _ in range(500):
+            try:
+                raise_if_cancelled("next token")
+            except RequestCancelledError:
+                loser_cancelled.set()
+                raise
+            time.sleep(0.01)
+        return "loser", True
+
+    request = threading.Event()
+    with cancellation_scope(request):
+        assert retry_budget.run_validated_stage(stage, attempt) == "winner"
+    assert loser_cancelled.wait(2)
+    # Only the attempt is cancelled, not the request it belongs to
+    assert not request.is_set()
@@ -0,0 +1,189 @@
+import sys
+import os
+import hashlib
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+import numpy as np
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../")))
+from backend.fastapi.langgraph.ai_agents import business_generation
+from backend.fastapi.langgraph.helpers import retry_budget, scenario_dedup
+from backend.fastapi.langgraph.helpers.graph_state_classes import (
+    BusinessOnlyState,
+    BusinessValidationResult,
+)
+
+
+def bag_of_words_embedding(text, embedding_function=None):
+    vector = np.zeros(256)
+    for word in text.lower().split():
+        vector[int(hashlib.md5(word.encode()).hexdigest(), 16) % 256] += 1
+    return vector.tolist()
+
+
+def make_business(name: str, activity: str) -> BusinessOnlyState:
+    return BusinessOnlyState(
+        business_name=name,
+        business_location="Southeast Portland",
+        business_contact_info="contact@example.org",
+        business_activity=activity,
+        business_description=f"{name} does {activity.lower()}",
+    )
+
+
+CLINIC = make_business(
+    "Zenith Wellness", "Massage and acupuncture rooms rented to therapists"
+)
+# The contact details are not compared
+CLINIC_CLONE = CLINIC.model_copy(update={"business_contact_info": "other@example.org"})
+SHIPPING = make_business(
+    "Harbor Freight", "Container shipping brokerage and customs clearance"
+)
+BAKERY = make_business("Crumb Corner", "Sourdough bread and pastries for cafes")
+
+
+@pytest.fixture
+def index(tmp_path, monkeypatch):
+    monkeypatch.setattr(scenario_dedup, "embed_text", bag_of_words_embedding)
+    index = scenario_dedup.ScenarioIndex(
+        db_path=str(tmp_path), collection_name=f"dedup_{uuid.uuid4().hex}"
+    )
+    monkeypatch.setattr(scenario_dedup, "get_scenario_index", lambda: index)
+    return index
+
+
+def test_near_duplicates_are_not_reserved(index):
+    first = index.reserve(CLINIC.model_dump())
+    assert first.duplicate_of is None and first.reservation
+
+    clone = index.reserve(CLINIC_CLONE.model_dump())
+    assert clone.duplicate_of == "Zenith Wellness"
+    assert clone.similarity >= scenario_dedup.SCENARIO_DEDUP_THRESHOLD
+    assert clone.reservation is None
+    assert index.reserve(SHIPPING.model_dump()).duplicate_of is None
+    assert len(index) == 2
+
+
+def test_released_businesses_no_longer_count(index):
+    reservation = index.reserve(CLINIC.model_dump()).reservation
+    index.release(reservation)
+    assert index.reserve(CLINIC_CLONE.model_dump()).duplicate_of is None
+
+
+def test_businesses_sharing_a_name_are_both_kept(index):
+    index.reserve(SHIPPING.model_dump())
+    index.reserve(make_business("Harbor Freight", "Sourdough for cafes").model_dump())
+    assert len(index) == 2
+
+
+def test_concurrent_near_copies_cannot_both_pass(index):
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        checks = list(pool.map(index.reserve, [CLINIC.model_dump()] * 8))
+    assert sum(check.duplicate_of is None for check in checks) == 1
+    assert len(index) == 1
+
+
+def test_reopened_index_rebuilds_its_int8_copy(index, tmp_path):
+    reservation = index.reserve(CLINIC.model_dump()).reservation
+    index.reserve(SHIPPING.model_dump())
+    index.release(reservation)
+
+    reopened = scenario_dedup.ScenarioIndex(
+        db_path=str(tmp_path),
+        collection_name=index.collection.name,
+    )
+    assert len(reopened.quantized) == 1
+    assert reopened.reserve(CLINIC_CLONE.model_dump()).duplicate_of is None
+    assert reopened.reserve(SHIPPING.model_dump()).duplicate_of == "Harbor Freight"
+
+
+def test_int8_and_hnsw_checks_agree(index, tmp_path):
+    for business in [CLINIC, SHIPPING, BAKERY]:
+        index.reserve(business.model_dump())
+    hnsw = scenario_dedup.ScenarioIndex(
+        db_path=str(tmp_path),
+        collection_name=index.collection.name,
+        quantization=None,
+    )
+    assert hnsw.quantized is None
+    embeddings = [
+        bag_of_words_embedding(scenario_dedup.business_text(business.model_dump()))
+        for business in [CLINIC_CLONE, SHIPPING, BAKERY]
+    ]
+    for (name, similarity), (hnsw_name, hnsw_similarity) in zip(
+        index.nearest(embeddings), hnsw.nearest(embeddings)
+    ):
+        assert name == hnsw_name
+        assert similarity == pytest.approx(hnsw_similarity, abs=1e-5)
+
+
+def _run_business_stage(index, generated, monkeypatch):
+    generations = iter(generated)
+    monkeypatch.setattr(
+        business_generation, "generate_business", lambda: next(generations)
+    )
+    monkeypatch.setattr(
+        business_generation,
+        "validate_generated_output",
+        lambda prompt: BusinessValidationResult(
+            is_valid="Crumb Corner" not in prompt, reason=""
+        ),
+    )
+    stage = f"business_{uuid.uuid4().hex}"
+    with mock.patch.object(
+        business_generation,
+        "run_validated_stage",
+        lambda _, attempt, max_attempts: retry_budget.run_validated_stage(
+            stage, attempt, max_attempts
+        ),
+    ):
+        result = business_generation.get_validated_business(max_retries=3)
+    return result, stage
+
+
+def test_duplicates_are_regenerated_without_counting_as_rejections(index, monkeypatch):
+    index.reserve(CLINIC.model_dump())
+    result, stage = _run_business_stage(
+        index, [CLINIC_CLONE, BAKERY, SHIPPING], monkeypatch
+    )
+
+    assert result["business_name"] == "Harbor Freight"
+    # The clone was regenerated within the first attempt, the bakery rejected by the validator
+    window = retry_budget._acceptance_windows[stage]
+    assert [accepted for _, accepted in window] == [False, True]
+    # The rejected bakery's reservation was released
+    assert index.reserve(BAKERY.model_dump()).duplicate_of is None
+    assert index.reserve(SHIPPING.model_dump()).duplicate_of == "Harbor Freight"
+
+
+def test_attempt_of_only_duplicates_is_discarded(index, monkeypatch):
+    index.reserve(CLINIC.model_dump())
+    clones = [CLINIC_CLONE] * scenario_dedup.SCENARIO_DEDUP_MAX_REGENERATIONS
+    result, stage = _run_business_stage(index, clones + [SHIPPING], monkeypatch)
+
+    assert result["business_name"] == "Harbor Freight"
+    assert [accepted for _, accepted in retry_budget._acceptance_windows[stage]] == [
+        True
+    ]
+
+
+def test_returned_business_keeps_its_reservation(index, monkeypatch):
+    generations = iter([SHIPPING])
+    monkeypatch.setattr(
+        business_generation, "generate_business", lambda: next(generations)
+    )
+    monkeypatch.setattr(
+        business_generation,
+        "validate_generated_output",
+        lambda prompt: BusinessValidationResult(is_valid=True, reason=""),
+    )
+    business, reservation = business_generation.reserve_validated_business(
+        max_retries=1
+    )
+    assert business["business_name"] == "Harbor Freight" and reservation
+    # Released by the caller when the scenario is not written, the business can be generated again
+    scenario_dedup.release_business(reservation)
+    assert index.reserve(SHIPPING.model_dump()).duplicate_of is None
@@ -0,0 +1,79 @@
+import sys
+import os
+import threading
+import time
+
+import pytest
+from langchain.schema import Document
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../")))
+from backend.fastapi.langgraph.ai_agents.security_assessment_assistant import (
+    build_tool_messages,
+    retrieve_documents_concurrently,
+)
+
+
+class StubRetriever:
+    """Returns one document per query, slower for the first queries, and fails on queries containing "fail"."""
+
+    def __init__(self):
+        self.calls = []
+        self.threads = set()
+        self._lock = threading.Lock()
+
+    def invoke(self, query):
+        with self._lock:
+            self.calls.append(query)
+            self.threads.add(threading.get_ident())
+        time.sleep(0.05 if query.endswith("1") else 0.01)
+        if "fail" in query:
+            raise ConnectionError("embedding model unreachable")
+        return [Document(id=query, page_content=f"About {query}")]
+
+
+def test_results_follow_query_order():
+    retriever = StubRetriever()
+    queries = ["query 1", "query 2", "query 3", "query 2"]
+    retrieved = retrieve_documents_concurrently(retriever, queries)
+
+    assert list(retrieved) == ["query 1", "query 2", "query 3"]
+    assert all(docs[0].id == query for query, docs in retrieved.items())
+    # Duplicates are retrieved once, distinct queries in parallel
+    assert sorted(retriever.calls) == ["query 1", "query 2", "query 3"]
+    assert len(retriever.threads) > 1
+
+
+def test_failing_query_does_not_drop_the_others():
+    retrieved = retrieve_documents_concurrently(
+        StubRetriever(), ["query 1", "fail 2", "query 3"]
+    )
+    assert retrieved["fail 2"] == []
+    assert [docs[0].id for docs in (retrieved["query 1"], retrieved["query 3"])] == [
+        "query 1",
+        "query 3",
+    ]
+
+
+def test_error_is_raised_when_every_query_fails():
+    with pytest.raises(ConnectionError):
+        retrieve_documents_concurrently(StubRetriever(), ["fail 1", "fail 2"])
+
+
+def test_tool_messages_match_tool_calls():
+    shared = Document(id="shared", page_content="Shared section")
+    retrieved = {
+        "scope": [shared, Document(id="scope", page_content="Scope section")],
+        "threats": [shared],
+        "failed": [],
+    }
+    tool_calls = [
+        {"id": "call-1", "args": {"query": "scope"}},
+        {"id": "call-2", "args": {"query": "threats"}},
+        {"id": "call-3", "args": {"query": "failed"}},
+    ]
+    messages = build_tool_messages(tool_calls, retrieved)
+
+    assert [m.tool_call_id for m in messages] == ["call-1", "call-2", "call-3"]
+    assert messages[0].content == "Shared section\n\nScope section"
+    assert "already retrieved" in messages[1].content
+    assert "could be retrieved" in messages[2].content
@@ -0,0 +1,70 @@
+import sys
+import os
+import gzip
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../")))
+from backend.fastapi.langgraph.helpers import file_operations, static_file_responses
+from backend.fastapi.langgraph.helpers.static_file_responses import (
+    choose_content_encoding,
+    etag_matches,
+    get_encoded_input_file,
+)
+
+
+@pytest.fixture
+def input_files(tmp_path, monkeypatch):
+    monkeypatch.setattr(file_operations, "_input_files_dir", lambda: str(tmp_path))
+    monkeypatch.setattr(file_operations, "_file_cache", {})
+    monkeypatch.setattr(static_file_responses, "_encoded_files", {})
+    return tmp_path
+
+
+def test_choose_content_encoding():
+    assert (
+        choose_content_encoding("gzip, deflate, br", ["identity", "gzip", "br"]) == "br"
+    )
+    assert choose_content_encoding("gzip, br;q=0", ["identity", "gzip", "br"]) == "gzip"
+    assert choose_content_encoding("*", ["identity", "gzip"]) == "gzip"
+    assert choose_content_encoding("br", ["identity", "gzip"]) == "identity"
+    assert choose_content_encoding(None, ["identity", "gzip"]) == "identity"
+
+
+def test_etag_matches():
+    etags = ['"abc"', '"abc-gzip"']
+    assert etag_matches('"abc-gzip"', etags)
+    assert etag_matches('"old", W/"abc"', etags)
+    assert etag_matches("*", etags)
+    assert not etag_matches('"old"', etags)
+    assert not etag_matches(None, etags)
+
+
+def test_bodies_decode_to_the_file(input_files):
+    (input_files / "guide.md").write_text("# Guide\n" * 200, encoding="utf-8")
+    encoded = get_encoded_input_file("guide.md")
+    assert gzip.decompress(encoded.bodies["gzip"]) == encoded.bodies["identity"]
+    assert encoded.etags["gzip"] != encoded.etags["identity"]
+
+
+def test_file_replaced_by_rename_is_re_encoded(input_files):
+    path = input_files / "guide.md"
+    path.write_text("first version", encoding="utf-8")
+    first = get_encoded_input_file("guide.md")
+    file_stat = os.stat(path)
+
+    # Same size and mtime, new inode: an atomic replace by an editor or a deploy
+    replacement = input_files / "guide.md.new"
+    replacement.write_text("other version", encoding="utf-8")
+    os.utime(replacement, ns=(file_stat.st_atime_ns, file_stat.st_mtime_ns))
+    os.replace(replacement, path)
+
+    second = get_encoded_input_file("guide.md")
+    assert second.bodies["identity"] == b"other version"
+    assert second.etags != first.etags
+
+
+def test_directories_and_missing_files_are_not_found(input_files):
+    (input_files / "folder").mkdir()
+    assert get_encoded_input_file("folder") is None
+    assert get_encoded_input_file("missing.md") is None
@@ -0,0 +1,71 @@
+import sys
+import os
+import json
+
+import pytest
+from langchain_core.exceptions import OutputParserException
+from pydantic import BaseModel
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../")))
+from backend.fastapi.langgraph.helpers.structured_output import (
+    parse_structured_output,
+    repair_json,
+    repair_json_candidates,
+)
+
+
+class Asset(BaseModel):
+    name: str
+    value: str
+
+
+class Assets(BaseModel):
+    assets: list[Asset]
+
+
+def test_complete_json_is_returned_as_is():
+    assert repair_json('{"assets": []}') == '{"assets": []}'
+
+
+def test_code_fences_are_removed():
+    assert json.loads(repair_json('```json\n{"assets": []}\n```')) == {"assets": []}
+
+
+def test_chatter_around_the_value_is_dropped():
+    text = 'Here is the JSON you asked for:\n{"assets": [1, 2]}\nLet me know if you need more!'
+    assert json.loads(repair_json(text)) == {"assets": [1, 2]}
+
+
+def test_truncated_string_is_closed():
+    assert json.loads(repair_json('{"name": "Harbor Frei')) == {"name": "Harbor Frei"}
+
+
+def test_truncated_list_is_closed():
+    assert json.loads(repair_json('{"assets": [1, 2, 3')) == {"assets": [1, 2, 3]}
+    assert json.loads(repair_json('{"assets": [1, 2,')) == {"assets": [1, 2]}
+
+
+def test_candidates_back_off_one_element_at_a_time():
+    text = '{"assets": [{"name": "Server", "value": "high"}, {"name": "Lapt'
+    candidates = [json.loads(candidate) for candidate in repair_json_candidates(text)]
+    assert candidates[0] == {
+        "assets": [{"name": "Server", "value": "high"}, {"name": "Lapt"}]
+    }
+    assert {"assets": [{"name": "Server", "value": "high"}]} in candidates
+
+
+def test_text_without_json_has_no_candidates():
+    assert list(repair_json_candidates("I cannot help with that.")) == []
+    assert repair_json("") is None
+
+
+def test_truncated_last_element_missing_fields_is_dropped():
+    text = '{"assets": [{"name": "Server", "value": "high"}, {"name": "Lapt'
+    assert parse_structured_output(text, Assets) == Assets(
+        assets=[Asset(name="Server", value="high")]
+    )
+
+
+def test_unrecoverable_output_raises():
+    with pytest.raises(OutputParserException):
+        parse_structured_output("No assets here.", Assets)
@@ -1,6 +1,7 @@
 from fastapi.testclient import TestClient
 import sys
 import os
+import time
 import uuid
 import pytest
 
@@ -384,6 +385,28 @@ def test_security_assistant_two_turns():
     assert len(ai_msgs[-1]["content"]) > 10, "Second AI response is too short"
 
 
+def test_liveness():
+    response = client.get("/healthz")
+    assert response.status_code == 200, "Liveness check failed"
+
+
+def test_readiness_after_startup_warmup():
+    with TestClient(app) as started_client:
+        deadline = time.time() + 300
+        response = started_client.get("/readyz")
+        while response.status_code == 503 and time.time() < deadline:
+            time.sleep(1)
+            response = started_client.get("/readyz")
+
+        assert response.status_code == 200, "Service never became ready"
+        assert response.json()["status"] == "ready", "Ollama is unreachable"
+        steps = response.json()["warmup"]["steps"]
+        assert all(
+            step["state"] == "done" for step in steps.values()
+        ), f"Some warm-up steps failed: {steps}"
+        assert response.json()["ollama"]["loaded_models"], "No model loaded in Ollama"
+
+
 # if __name__ == '__main__':
 #     test_business_generation()
 #     test_assets_generation()
@@ -0,0 +1,65 @@
+import sys
+import os
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../")))
+from backend.fastapi.langgraph.helpers.token_accounting import (
+    PromptBudgetExceededError,
+    enforce_prompt_budget,
+    estimate_prompt_tokens,
+    trim_messages_to_budget,
+)
+
+SYSTEM = SystemMessage(content="You are a teaching assistant. " * 5)
+TURNS = [
+    HumanMessage(content="Old question " * 20),
+    AIMessage(content="Old answer " * 20),
+    HumanMessage(content="Recent question " * 20),
+    AIMessage(content="Recent answer " * 20),
+]
+QUESTION = HumanMessage(content="Tell me about section 3")
+TOOL_RESULT = ToolMessage(content="Section 3 " * 20, tool_call_id="call-1")
+
+
+def test_messages_within_budget_are_kept():
+    messages = [SYSTEM, *TURNS, QUESTION]
+    assert trim_messages_to_budget(messages, 10_000) == messages
+
+
+def test_oldest_turns_are_dropped_first():
+    messages = [SYSTEM, *TURNS, QUESTION, TOOL_RESULT]
+    budget = estimate_prompt_tokens([SYSTEM, *TURNS[2:], QUESTION, TOOL_RESULT])
+    assert trim_messages_to_budget(messages, budget) == [
+        SYSTEM,
+        *TURNS[2:],
+        QUESTION,
+        TOOL_RESULT,
+    ]
+
+
+def test_whole_turns_are_dropped():
+    messages = [SYSTEM, *TURNS, QUESTION]
+    # Dropping the old question alone would fit, but leave its answer without it
+    budget = estimate_prompt_tokens(messages) - estimate_prompt_tokens([TURNS[0]])
+    trimmed = trim_messages_to_budget(messages, budget)
+    assert trimmed == [SYSTEM, *TURNS[2:], QUESTION]
+
+
+def test_system_messages_and_question_are_always_kept():
+    messages = [SYSTEM, *TURNS, QUESTION]
+    assert trim_messages_to_budget(messages, 1) == [SYSTEM, QUESTION]
+
+
+def test_budget_trims_or_rejects():
+    messages = [SYSTEM, *TURNS, QUESTION]
+    budget = estimate_prompt_tokens([SYSTEM, *TURNS[2:], QUESTION])
+    trimmed, estimate = enforce_prompt_budget("test", messages, budget)
+    assert trimmed == [SYSTEM, *TURNS[2:], QUESTION]
+    assert estimate <= budget
+
+    with pytest.raises(PromptBudgetExceededError):
+        enforce_prompt_budget("test", messages, budget, over_budget="reject")
+    with pytest.raises(PromptBudgetExceededError):
+        enforce_prompt_budget("test", messages, 1)
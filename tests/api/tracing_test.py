@@ -0,0 +1,137 @@
+import sys
+import os
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../")))
+from backend.fastapi.langgraph.helpers import tracing
+from backend.fastapi.langgraph.helpers.tracing import (
+    current_trace_id,
+    get_trace,
+    in_current_context,
+    list_traces,
+    record_token_usage,
+    set_span_attributes,
+    span,
+    start_trace,
+)
+
+
+@pytest.fixture(autouse=True)
+def empty_buffer(monkeypatch):
+    monkeypatch.setattr(tracing, "_finished_traces", type(tracing._finished_traces)())
+    monkeypatch.setattr(tracing, "TRACE_EXPORT_FILE", None)
+
+
+def _by_name(spans: list[dict]) -> dict[str, dict]:
+    return {s["name"]: s for s in spans}
+
+
+def test_nested_spans_are_children_of_the_current_span():
+    with start_trace("GET /assets", method="GET") as root:
+        with span("graph.invoke"):
+            with span("llm.invoke", model="llama"):
+                pass
+
+    spans = get_trace(root.trace_id)
+    assert [s["name"] for s in spans] == ["llm.invoke", "graph.invoke", "GET /assets"]
+    by_name = _by_name(spans)
+    assert by_name["GET /assets"]["parent_id"] is None
+    assert by_name["graph.invoke"]["parent_id"] == root.span_id
+    assert by_name["llm.invoke"]["parent_id"] == by_name["graph.invoke"]["span_id"]
+    assert by_name["llm.invoke"]["attributes"] == {"model": "llama"}
+    assert {s["trace_id"] for s in spans} == {root.trace_id}
+    assert current_trace_id() is None
+
+
+def test_incoming_trace_id_is_continued():
+    with start_trace("GET /threats", trace_id="abc123"):
+        assert current_trace_id() == "abc123"
+    assert get_trace("abc123")[-1]["name"] == "GET /threats"
+
+
+def test_set_span_attributes_updates_the_current_span():
+    with start_trace("POST /chat") as root:
+        set_span_attributes(stage="chat")
+        with span("llm.invoke", attempt=1):
+            set_span_attributes(model="llama", attempt=2)
+        set_span_attributes(status_code=200)
+
+    by_name = _by_name(get_trace(root.trace_id))
+    assert by_name["llm.invoke"]["attributes"] == {"attempt": 2, "model": "llama"}
+    assert by_name["POST /chat"]["attributes"] == {"stage": "chat", "status_code": 200}
+
+
+def test_spans_outside_a_trace_are_not_recorded():
+    set_span_attributes(ignored=True)
+    with span("startup") as outside:
+        assert outside.trace_id is None
+    assert list_traces() == []
+
+
+def test_failed_span_is_recorded_with_its_error():
+    with pytest.raises(ValueError):
+        with start_trace("GET /assets") as root:
+            with span("llm.invoke"):
+                raise ValueError("unparsable output")
+
+    spans = get_trace(root.trace_id)
+    assert all(s["status"] == "error" for s in spans)
+    assert "unparsable output" in spans[0]["error"]
+
+
+def test_context_is_carried_into_worker_threads():
+    def retrieve(query: str) -> str | None:
+        with span("retrieve", query=query):
+            return current_trace_id()
+
+    with start_trace("POST /assistant") as root:
+        with ThreadPoolExecutor(max_workers=3) as pool:
+            with_context = list(pool.map(in_current_context(retrieve), ["a", "b", "c"]))
+            without_context = pool.submit(retrieve, "d").result()
+
+    assert with_context == [root.trace_id] * 3
+    assert without_context is None
+    retrieved = [s for s in get_trace(root.trace_id) if s["name"] == "retrieve"]
+    assert sorted(s["attributes"]["query"] for s in retrieved) == ["a", "b", "c"]
+    assert {s["parent_id"] for s in retrieved} == {root.span_id}
+
+
+def test_token_usage_is_added_to_the_current_span():
+    class Message:
+        response_metadata = {"prompt_eval_count": 12, "eval_duration": 2_500_000}
+
+    with start_trace("POST /chat") as root:
+        record_token_usage(Message())
+
+    attributes = get_trace(root.trace_id)[-1]["attributes"]
+    assert attributes == {"prompt_tokens": 12, "eval_ms": 2.5}
+
+
+def test_list_traces_summarises_the_newest_first(monkeypatch):
+    monkeypatch.setattr(tracing, "TRACE_BUFFER_SIZE", 2)
+    for name in ["first", "second", "third"]:
+        with start_trace(name, trace_id=name):
+            with span("child"):
+                pass
+
+    assert get_trace("first") is None
+    summaries = list_traces()
+    assert [t["name"] for t in summaries] == ["third", "second"]
+    assert summaries[0]["span_count"] == 2
+    assert summaries[0]["status"] == "ok"
+    assert [t["trace_id"] for t in list_traces(limit=1)] == ["third"]
+
+
+def test_finished_spans_are_exported(monkeypatch, tmp_path):
+    export_file = tmp_path / "spans.jsonl"
+    monkeypatch.setattr(tracing, "TRACE_EXPORT_FILE", str(export_file))
+    with start_trace("GET /assets", trace_id="exported"):
+        with span("llm.invoke"):
+            pass
+
+    lines = [json.loads(line) for line in export_file.read_text().splitlines()]
+    assert [s["name"] for s in lines] == ["llm.invoke", "GET /assets"]
+    assert {s["trace_id"] for s in lines} == {"exported"}
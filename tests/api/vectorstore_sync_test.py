@@ -0,0 +1,75 @@
+import sys
+import os
+import uuid
+
+import chromadb
+import pytest
+from langchain.schema import Document
+from langchain_chroma import Chroma
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../")))
+from backend.fastapi.langgraph.helpers.numpy_vector_store import NumpyVectorStore
+from backend.fastapi.langgraph.helpers.vector_db_operations import (
+    hash_document_chunk,
+    sync_vectorstore_with_documents,
+)
+
+DOCUMENTS = [
+    Document(page_content=f"{i}. # Section {i}\nBody of section {i}.")
+    for i in range(1, 6)
+]
+
+
+@pytest.fixture(params=["chroma", "numpy"])
+def vectorstore(request, tmp_path):
+    embeddings = DeterministicFakeEmbedding(size=16)
+    if request.param == "numpy":
+        return NumpyVectorStore(embeddings, str(tmp_path / "numpy"))
+    return Chroma(
+        client=chromadb.EphemeralClient(),
+        collection_name=f"sync_{uuid.uuid4().hex}",
+        embedding_function=embeddings,
+    )
+
+
+def _stored_ids(vectorstore) -> set[str]:
+    if isinstance(vectorstore, NumpyVectorStore):
+        return {doc.id for doc in vectorstore.get_all_documents()}
+    return set(vectorstore.get(include=[])["ids"])
+
+
+def test_first_sync_deletes_chunks_indexed_without_a_manifest(vectorstore, tmp_path):
+    # Copies with random ids, as indexed before there was a manifest
+    for _ in range(2):
+        vectorstore.add_documents(DOCUMENTS, ids=[str(uuid.uuid4()) for _ in DOCUMENTS])
+
+    stats = sync_vectorstore_with_documents(
+        vectorstore, DOCUMENTS, str(tmp_path / "manifest.json")
+    )
+
+    assert stats["added"] == len(DOCUMENTS)
+    assert _stored_ids(vectorstore) == {hash_document_chunk(d) for d in DOCUMENTS}
+
+
+def test_resync_only_indexes_changes(vectorstore, tmp_path):
+    manifest_path = str(tmp_path / "manifest.json")
+    sync_vectorstore_with_documents(vectorstore, DOCUMENTS, manifest_path)
+    edited = DOCUMENTS[:-1] + [Document(page_content="5. # Section 5\nNew body.")]
+
+    stats = sync_vectorstore_with_documents(vectorstore, edited, manifest_path)
+
+    assert stats == {"added": 1, "removed": 1, "unchanged": len(DOCUMENTS) - 1}
+    assert _stored_ids(vectorstore) == {hash_document_chunk(d) for d in edited}
+
+
+def test_sync_deletes_chunks_missing_from_the_manifest(vectorstore, tmp_path):
+    manifest_path = str(tmp_path / "manifest.json")
+    sync_vectorstore_with_documents(vectorstore, DOCUMENTS, manifest_path)
+    vectorstore.add_documents([Document(page_content="stray")], ids=["stray"])
+    vectorstore.delete(ids=[hash_document_chunk(DOCUMENTS[0])])
+
+    stats = sync_vectorstore_with_documents(vectorstore, DOCUMENTS, manifest_path)
+
+    assert stats["added"] == 1
+    assert _stored_ids(vectorstore) == {hash_document_chunk(d) for d in DOCUMENTS}